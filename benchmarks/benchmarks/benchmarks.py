@@ -77,6 +77,58 @@ class OverheadSuite(object):
                       progressbar=False, compute_convergence_checks=False)
 
 
+class NUTSTreeSuite(object):
+    """
+    Overhead of building NUTS trees for independent normals, where the
+    gradient is cheap compared to the work on the arrays of the states
+    """
+    params = [10, 1000, 100000]
+    param_names = ['ndim']
+    timer = timeit.default_timer
+
+    def setup(self, ndim):
+        self.draws = 200
+        with pm.Model() as self.model:
+            pm.Normal('x', mu=0, sd=1, shape=ndim)
+
+    def track_time_per_leapfrog(self, ndim):
+        with self.model:
+            step = pm.NUTS()
+            t0 = time.time()
+            trace = pm.sample(self.draws, tune=self.draws, step=step, chains=1,
+                              random_seed=1, progressbar=False,
+                              compute_convergence_checks=False,
+                              discard_tuned_samples=False)
+            elapsed = time.time() - t0
+        return elapsed / trace.get_sampler_stats('tree_size').sum()
+    track_time_per_leapfrog.unit = 's'
+
+
+class VectorizedNUTSSuite(object):
+    """
+    Total draws per second of many chains of a small model, with
+    `VectorizedNUTS` in one process or `NUTS` in one process per core
+    """
+    params = [pm.NUTS, pm.VectorizedNUTS]
+    timer = timeit.default_timer
+
+    def setup(self, step):
+        self.chains = 16
+        self.draws = 200
+        with pm.Model() as self.model:
+            pm.Normal('x', mu=0, sd=1, shape=5)
+
+    def track_draws_per_second(self, step):
+        with self.model:
+            t0 = time.time()
+            pm.sample(self.draws, tune=self.draws, step=step(),
+                      chains=self.chains, random_seed=list(range(self.chains)),
+                      progressbar=False, compute_convergence_checks=False)
+            elapsed = time.time() - t0
+        return 2 * self.draws * self.chains / elapsed
+    track_draws_per_second.unit = 'draws/s'
+
+
 class ExampleSuite(object):
     """Implements examples to keep up with benchmarking them."""
     timeout = 360.0  # give it a few minutes
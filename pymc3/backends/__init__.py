@@ -5,10 +5,16 @@ Available backends
 
 1. NumPy array (pymc3.backends.NDArray)
 2. Text files (pymc3.backends.Text)
-3. SQLite (pymc3.backends.SQLite)
+3. SQLite (pymc3.backends.SQLite and pymc3.backends.SQLiteBlob)
+4. Memory-mapped NumPy array (pymc3.backends.MemmapNDArray)
 
 The NDArray backend holds the entire trace in memory, whereas the Text
-and SQLite backends store the values while sampling.
+and SQLite backends store the values while sampling. SQLiteBlob writes
+chunks of draws of each variable as binary blobs, which is much faster
+than the one column per element of SQLite for large variables. The
+MemmapNDArray backend keeps the arrays of the NDArray backend in files
+that are mapped into memory, so it can hold traces that are larger
+than the available memory.
 
 Selecting a backend
 -------------------
@@ -89,6 +95,13 @@ selection. Three sampling methods of backend will be called:
 - close: This method is called following sampling and should perform any
   actions necessary for finalizing and cleaning up the backend.
 
+Backends that store the values outside of the memory of the sampling
+process can set `supports_worker_recording` and define a `reopen`
+method. With `pymc3.sample(..., record_in_workers=True)`, the worker
+processes of parallel sampling then call the sampling methods above
+themselves, and the main process only calls `reopen` with the chain
+number once the workers are finished.
+
 The base storage class `backends.base.BaseTrace` provides common model
 setup that is used by all the PyMC backends.
 
@@ -111,16 +124,19 @@ object that provides a consistent selection interface for all backends.
 If the traces are stored on disk, then a `load` function should also be
 defined that returns a MultiTrace object.
 
-For specific examples, see pymc3.backends.{ndarray,text,sqlite}.py.
+For specific examples, see pymc3.backends.{ndarray,text,sqlite,memmap}.py.
 """
 from ..backends.ndarray import NDArray, save_trace, load_trace
 from ..backends.text import Text
-from ..backends.sqlite import SQLite
+from ..backends.sqlite import SQLite, SQLiteBlob
 from ..backends.hdf5 import HDF5
+from ..backends.memmap import MemmapNDArray
 
 _shortcuts = {'text': {'backend': Text,
                        'name': 'mcmc'},
               'sqlite': {'backend': SQLite,
                          'name': 'mcmc.sqlite'},
               'hdf5': {'backend': HDF5,
-                       'name': 'mcmc.hdf5'}}
+                       'name': 'mcmc.hdf5'},
+              'memmap': {'backend': MemmapNDArray,
+                         'name': 'mcmc.memmap'}}
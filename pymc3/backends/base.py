@@ -3,6 +3,7 @@
 See the docstring for pymc3.backends for more information (including
 creating custom backends).
 """
+import collections
 import itertools as itl
 import logging
 
@@ -15,6 +16,11 @@ from .report import SamplerReport, merge_reports
 
 logger = logging.getLogger('pymc3')
 
+try:
+    from collections.abc import MutableMapping
+except ImportError:  # Python 2
+    from collections import MutableMapping
+
 
 class BackendError(Exception):
     pass
@@ -37,6 +43,7 @@ class BaseTrace(object):
     """
 
     supports_sampler_stats = False
+    supports_worker_recording = False
 
     def __init__(self, name, model=None, vars=None, test_point=None):
         self.name = name
@@ -128,6 +135,21 @@ class BaseTrace(object):
         """
         pass
 
+    def reopen(self, chain):
+        """Prepare the trace for reading a chain that another process
+        has recorded.
+
+        Backends that set `supports_worker_recording` are set up, filled
+        and closed by the worker processes of parallel sampling, and are
+        only reopened in the main process.
+
+        Parameters
+        ----------
+        chain : int
+            Chain number
+        """
+        raise NotImplementedError
+
     # Selection methods
 
     def __getitem__(self, idx):
@@ -157,6 +179,14 @@ class BaseTrace(object):
         """
         raise NotImplementedError
 
+    def _get_values_range(self, varname, start, stop):
+        """Get the values of the draws `start:stop` of `varname`.
+
+        Backends that can read a range of draws without reading the
+        draws after it should overwrite this.
+        """
+        return self.get_values(varname, burn=start)[:stop - start]
+
     def get_sampler_stats(self, varname, sampler_idx=None, burn=0, thin=1):
         """Get sampler statistics from the trace.
 
@@ -256,9 +286,30 @@ class MultiTrace(object):
     For any methods that require a single trace (e.g., taking the length
     of the MultiTrace instance, which returns the number of draws), the
     trace with the highest chain number is always used.
+
+    A lazy MultiTrace (see `as_lazy`) keeps the arrays returned by
+    `get_values` in a cache of at most `cache_size` entries, from which
+    the least recently used are dropped, and returns them read-only.
+    `point` and `points` then return `PointView` objects that index
+    these arrays, instead of new dictionaries for each draw.
+
+    Parameters
+    ----------
+    straces : list of traces
+        One trace for each chain
+    lazy : bool
+        Cache the values and return views of them from `point` and `points`
+    cache_size : int
+        Maximum number of cached arrays of a lazy MultiTrace
     """
 
-    def __init__(self, straces):
+    def __init__(self, straces, lazy=False, cache_size=16):
+        self._lazy = lazy
+        self._cache_size = cache_size
+        self._cache = collections.OrderedDict()
+        # Counts the changes of the values by `add_values` and
+        # `remove_values`, for the caches of `pm.compare`
+        self._version = 0
         self._straces = {}
         for strace in straces:
             if strace.chain in self._straces:
@@ -319,7 +370,8 @@ class MultiTrace(object):
         raise KeyError("Unknown variable %s" % var)
 
     _attrs = set(['_straces', 'varnames', 'chains', 'stat_names',
-                  'supports_sampler_stats', '_report'])
+                  'supports_sampler_stats', '_report', '_lazy', '_cache',
+                  '_cache_size'])
 
     def __getattr__(self, name):
         # Avoid infinite recursion when called before __init__
@@ -377,6 +429,8 @@ class MultiTrace(object):
             If `False` (default) a ValueError is raised if the variable already exists.
             Change to `True` to overwrite the values of variables
         """
+        self._cache.clear()
+        self._version += 1
         for k, v in vals.items():
             new_var = 1
             if k in self.varnames:
@@ -416,6 +470,8 @@ class MultiTrace(object):
         varnames = self.varnames
         if name not in varnames:
             raise KeyError("Unknown variable {}".format(name))
+        self._cache.clear()
+        self._version += 1
         self.varnames.remove(name)
         chains = self._straces
         for chain in chains.values():
@@ -451,6 +507,17 @@ class MultiTrace(object):
         if chains is None:
             chains = self.chains
         varname = str(varname)
+        if self._lazy:
+            try:
+                chains_key = tuple(chains)
+            except TypeError:  # Single chain passed.
+                chains_key = chains
+            key = (varname, burn, thin, combine, chains_key, squeeze)
+            return self._cached(key, lambda: self._get_values(
+                varname, burn, thin, combine, chains, squeeze))
+        return self._get_values(varname, burn, thin, combine, chains, squeeze)
+
+    def _get_values(self, varname, burn, thin, combine, chains, squeeze):
         try:
             results = [self._straces[chain].get_values(varname, burn, thin)
                        for chain in chains]
@@ -458,6 +525,35 @@ class MultiTrace(object):
             results = [self._straces[chains].get_values(varname, burn, thin)]
         return _squeeze_cat(results, combine, squeeze)
 
+    def _cached(self, key, compute):
+        """Return the cached value for `key`, computing it if needed, and
+        drop the least recently used values beyond `cache_size`."""
+        try:
+            value = self._cache.pop(key)
+        except KeyError:
+            value = compute()
+            if isinstance(value, list):
+                value = [_read_only(array) for array in value]
+            else:
+                value = _read_only(value)
+        self._cache[key] = value
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return value
+
+    def as_lazy(self, cache_size=16):
+        """Return a lazy MultiTrace with the same chains.
+
+        Parameters
+        ----------
+        cache_size : int
+            Maximum number of arrays kept in the cache.
+        """
+        trace = MultiTrace(self._straces.values(), lazy=True,
+                           cache_size=cache_size)
+        trace._report = self._report
+        return trace
+
     def get_sampler_stats(self, varname, burn=0, thin=1, combine=True,
                           chains=None, squeeze=True):
         """Get sampler statistics from the trace.
@@ -494,7 +590,8 @@ class MultiTrace(object):
     def _slice(self, slice):
         """Return a new MultiTrace object sliced according to `slice`."""
         new_traces = [trace._slice(slice) for trace in self._straces.values()]
-        trace = MultiTrace(new_traces)
+        trace = MultiTrace(new_traces, lazy=self._lazy,
+                           cache_size=self._cache_size)
         idxs = slice.indices(len(self))
         trace._report = self._report._slice(*idxs)
         return trace
@@ -510,6 +607,8 @@ class MultiTrace(object):
         """
         if chain is None:
             chain = self.chains[-1]
+        if self._lazy:
+            return PointView(_ChainValues(self, chain), int(idx))
         return self._straces[chain].point(idx)
 
     def points(self, chains=None):
@@ -524,8 +623,104 @@ class MultiTrace(object):
         if chains is None:
             chains = self.chains
 
+        if self._lazy:
+            return itl.chain.from_iterable(self._point_views(chain)
+                                           for chain in chains)
         return itl.chain.from_iterable(self._straces[chain] for chain in chains)
 
+    def _point_views(self, chain):
+        values = _ChainValues(self, chain)
+        # Keep the arrays of the chain while iterating over it, so that
+        # they are not evicted from the cache for every point
+        values.pin()
+        try:
+            for idx in range(len(self._straces[chain])):
+                yield PointView(values, idx)
+        finally:
+            values.unpin()
+
+
+class _ChainValues(object):
+    """Values of the variables of one chain of a lazy MultiTrace.
+
+    The values are loaded through the cache of the MultiTrace, so that
+    at most `cache_size` arrays are kept in memory. Between `pin` and
+    `unpin`, the arrays that were loaded are also kept here, so that
+    iterating over the points of the chain loads each of them only once.
+    """
+
+    def __init__(self, mtrace, chain):
+        self.mtrace = mtrace
+        self.chain = chain
+        self.varnames = mtrace._straces[chain].varnames
+        self._pinned = None
+
+    def pin(self):
+        self._pinned = {}
+
+    def unpin(self):
+        self._pinned = None
+
+    def __getitem__(self, varname):
+        if self._pinned is not None and varname in self._pinned:
+            return self._pinned[varname]
+        values = self.mtrace.get_values(varname, chains=self.chain,
+                                        combine=False)
+        if self._pinned is not None:
+            self._pinned[varname] = values
+        return values
+
+
+class PointView(MutableMapping):
+    """View of the values of all variables at one draw of a chain, which
+    can be used like the dictionary returned by `point`.
+
+    The values are read-only views into the cached arrays of the trace.
+    Assigning or deleting an item first copies the values into a
+    dictionary that belongs to the view, and leaves the trace unchanged.
+    """
+
+    def __init__(self, values, idx):
+        self._values = values
+        self._idx = idx
+        self._point = None
+
+    def __getitem__(self, varname):
+        if self._point is not None:
+            return self._point[varname]
+        if varname not in self._values.varnames:
+            raise KeyError(varname)
+        return self._values[varname][self._idx]
+
+    def __setitem__(self, varname, value):
+        self._copy_values()[varname] = value
+
+    def __delitem__(self, varname):
+        del self._copy_values()[varname]
+
+    def __iter__(self):
+        if self._point is not None:
+            return iter(self._point)
+        return iter(self._values.varnames)
+
+    def __len__(self):
+        if self._point is not None:
+            return len(self._point)
+        return len(self._values.varnames)
+
+    def _copy_values(self):
+        if self._point is None:
+            self._point = {varname: np.array(self[varname])
+                           for varname in self._values.varnames}
+        return self._point
+
+    def copy(self):
+        """Return the values as a new dictionary."""
+        return {varname: np.array(value) for varname, value in self.items()}
+
+    def __repr__(self):
+        return '{}({})'.format(type(self).__name__, dict(self))
+
 
 def merge_traces(mtraces):
     """Merge MultiTrace objects.
@@ -553,6 +748,14 @@ def merge_traces(mtraces):
     return base_mtrace
 
 
+def _read_only(array):
+    """Return a read-only view of `array`, which leaves `array` itself
+    writeable."""
+    view = np.asarray(array).view()
+    view.flags.writeable = False
+    return view
+
+
 def _squeeze_cat(results, combine, squeeze):
     """Squeeze and concatenate the results depending on values of
     `combine` and `squeeze`."""
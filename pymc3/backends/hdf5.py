@@ -1,3 +1,6 @@
+import os
+
+import numpy as np
 from ..backends import base, ndarray
 import h5py
 from contextlib import contextmanager
@@ -9,7 +12,7 @@ def activator(instance):
             yield
             return
     # if file is closed/not referenced: open, do job, then close
-    instance.hdf5_file = h5py.File(instance.name, 'a')
+    instance.hdf5_file = h5py.File(instance.filename, 'a')
     yield
     instance.hdf5_file.close()
     return
@@ -29,17 +32,55 @@ class HDF5(base.BaseTrace):
         `model.unobserved_RVs` is used.
     test_point : dict
         use different test point that might be with changed variables shapes
+    buffer_size : int
+        Number of draws that are collected in memory before they are
+        written to the file.
+    chunk_draws : int
+        Number of draws in one HDF5 chunk of the datasets. If None,
+        `buffer_size` is used.
+    compression : str or int
+        Compression filter of the datasets, e.g. 'gzip' or 'lzf'. See
+        `h5py.Group.create_dataset`.
+    compression_opts
+        Options of the compression filter, e.g. the level of gzip.
+    chain_files : bool
+        Store each chain in a separate file next to `name`, which is
+        linked into `name` when the chain is reopened. This allows the
+        worker processes of parallel sampling to record the chains.
         """
 
     supports_sampler_stats = True
 
-    def __init__(self, name=None, model=None, vars=None, test_point=None):
+    def __init__(self, name=None, model=None, vars=None, test_point=None,
+                 buffer_size=100, chunk_draws=None, compression=None,
+                 compression_opts=None, chain_files=False):
         self.hdf5_file = None
         self.draw_idx = 0
         self.draws = None
+        if buffer_size < 1:
+            raise ValueError('buffer_size must be positive.')
+        self.buffer_size = buffer_size
+        if chunk_draws is None:
+            chunk_draws = buffer_size
+        self.chunk_draws = chunk_draws
+        self.compression = compression
+        self.compression_opts = compression_opts
+        self.chain_files = chain_files
+        self.supports_worker_recording = chain_files
+        self._buffer = None
+        self._stats_buffer = None
+        self._buffer_idx = 0
+        self._records_stats = False
         super(HDF5, self).__init__(name, model, vars, test_point)
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # h5py files can not be pickled, they are opened again when needed.
+        state['hdf5_file'] = None
+        return state
+
     def _get_sampler_stats(self, varname, sampler_idx, burn, thin):
+        self._flush()
         with self.activate_file:
             return self.stats[str(sampler_idx)][varname][burn::thin]
 
@@ -47,6 +88,22 @@ class HDF5(base.BaseTrace):
     def activate_file(self):
         return activator(self)
 
+    @property
+    def filename(self):
+        """Name of the file that holds the current chain."""
+        if self.chain_files and self.chain is not None:
+            root, ext = os.path.splitext(self.name)
+            return '{}.chain-{}{}'.format(root, self.chain, ext)
+        return self.name
+
+    def _create_dataset(self, group, name, shape, dtype):
+        chunks = (self.chunk_draws, ) + tuple(max(dim, 1) for dim in shape)
+        return group.create_dataset(name=name, shape=(self.draws, ) + shape,
+                                    dtype=dtype, maxshape=(None, ) + shape,
+                                    chunks=chunks,
+                                    compression=self.compression,
+                                    compression_opts=self.compression_opts)
+
     @property
     def samples(self):
         g = self.hdf5_file.require_group(str(self.chain))
@@ -123,7 +180,7 @@ class HDF5(base.BaseTrace):
                 if not data.keys():  # no pre-recorded stats
                     for varname, dtype in sampler.items():
                         if varname not in data:
-                            data.create_dataset(varname, (self.draws,), dtype=dtype, maxshape=(None,))
+                            self._create_dataset(data, varname, (), dtype)
                 elif data.keys() != sampler.keys():
                     raise ValueError(
                         "Sampler vars can't change, names incompatible: {} != {}".format(data.keys(), sampler.keys()))
@@ -142,21 +199,34 @@ class HDF5(base.BaseTrace):
             Names and dtypes of the variables that are
             exported by the samplers.
         """
+        self._flush()
         self.chain = chain
         with self.activate_file:
-            for varname, shape in self.var_shapes.items():
-                if varname not in self.samples:
-                    self.samples.create_dataset(name=varname, shape=(draws, ) + shape,
-                                                dtype=self.var_dtypes[varname],
-                                                maxshape=(None, ) + shape)
             self.draw_idx = len(self)
             self.draws = self.draw_idx + draws
+            for varname, shape in self.var_shapes.items():
+                if varname not in self.samples:
+                    self._create_dataset(self.samples, varname, shape,
+                                         self.var_dtypes[varname])
             self._set_sampler_vars(sampler_vars)
             self._is_base_setup = True
+            self._records_stats = self.records_stats
             self._resize(self.draws)
 
+        self._buffer = {varname: np.empty((self.buffer_size, ) + shape,
+                                          dtype=self.var_dtypes[varname])
+                        for varname, shape in self.var_shapes.items()}
+        if sampler_vars is None:
+            self._stats_buffer = None
+        else:
+            self._stats_buffer = [
+                {varname: np.empty(self.buffer_size, dtype=dtype)
+                 for varname, dtype in sampler.items()}
+                for sampler in sampler_vars]
+        self._buffer_idx = 0
 
     def close(self):
+        self._flush()
         with self.activate_file:
             if self.draw_idx == self.draws:
                 return
@@ -164,28 +234,89 @@ class HDF5(base.BaseTrace):
             # draws.
             self._resize(self.draw_idx)
 
-    def record(self, point, sampler_stats=None):
+    def reopen(self, chain):
+        """Prepare the trace for reading a chain that another process
+        has recorded.
+
+        With `chain_files`, the file of the chain is linked into the
+        file `name`.
+
+        Parameters
+        ----------
+        chain : int
+            Chain number
+        """
+        self.chain = chain
         with self.activate_file:
-            for varname, value in zip(self.varnames, self.fn(point)):
-                self.samples[varname][self.draw_idx] = value
+            self.draw_idx = self.draws = len(self.samples[self.varnames[0]])
+        if self.chain_files:
+            with h5py.File(self.name, 'a') as hdf5_file:
+                if str(chain) not in hdf5_file:
+                    hdf5_file[str(chain)] = h5py.ExternalLink(
+                        os.path.basename(self.filename), '/' + str(chain))
 
-            if self.records_stats and sampler_stats is None:
-                raise ValueError("Expected sampler_stats")
-            if not self.records_stats and sampler_stats is not None:
-                raise ValueError("Unknown sampler_stats")
-            if sampler_stats is not None:
-                for i, vars in enumerate(sampler_stats):
-                    data = self.stats[str(i)]
-                    for key, val in vars.items():
-                        data[key][self.draw_idx] = val
+    def record(self, point, sampler_stats=None):
+        """Record results of a sampling iteration.
 
-            self.draw_idx += 1
+        The values are written to the file when `buffer_size` draws
+        are recorded, or when the trace is closed or read from.
+
+        Parameters
+        ----------
+        point : dict
+            Values mapped to variable names
+        """
+        if self._records_stats and sampler_stats is None:
+            raise ValueError("Expected sampler_stats")
+        if not self._records_stats and sampler_stats is not None:
+            raise ValueError("Unknown sampler_stats")
+
+        for varname, value in zip(self.varnames, self.fn(point)):
+            self._buffer[varname][self._buffer_idx] = value
+        if sampler_stats is not None:
+            for data, vars in zip(self._stats_buffer, sampler_stats):
+                for key, val in vars.items():
+                    data[key][self._buffer_idx] = val
+
+        self._buffer_idx += 1
+        self.draw_idx += 1
+        if self._buffer_idx == self.buffer_size:
+            self._flush()
+
+    def _flush(self):
+        """Write the buffered draws to the file."""
+        if not self._buffer_idx:
+            return
+        start = self.draw_idx - self._buffer_idx
+        with self.activate_file:
+            if self.draw_idx > self.draws:
+                self.draws = self.draw_idx
+                self._resize(self.draws)
+            samples = self.samples
+            for varname, values in self._buffer.items():
+                samples[varname][start:self.draw_idx] = \
+                    values[:self._buffer_idx]
+            if self._stats_buffer is not None:
+                stats = self.stats
+                for i, data in enumerate(self._stats_buffer):
+                    group = stats[str(i)]
+                    for key, values in data.items():
+                        group[key][start:self.draw_idx] = \
+                            values[:self._buffer_idx]
+        self._buffer_idx = 0
 
     def get_values(self, varname, burn=0, thin=1):
+        self._flush()
         with self.activate_file:
             return self.samples[varname][burn::thin]
 
+    def _get_values_range(self, varname, start, stop):
+        self._flush()
+        with self.activate_file:
+            return self.samples[varname][start:stop]
+
     def _slice(self, idx):
+        self._flush()
         with self.activate_file:
             start, stop, step = idx.indices(len(self))
             sliced = ndarray.NDArray(model=self.model, vars=self.vars)
@@ -196,6 +327,7 @@ class HDF5(base.BaseTrace):
             return sliced
 
     def point(self, idx):
+        self._flush()
         with self.activate_file:
             idx = int(idx)
             r = {}
@@ -226,6 +358,6 @@ def load(name, model=None):
     straces = []
     for chain in HDF5(name, model=model).chains:
         trace = HDF5(name, model=model)
-        trace.chain = chain
+        trace.reopen(chain)
         straces.append(trace)
     return base.MultiTrace(straces)
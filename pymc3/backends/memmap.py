@@ -0,0 +1,361 @@
+"""Memory-mapped NumPy array trace backend
+
+Store sampling values in NumPy arrays that are mapped to files, so that
+traces which do not fit into memory can be sampled and analysed.
+
+File format
+-----------
+
+The values of each chain are saved in a separate directory (under a
+directory specified by the `name` argument).  Each variable and each
+sampler statistic is stored in a raw binary file, in C order with the
+draws along the first axis.  A metadata json file holds the number of
+recorded draws and the shapes and dtypes of the variables and sampler
+statistics.  The files grow in chunks of `chunk_size` draws while
+sampling, so they can be larger than the number of recorded draws.
+"""
+import glob
+import json
+import os
+
+import numpy as np
+from ..backends import base, ndarray
+
+
+class MemmapNDArray(ndarray.NDArray):
+    """Memory-mapped NDArray trace object
+
+    The values are stored in `numpy.memmap` arrays, and `get_values`,
+    `point` and slicing return views of these arrays instead of copies.
+
+    Parameters
+    ----------
+    name : str
+        Name of directory to store the array files in
+    model : Model
+        If None, the model is taken from the `with` context.
+    vars : list of variables
+        Sampling values will be stored for these variables. If None,
+        `model.unobserved_RVs` is used.
+    test_point : dict
+        use different test point that might be with changed variables shapes
+    chunk_size : int
+        Number of draws by which the files grow when they are full.
+    """
+
+    supports_worker_recording = True
+    metadata_file = 'metadata.json'
+
+    def __init__(self, name, model=None, vars=None, test_point=None,
+                 chunk_size=1000):
+        if not os.path.exists(name):
+            os.mkdir(name)
+        super(MemmapNDArray, self).__init__(name, model, vars, test_point)
+        if chunk_size < 1:
+            raise ValueError('chunk_size must be positive.')
+        self.chunk_size = chunk_size
+        self.directory = None
+        self._capacity = 0
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # Do not copy the values, the arrays are mapped again when unpickled.
+        state['samples'] = {}
+        state['_stats'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.directory is not None:
+            self._map_arrays(self.draw_idx, mode='c')
+
+    # Sampling methods
+
+    def setup(self, draws, chain, sampler_vars=None):
+        """Perform chain-specific setup.
+
+        If the directory of the chain already contains values, the new
+        draws are appended to them.
+
+        Parameters
+        ----------
+        draws : int
+            Expected number of draws
+        chain : int
+            Chain number
+        sampler_vars : list of dicts
+            Names and dtypes of the variables that are
+            exported by the samplers.
+        """
+        # Store the draws of a previous setup before resuming
+        self.close()
+        base.BaseTrace.setup(self, draws, chain, sampler_vars)
+
+        self.chain = chain
+        self.directory = os.path.join(self.name, 'chain-{}'.format(chain))
+        metadata = self._read_metadata()
+        if metadata is None:
+            if not os.path.exists(self.directory):
+                os.mkdir(self.directory)
+            self.draw_idx = 0
+        else:
+            self._check_metadata(metadata)
+            self.draw_idx = metadata['draw_idx']
+        self.draws = self.draw_idx + draws
+
+        self._map_arrays(self.draw_idx + min(draws, self.chunk_size))
+        self._write_metadata()
+
+    def record(self, point, sampler_stats=None):
+        """Record results of a sampling iteration.
+
+        Parameters
+        ----------
+        point : dict
+            Values mapped to variable names
+        """
+        if self.draw_idx == self._capacity:
+            self._map_arrays(self._capacity + self.chunk_size)
+            self._write_metadata()
+        super(MemmapNDArray, self).record(point, sampler_stats)
+
+    def close(self):
+        if self.directory is None:
+            return
+        for values in self._arrays():
+            if isinstance(values, np.memmap):
+                values.flush()
+        self._write_metadata()
+
+    def reopen(self, chain):
+        """Prepare the trace for reading a chain that another process
+        has recorded.
+
+        Parameters
+        ----------
+        chain : int
+            Chain number
+        """
+        self.chain = chain
+        self.directory = os.path.join(self.name, 'chain-{}'.format(chain))
+        metadata = self._read_metadata()
+        if metadata is None:
+            raise base.BackendError(
+                "No values for chain {} in '{}'.".format(chain, self.name))
+        self._check_metadata(metadata, check_sampler_vars=False)
+        self.sampler_vars = _sampler_vars_from_json(metadata['sampler_vars'])
+        self._is_base_setup = True
+        self.draw_idx = self.draws = metadata['draw_idx']
+        self._map_arrays(self.draw_idx, mode='c')
+
+    # Selection methods
+
+    def get_values(self, varname, burn=0, thin=1):
+        """Get values from trace.
+
+        Parameters
+        ----------
+        varname : str
+        burn : int
+        thin : int
+
+        Returns
+        -------
+        A view of the memory-mapped array
+        """
+        return self.samples[varname][:self.draw_idx][burn::thin]
+
+    def _get_sampler_stats(self, varname, sampler_idx, burn, thin):
+        return self._stats[sampler_idx][varname][:self.draw_idx][burn::thin]
+
+    def point(self, idx):
+        """Return dictionary of point values at `idx` for current chain
+        with variable names as keys.
+        """
+        idx = int(idx)
+        return {varname: values[:self.draw_idx][idx]
+                for varname, values in self.samples.items()}
+
+    # File handling
+
+    def _arrays(self):
+        for values in self.samples.values():
+            yield values
+        for stats in self._stats or []:
+            for values in stats.values():
+                yield values
+
+    def _map_arrays(self, capacity, mode='r+'):
+        """Map the first `capacity` draws of all files of the chain.
+
+        With `mode='r+'` the files are grown to `capacity` draws if
+        they are smaller. Other modes are passed to `numpy.memmap` and
+        need the files to be large enough.
+        """
+        self.samples = {}
+        for varname in self.varnames:
+            path = os.path.join(self.directory, '{}.bin'.format(varname))
+            self.samples[varname] = _map_file(
+                path, self.var_dtypes[varname], self.var_shapes[varname],
+                capacity, mode)
+
+        if self.sampler_vars is None:
+            self._stats = None
+        else:
+            self._stats = []
+            for sampler_idx, sampler in enumerate(self.sampler_vars):
+                data = dict()
+                self._stats.append(data)
+                for varname, dtype in sampler.items():
+                    path = os.path.join(
+                        self.directory,
+                        'stats-{}-{}.bin'.format(sampler_idx, varname))
+                    data[varname] = _map_file(path, dtype, (), capacity, mode)
+        self._capacity = capacity
+
+    def _read_metadata(self):
+        path = os.path.join(self.directory, self.metadata_file)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as buff:
+            return json.load(buff)
+
+    def _write_metadata(self):
+        metadata = {
+            'draw_idx': self.draw_idx,
+            'var_shapes': {varname: list(shape)
+                           for varname, shape in self.var_shapes.items()},
+            'var_dtypes': {varname: np.dtype(dtype).str
+                           for varname, dtype in self.var_dtypes.items()},
+            'sampler_vars': _sampler_vars_to_json(self.sampler_vars),
+        }
+        path = os.path.join(self.directory, self.metadata_file)
+        with open(path, 'w') as buff:
+            json.dump(metadata, buff)
+
+    def _check_metadata(self, metadata, check_sampler_vars=True):
+        for varname in self.varnames:
+            shape = metadata['var_shapes'].get(varname)
+            dtype = metadata['var_dtypes'].get(varname)
+            if (shape is None or
+                    tuple(shape) != tuple(self.var_shapes[varname]) or
+                    np.dtype(dtype) != np.dtype(self.var_dtypes[varname])):
+                raise base.BackendError(
+                    "Previous trace in '{}' has different variables "
+                    "than current model.".format(self.directory))
+        if (check_sampler_vars and metadata['sampler_vars'] !=
+                _sampler_vars_to_json(self.sampler_vars)):
+            raise ValueError("Sampler vars can't change")
+
+
+def _map_file(path, dtype, shape, capacity, mode):
+    dtype = np.dtype(dtype)
+    shape = (capacity,) + tuple(shape)
+    nbytes = int(np.prod(shape)) * dtype.itemsize
+    if nbytes == 0:
+        # Empty files can not be mapped
+        return np.zeros(shape, dtype=dtype)
+    if mode == 'r+':
+        with open(path, 'ab') as buff:
+            if os.path.getsize(path) < nbytes:
+                buff.truncate(nbytes)
+    return np.memmap(path, dtype=dtype, mode=mode, shape=shape)
+
+
+def _sampler_vars_to_json(sampler_vars):
+    if sampler_vars is None:
+        return None
+    return [{varname: np.dtype(dtype).str for varname, dtype in vars.items()}
+            for vars in sampler_vars]
+
+
+def _sampler_vars_from_json(sampler_vars):
+    if sampler_vars is None:
+        return None
+    return [{varname: np.dtype(dtype) for varname, dtype in vars.items()}
+            for vars in sampler_vars]
+
+
+def load(name, model=None):
+    """Load memory-mapped NDArray database.
+
+    The values are only read from the files when they are accessed.
+
+    Parameters
+    ----------
+    name : str
+        Name of directory with the chain directories
+    model : Model
+        If None, the model is taken from the `with` context.
+
+    Returns
+    -------
+    A MultiTrace instance
+    """
+    directories = glob.glob(os.path.join(name, 'chain-*'))
+
+    if len(directories) == 0:
+        raise ValueError('No chains present in directory {}'.format(name))
+
+    straces = []
+    for directory in directories:
+        chain = int(directory.rsplit('-', 1)[1])
+        strace = MemmapNDArray(name, model=model)
+        strace.reopen(chain)
+        straces.append(strace)
+    return base.MultiTrace(straces)
+
+
+def dump(name, trace, chains=None):
+    """Store values from a MultiTrace in memory-mapped NDArray files.
+
+    The values are written one variable and chain at a time.
+
+    Parameters
+    ----------
+    name : str
+        Name of directory to store the chain directories in
+    trace : MultiTrace
+        Result of MCMC run
+    chains : list
+        Chains to dump. If None, all chains are dumped.
+    """
+    if not os.path.exists(name):
+        os.mkdir(name)
+    if chains is None:
+        chains = trace.chains
+
+    for chain in chains:
+        strace = trace._straces[chain]
+        directory = os.path.join(name, 'chain-{}'.format(chain))
+        if not os.path.exists(directory):
+            os.mkdir(directory)
+
+        var_shapes = {}
+        var_dtypes = {}
+        for varname in strace.varnames:
+            values = np.ascontiguousarray(strace.get_values(varname))
+            var_shapes[varname] = list(values.shape[1:])
+            var_dtypes[varname] = values.dtype.str
+            values.tofile(os.path.join(directory, '{}.bin'.format(varname)))
+
+        sampler_vars = None
+        if strace.supports_sampler_stats and strace.sampler_vars is not None:
+            sampler_vars = _sampler_vars_to_json(strace.sampler_vars)
+            for sampler_idx, vars in enumerate(strace.sampler_vars):
+                for varname in vars:
+                    values = strace.get_sampler_stats(varname, sampler_idx)
+                    path = os.path.join(
+                        directory,
+                        'stats-{}-{}.bin'.format(sampler_idx, varname))
+                    np.ascontiguousarray(values).tofile(path)
+
+        metadata = {
+            'draw_idx': len(strace),
+            'var_shapes': var_shapes,
+            'var_dtypes': var_dtypes,
+            'sampler_vars': sampler_vars,
+        }
+        with open(os.path.join(directory, MemmapNDArray.metadata_file),
+                  'w') as buff:
+            json.dump(metadata, buff)
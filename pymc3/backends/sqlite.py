@@ -15,6 +15,17 @@ For example, a variable with the shape (2, 2) would be stored as
 
 The key is autoincremented each time a new row is added to the table.
 The chain column denotes the chain index and starts at 0.
+
+Blob format
+-----------
+The `SQLiteBlob` backend instead stores chunks of draws. For each
+variable, a table is created with the following format:
+
+ recid (INT), chain (INT), draw (INT), n_draws (INT), data (BLOB)
+
+Each row holds the values of `n_draws` consecutive draws, starting with
+`draw`, as the raw bytes of a C-ordered array with the shape and dtype
+of the variable.
 """
 import numpy as np
 import sqlite3
@@ -50,10 +61,37 @@ TEMPLATES = {
                          'AND (draw - (SELECT draw FROM [{table}] '
                          'WHERE (chain = :chain) AND (draw > :burn) '
                          'ORDER BY draw LIMIT 1)) % :thin = 0'),
+    'select_range':     ('SELECT * FROM [{table}] '
+                         'WHERE (chain = :chain) AND (draw >= :start) '
+                         'AND (draw < :stop)'),
     'select_point':     ('SELECT * FROM [{table}] '
                          'WHERE (chain = :chain) AND (draw = :draw)'),
 }
 
+BLOB_TEMPLATES = {
+    'table':            ('CREATE TABLE IF NOT EXISTS [{table}] '
+                         '(recid INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT, '
+                         'chain INT(5), draw INTEGER, n_draws INTEGER, '
+                         'data BLOB)'),
+    'index':            ('CREATE INDEX IF NOT EXISTS [{table}_chain_draw] '
+                         'ON [{table}] (chain, draw)'),
+    'insert':           ('INSERT INTO [{table}] '
+                         '(recid, chain, draw, n_draws, data) '
+                         'VALUES (NULL, ?, ?, ?, ?)'),
+    'draw_count':       ('SELECT SUM(n_draws) FROM [{table}] '
+                         'WHERE chain = ?'),
+    'select':           ('SELECT draw, data FROM [{table}] '
+                         'WHERE (chain = :chain) AND '
+                         '(draw + n_draws > :burn) ORDER BY draw'),
+    'select_range':     ('SELECT draw, data FROM [{table}] '
+                         'WHERE (chain = :chain) AND '
+                         '(draw + n_draws > :start) AND (draw < :stop) '
+                         'ORDER BY draw'),
+    'select_point':     ('SELECT draw, data FROM [{table}] '
+                         'WHERE (chain = :chain) AND (draw <= :draw) AND '
+                         '(draw + n_draws > :draw)'),
+}
+
 sqlite3.register_adapter(np.int32, int)
 sqlite3.register_adapter(np.int64, int)
 
@@ -74,6 +112,8 @@ class SQLite(base.BaseTrace):
         use different test point that might be with changed variables shapes
     """
 
+    supports_worker_recording = True
+
     def __init__(self, name, model=None, vars=None, test_point=None):
         super(SQLite, self).__init__(name, model, vars, test_point)
         self._var_cols = {}
@@ -167,6 +207,22 @@ class SQLite(base.BaseTrace):
         self._execute_queue()
         self.db.close()
 
+    def reopen(self, chain):
+        """Prepare the trace for reading a chain that another process
+        has recorded.
+
+        Parameters
+        ----------
+        chain : int
+            Chain number
+        """
+        self.db.connect()
+        self.chain = chain
+        self._var_cols = {varname: ttab.create_flat_names('v', shape)
+                          for varname, shape in self.var_shapes.items()}
+        self._is_setup = self.varnames[0] in _get_table_list(self.db.cursor)
+        self._len = None
+
     # Selection methods
 
     def __len__(self):
@@ -242,6 +298,14 @@ class SQLite(base.BaseTrace):
         values = _rows_to_ndarray(self.db.cursor)
         return values.reshape(shape)
 
+    def _get_values_range(self, varname, start, stop):
+        self.db.connect()
+        statement = TEMPLATES['select_range'].format(table=str(varname))
+        self.db.cursor.execute(statement, {'chain': self.chain,
+                                           'start': start, 'stop': stop})
+        values = _rows_to_ndarray(self.db.cursor)
+        return values.reshape((-1,) + self.var_shapes[varname])
+
     def _slice(self, idx):
         if idx.stop is not None:
             raise ValueError('Stop value in slice not supported.')
@@ -266,10 +330,227 @@ class SQLite(base.BaseTrace):
         return var_values
 
 
+class SQLiteBlob(SQLite):
+    """SQLite trace object that stores chunks of draws as binary blobs
+
+    The draws of each variable are collected in an array and written as
+    a single row when `chunk_size` draws are recorded. The database uses
+    write-ahead logging, so other processes can read and write while a
+    chain is recorded.
+
+    Parameters
+    ----------
+    name : str
+        Name of database file
+    model : Model
+        If None, the model is taken from the `with` context.
+    vars : list of variables
+        Sampling values will be stored for these variables. If None,
+        `model.unobserved_RVs` is used.
+    test_point : dict
+        use different test point that might be with changed variables shapes
+    chunk_size : int
+        Number of draws stored in one row.
+    """
+
+    def __init__(self, name, model=None, vars=None, test_point=None,
+                 chunk_size=100):
+        super(SQLiteBlob, self).__init__(name, model, vars, test_point)
+        if chunk_size < 1:
+            raise ValueError('chunk_size must be positive.')
+        self.chunk_size = chunk_size
+        # Keep the statements of all variables in the statement cache.
+        self.db = _SQLiteDB(name, wal=True,
+                            cached_statements=10 * len(self.varnames) + 100)
+        self._queue = None
+        self._queue_idx = 0
+
+    # Sampling methods
+
+    def setup(self, draws, chain):
+        """Perform chain-specific setup.
+
+        Parameters
+        ----------
+        draws : int
+            Expected number of draws
+        chain : int
+            Chain number
+        """
+        self.db.connect()
+        if self._queue is not None:
+            self._execute_queue()
+        self.chain = chain
+
+        if self._is_setup:
+            self._len = None
+            self.draw_idx = len(self)
+        else:  # Table has not been created.
+            self._create_table()
+            self._is_setup = True
+            self.draw_idx = 0
+        self._create_insert_queries()
+
+        self._queue = {varname: np.empty((self.chunk_size,) + shape,
+                                         dtype=self.var_dtypes[varname])
+                       for varname, shape in self.var_shapes.items()}
+        self._queue_idx = 0
+
+    def _create_table(self):
+        with self.db.con:
+            for varname in self.varnames:
+                self.db.cursor.execute(
+                    BLOB_TEMPLATES['table'].format(table=varname))
+                self.db.cursor.execute(
+                    BLOB_TEMPLATES['index'].format(table=varname))
+
+    def _create_insert_queries(self):
+        for varname in self.varnames:
+            self.var_inserts[varname] = BLOB_TEMPLATES['insert'].format(
+                table=varname)
+
+    def record(self, point):
+        """Record results of a sampling iteration.
+
+        Parameters
+        ----------
+        point : dict
+            Values mapped to variable names
+        """
+        for varname, value in zip(self.varnames, self.fn(point)):
+            self._queue[varname][self._queue_idx] = value
+        self._queue_idx += 1
+        self.draw_idx += 1
+
+        if self._queue_idx == self.chunk_size:
+            self._execute_queue()
+
+    def _execute_queue(self):
+        if not self._queue_idx:
+            return
+        draw = self.draw_idx - self._queue_idx
+        with self.db.con:
+            for varname in self.varnames:
+                data = self._queue[varname][:self._queue_idx].tobytes()
+                self.db.cursor.execute(
+                    self.var_inserts[varname],
+                    (self.chain, draw, self._queue_idx, sqlite3.Binary(data)))
+        self._queue_idx = 0
+        self._len = None
+
+    def reopen(self, chain):
+        """Prepare the trace for reading a chain that another process
+        has recorded.
+
+        Parameters
+        ----------
+        chain : int
+            Chain number
+        """
+        self.db.connect()
+        self.chain = chain
+        self._is_setup = self.varnames[0] in _get_table_list(self.db.cursor)
+        self._len = None
+
+    # Selection methods
+
+    def _get_number_draws(self):
+        self.db.connect()
+        statement = BLOB_TEMPLATES['draw_count'].format(table=self.varnames[0])
+        self.db.cursor.execute(statement, (self.chain,))
+        counts = self.db.cursor.fetchall()[0][0]
+        if counts is None:
+            return 0
+        else:
+            return counts
+
+    def get_values(self, varname, burn=0, thin=1):
+        """Get values from trace.
+
+        Parameters
+        ----------
+        varname : str
+        burn : int
+        thin : int
+
+        Returns
+        -------
+        A NumPy array
+        """
+        if burn is None:
+            burn = 0
+        if thin is None:
+            thin = 1
+
+        if burn < 0:
+            burn = max(0, len(self) + burn)
+        if thin < 1:
+            raise ValueError('Only positive thin values are supported '
+                             'in SQLite backend.')
+        varname = str(varname)
+
+        self.db.connect()
+        statement = BLOB_TEMPLATES['select'].format(table=varname)
+        self.db.cursor.execute(statement, {'chain': self.chain, 'burn': burn})
+        rows = self.db.cursor.fetchall()
+        values = self._blobs_to_ndarray(varname, [row[1] for row in rows])
+        # Only skip the draws before `burn` in the first chunk
+        if rows:
+            burn -= rows[0][0]
+        return values[burn::thin]
+
+    def _get_values_range(self, varname, start, stop):
+        self.db.connect()
+        statement = BLOB_TEMPLATES['select_range'].format(table=str(varname))
+        self.db.cursor.execute(statement, {'chain': self.chain,
+                                           'start': start, 'stop': stop})
+        rows = self.db.cursor.fetchall()
+        values = self._blobs_to_ndarray(varname, [row[1] for row in rows])
+        # The first chunk can start before `start`
+        offset = start - rows[0][0] if rows else 0
+        return values[offset:offset + stop - start]
+
+    def point(self, idx):
+        """Return dictionary of point values at `idx` for current chain
+        with variables names as keys.
+        """
+        idx = int(idx)
+        if idx < 0:
+            idx = len(self) + idx
+        statement = BLOB_TEMPLATES['select_point']
+        self.db.connect()
+        var_values = {}
+        statement_args = {'chain': self.chain, 'draw': idx}
+        for varname in self.varnames:
+            self.db.cursor.execute(statement.format(table=varname),
+                                   statement_args)
+            rows = self.db.cursor.fetchall()
+            if not rows:
+                raise IndexError('Draw {} is not in the trace.'.format(idx))
+            draw, data = rows[0]
+            values = self._blobs_to_ndarray(varname, [data])
+            var_values[varname] = values[idx - draw]
+        return var_values
+
+    def _blobs_to_ndarray(self, varname, blobs):
+        """Convert the blobs of consecutive chunks of draws to NDArray."""
+        dtype = np.dtype(self.var_dtypes[varname])
+        values = np.empty(sum(len(blob) for blob in blobs) // dtype.itemsize,
+                          dtype=dtype)
+        start = 0
+        for blob in blobs:
+            chunk = np.frombuffer(blob, dtype=dtype)
+            values[start:start + chunk.size] = chunk
+            start += chunk.size
+        return values.reshape((-1,) + self.var_shapes[varname])
+
+
 class _SQLiteDB(object):
 
-    def __init__(self, name):
+    def __init__(self, name, wal=False, cached_statements=100):
         self.name = name
+        self.wal = wal
+        self.cached_statements = cached_statements
         self.con = None
         self.cursor = None
         self.connected = False
@@ -277,9 +558,13 @@ class _SQLiteDB(object):
     def connect(self):
         if self.connected:
             return
-        self.con = sqlite3.connect(self.name)
+        self.con = sqlite3.connect(
+            self.name, cached_statements=self.cached_statements)
         self.connected = True
         self.cursor = self.con.cursor()
+        if self.wal:
+            self.cursor.execute('PRAGMA journal_mode=WAL')
+            self.cursor.execute('PRAGMA synchronous=NORMAL')
 
     def close(self):
         if not self.connected:
@@ -311,13 +596,22 @@ def load(name, model=None):
         raise ValueError(('Can not get variable list for database'
                           '`{}`'.format(name)))
     chains = _get_chain_list(db.cursor, varnames[0])
+    is_blob = 'data' in _get_column_list(db.cursor, varnames[0])
+    if is_blob:
+        db.close()
+        db = _SQLiteDB(name, wal=True)
+        db.connect()
 
     straces = []
     for chain in chains:
-        strace = SQLite(name, model=model)
+        if is_blob:
+            strace = SQLiteBlob(name, model=model)
+        else:
+            strace = SQLite(name, model=model)
+            strace._var_cols = {
+                varname: ttab.create_flat_names('v', shape)
+                for varname, shape in strace.var_shapes.items()}
         strace.chain = chain
-        strace._var_cols = {varname: ttab.create_flat_names('v', shape)
-                            for varname, shape in strace.var_shapes.items()}
         strace._is_setup = True
         strace.db = db  # Share the db with all traces.
         straces.append(strace)
@@ -334,6 +628,12 @@ def _get_table_list(cursor):
     return [row[0] for row in cursor.fetchall()]
 
 
+def _get_column_list(cursor, varname):
+    """Return a list of the column names of the table of `varname`."""
+    cursor.execute('PRAGMA table_info([{}])'.format(varname))
+    return [row[1] for row in cursor.fetchall()]
+
+
 def _get_var_strs(cursor, varname):
     cursor.execute('SELECT * FROM [{}]'.format(varname))
     col_names = (col_descr[0] for col_descr in cursor.description)
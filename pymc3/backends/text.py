@@ -14,9 +14,15 @@ index labels.  For example, the heading
 
 represents two variables, x and y, where x is a scalar and y has a
 shape of (3, 2).
+
+With `sidecar=True`, the values of each chain are also saved in a
+NumPy `.npy` file with the same name as the CSV file. It contains a
+structured array with one field per variable and one row per sampling
+iteration, and is read instead of the CSV file if it is up to date.
 """
 from glob import glob
 import os
+import numpy as np
 import pandas as pd
 
 from ..backends import base, ndarray
@@ -38,19 +44,36 @@ class Text(base.BaseTrace):
         `model.unobserved_RVs` is used.
     test_point : dict
         use different test point that might be with changed variables shapes
+    sidecar : bool
+        Also write the values of each chain to a binary `.npy` file next
+        to the CSV file. It is used instead of the CSV file when the
+        values are read, as long as it is newer than the CSV file.
     """
 
-    def __init__(self, name, model=None, vars=None, test_point=None):
+    supports_worker_recording = True
+
+    def __init__(self, name, model=None, vars=None, test_point=None,
+                 sidecar=False):
         if not os.path.exists(name):
             os.mkdir(name)
         super(Text, self).__init__(name, model, vars, test_point)
 
         self.flat_names = {v: ttab.create_flat_names(v, shape)
                            for v, shape in self.var_shapes.items()}
+        self.sidecar = sidecar
+        self.sidecar_dtype = np.dtype([
+            (str(v), self.var_dtypes[v], self.var_shapes[v])
+            for v in self.varnames])
 
         self.filename = None
         self._fh = None
+        self._sidecar_fh = None
+        self._clear_cache()
+
+    def _clear_cache(self):
         self.df = None
+        self._values = {}
+        self._sidecar_values = None
 
     # Sampling methods
 
@@ -64,8 +87,8 @@ class Text(base.BaseTrace):
         chain : int
             Chain number
         """
-        if self._fh is not None:
-            self._fh.close()
+        self.close()
+        self._clear_cache()
 
         self.chain = chain
         self.filename = os.path.join(self.name, 'chain-{}.csv'.format(chain))
@@ -79,11 +102,26 @@ class Text(base.BaseTrace):
                 raise base.BackendError(
                     "Previous file '{}' has different variables names "
                     "than current model.".format(self.filename))
+            sidecar_values = self._load_sidecar()
+            self._clear_cache()
             self._fh = open(self.filename, 'a')
         else:
+            sidecar_values = np.empty(0, dtype=self.sidecar_dtype)
             self._fh = open(self.filename, 'w')
             self._fh.write(','.join(cnames) + '\n')
 
+        sidecar_path = self._sidecar_path()
+        if self.sidecar and sidecar_values is not None:
+            # The draws are streamed to a raw file, which is converted
+            # to the `.npy` file when the trace is closed.
+            self._sidecar_fh = open(sidecar_path + '.tmp', 'wb')
+            sidecar_values.tofile(self._sidecar_fh)
+        del sidecar_values
+        # The sidecar file would be out of date after appending to the
+        # CSV file.
+        if os.path.exists(sidecar_path):
+            os.remove(sidecar_path)
+
     def record(self, point):
         """Record results of a sampling iteration.
 
@@ -98,13 +136,59 @@ class Text(base.BaseTrace):
         columns = [str(val) for var in self.varnames for val in vals[var]]
         self._fh.write(','.join(columns) + '\n')
 
+        if self._sidecar_fh is not None:
+            row = np.empty(1, dtype=self.sidecar_dtype)
+            for varname in self.varnames:
+                row[varname] = vals[varname].reshape(self.var_shapes[varname])
+            row.tofile(self._sidecar_fh)
+
     def close(self):
         if self._fh is not None:
             self._fh.close()
             self._fh = None  # Avoid serialization issue.
+        if self._sidecar_fh is not None:
+            self._sidecar_fh.close()
+            self._sidecar_fh = None
+            sidecar_path = self._sidecar_path()
+            values = np.fromfile(sidecar_path + '.tmp',
+                                 dtype=self.sidecar_dtype)
+            np.save(sidecar_path, values)
+            os.remove(sidecar_path + '.tmp')
+        self._clear_cache()
+
+    def reopen(self, chain):
+        """Prepare the trace for reading a chain that another process
+        has recorded.
+
+        Parameters
+        ----------
+        chain : int
+            Chain number
+        """
+        self.chain = chain
+        filename = os.path.join(self.name, 'chain-{}.csv'.format(chain))
+        if os.path.exists(filename):
+            self.filename = filename
+        self._clear_cache()
 
     # Selection methods
 
+    def _sidecar_path(self):
+        return os.path.splitext(self.filename)[0] + '.npy'
+
+    def _load_sidecar(self):
+        """Map the values in the sidecar file of the chain, if there is
+        one that is up to date with the CSV file. Returns None otherwise.
+        """
+        if self._sidecar_values is None:
+            path = self._sidecar_path()
+            if (os.path.exists(path) and
+                    os.path.getmtime(path) >= os.path.getmtime(self.filename)):
+                values = np.load(path, mmap_mode='r')
+                if values.dtype == self.sidecar_dtype:
+                    self._sidecar_values = values
+        return self._sidecar_values
+
     def _load_df(self):
         if self.df is None:
             self.df = pd.read_csv(self.filename)
@@ -112,12 +196,33 @@ class Text(base.BaseTrace):
                 if "float" in str(dtype):
                     self.df[key] = floatX(self.df[key])
 
+    def _load_values(self, varname):
+        """Return the values of `varname`, reading only its columns
+        from the CSV file if they are not cached yet."""
+        if varname not in self._values:
+            sidecar_values = self._load_sidecar()
+            if sidecar_values is not None:
+                vals = np.array(sidecar_values[varname])
+            else:
+                flat_names = self.flat_names[varname]
+                if self.df is not None:
+                    var_df = self.df[flat_names]
+                else:
+                    var_df = pd.read_csv(self.filename,
+                                         usecols=flat_names)[flat_names]
+                vals = var_df.values
+                if "float" in str(vals.dtype):
+                    vals = floatX(vals)
+            shape = (vals.shape[0],) + self.var_shapes[varname]
+            self._values[varname] = vals.reshape(shape)
+        return self._values[varname]
 
     def __len__(self):
         if self.filename is None:
             return 0
-        self._load_df()
-        return self.df.shape[0]
+        if self.df is not None:
+            return self.df.shape[0]
+        return self._load_values(self.varnames[0]).shape[0]
 
     def get_values(self, varname, burn=0, thin=1):
         """Get values from trace.
@@ -132,11 +237,7 @@ class Text(base.BaseTrace):
         -------
         A NumPy array
         """
-        self._load_df()
-        var_df = self.df[self.flat_names[varname]]
-        shape = (self.df.shape[0],) + self.var_shapes[varname]
-        vals = var_df.values.ravel().reshape(shape)
-        return vals[burn::thin]
+        return self._load_values(varname)[burn::thin]
 
     def _slice(self, idx):
         if idx.stop is not None:
@@ -148,12 +249,8 @@ class Text(base.BaseTrace):
         with variables names as keys.
         """
         idx = int(idx)
-        self._load_df()
-        pt = {}
-        for varname in self.varnames:
-            vals = self.df[self.flat_names[varname]].iloc[idx].values
-            pt[varname] = vals.reshape(self.var_shapes[varname])
-        return pt
+        return {varname: self._load_values(varname)[idx]
+                for varname in self.varnames}
 
 
 def load(name, model=None):
@@ -185,7 +282,7 @@ def load(name, model=None):
     return base.MultiTrace(straces)
 
 
-def dump(name, trace, chains=None):
+def dump(name, trace, chains=None, sidecar=False):
     """Store values from NDArray trace as CSV files.
 
     Parameters
@@ -196,6 +293,8 @@ def dump(name, trace, chains=None):
         Result of MCMC run with default NDArray backend
     chains : list
         Chains to dump. If None, all chains are dumped.
+    sidecar : bool
+        Also store the values in a `.npy` file next to each CSV file.
     """
     if not os.path.exists(name):
         os.mkdir(name)
@@ -207,3 +306,12 @@ def dump(name, trace, chains=None):
         df = ttab.trace_to_dataframe(
             trace, chains=chain, include_transformed=True)
         df.to_csv(filename, index=False)
+        if sidecar:
+            strace = trace._straces[chain]
+            dtype = np.dtype([
+                (str(v), strace.var_dtypes[v], strace.var_shapes[v])
+                for v in strace.varnames])
+            values = np.empty(len(strace), dtype=dtype)
+            for v in strace.varnames:
+                values[v] = strace.get_values(v)
+            np.save(os.path.splitext(filename)[0] + '.npy', values)
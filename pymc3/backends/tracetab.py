@@ -1,17 +1,22 @@
 """Functions for converting traces into a table-like format
 """
 
+from collections import OrderedDict
+
 import numpy as np
 import pandas as pd
 
 from ..util import get_default_varnames
 
-__all__ = ['trace_to_dataframe']
+__all__ = ['trace_to_dataframe', 'iter_trace_to_dataframe']
 
 
 def trace_to_dataframe(trace, chains=None, varnames=None, include_transformed=False):
     """Convert trace to Pandas DataFrame.
 
+    The values are copied once into a preallocated array per dtype, which
+    the DataFrame uses without copying.
+
     Parameters
     ----------
     trace : NDarray trace
@@ -25,20 +30,116 @@ def trace_to_dataframe(trace, chains=None, varnames=None, include_transformed=Fa
         If true transformed variables will be included in the resulting
         DataFrame.
     """
-    var_shapes = trace._straces[0].var_shapes
+    chains = _get_chains(trace, chains)
+    segments = [(chain, 0, len(trace._straces[chain])) for chain in chains]
+    varnames = _get_varnames(trace, varnames, include_transformed)
+    return _segments_to_dataframe(trace, varnames, segments, 0)
+
+
+def iter_trace_to_dataframe(trace, chunk_size=1000, chains=None, varnames=None,
+                            include_transformed=False):
+    """Iterate over the rows of the DataFrame of `trace_to_dataframe` in
+    chunks, so that traces can be exported without holding a copy of
+    all values in memory.
 
+    Parameters
+    ----------
+    trace : NDarray trace
+    chunk_size : int
+        Maximum number of rows of each DataFrame
+    chains : int or list of ints
+        Chains to include. If None, all chains are used. A single
+        chain value can also be given.
+    varnames : list of variable names
+        Variables to be included in the DataFrame, if None all variable are
+        included.
+    include_transformed: boolean
+        If true transformed variables will be included in the resulting
+        DataFrame.
+
+    Examples
+    --------
+    >>> with open('trace.csv', 'w') as f:
+    ...     for i, df in enumerate(iter_trace_to_dataframe(trace)):
+    ...         df.to_csv(f, header=i == 0, index=False)
+    """
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be positive.')
+    chains = _get_chains(trace, chains)
+    varnames = _get_varnames(trace, varnames, include_transformed)
+
+    offset = 0
+    segments = []
+    n_rows = 0
+    for chain in chains:
+        length = len(trace._straces[chain])
+        start = 0
+        while start < length:
+            stop = min(length, start + chunk_size - n_rows)
+            segments.append((chain, start, stop))
+            n_rows += stop - start
+            start = stop
+            if n_rows == chunk_size:
+                yield _segments_to_dataframe(trace, varnames, segments, offset)
+                offset += n_rows
+                segments = []
+                n_rows = 0
+    if segments:
+        yield _segments_to_dataframe(trace, varnames, segments, offset)
+
+
+def _get_chains(trace, chains):
+    if chains is None:
+        return trace.chains
+    if np.ndim(chains) == 0:
+        return [chains]
+    return chains
+
+
+def _get_varnames(trace, varnames, include_transformed):
     if varnames is None:
-        varnames = get_default_varnames(var_shapes.keys(),
+        varnames = get_default_varnames(trace._straces[0].var_shapes.keys(),
                                         include_transformed=include_transformed)
+    return varnames
+
 
-    flat_names = {v: create_flat_names(v, var_shapes[v]) for v in varnames}
+def _segments_to_dataframe(trace, varnames, segments, offset):
+    """DataFrame of the draws `start:stop` of each `(chain, start, stop)`
+    in `segments`, with an index starting at `offset`."""
+    strace0 = trace._straces[segments[0][0]] if segments else trace._straces[0]
+    n_rows = sum(stop - start for _, start, stop in segments)
 
-    var_dfs = []
+    # Columns of the variables in one array per dtype
+    groups = OrderedDict()
+    columns = {}
+    flat_names = []
     for v in varnames:
-        vals = trace.get_values(v, combine=True, chains=chains)
-        flat_vals = vals.reshape(vals.shape[0], -1)
-        var_dfs.append(pd.DataFrame(flat_vals, columns=flat_names[v]))
-    return pd.concat(var_dfs, axis=1)
+        dtype = np.dtype(strace0.var_dtypes[v])
+        names = groups.setdefault(dtype, [])
+        var_names = create_flat_names(v, strace0.var_shapes[v])
+        columns[v] = (dtype, len(names), len(var_names))
+        names.extend(var_names)
+        flat_names.extend(var_names)
+
+    buffers = {dtype: np.empty((n_rows, len(names)), dtype=dtype)
+               for dtype, names in groups.items()}
+    for v in varnames:
+        dtype, col, size = columns[v]
+        buff = buffers[dtype]
+        row = 0
+        for chain, start, stop in segments:
+            vals = trace._straces[chain]._get_values_range(v, start, stop)
+            buff[row:row + len(vals), col:col + size] = vals.reshape(len(vals), -1)
+            row += len(vals)
+
+    index = pd.RangeIndex(offset, offset + n_rows)
+    frames = [pd.DataFrame(buffers[dtype], columns=names, index=index,
+                           copy=False)
+              for dtype, names in groups.items()]
+    if len(frames) == 1:
+        return frames[0]
+    df = pd.concat(frames, axis=1, copy=False)
+    return df[flat_names]
 
 
 def create_flat_names(varname, shape):
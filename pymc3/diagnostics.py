@@ -1,11 +1,12 @@
 """Convergence diagnostics and model validation"""
 
 import numpy as np
-from .stats import statfunc, autocov
+from scipy.special import ndtri
+from .stats import statfunc, _autocov_batch
 from .util import get_default_varnames
 from .backends.base import MultiTrace
 
-__all__ = ['geweke', 'gelman_rubin', 'effective_n']
+__all__ = ['geweke', 'gelman_rubin', 'effective_n', 'OnlineDiagnostics']
 
 
 @statfunc
@@ -31,9 +32,11 @@ def geweke(x, first=.1, last=.5, intervals=20):
 
     Returns
     -------
-    scores : list [[]]
-      Return a list of [i, score], where i is the starting index for each
-      interval and score the Geweke score on the interval.
+    scores : array
+      Return an array of [i, score], where i is the starting index for each
+      interval and score the Geweke score on the interval. For
+      multidimensional x the scores of each element are returned in an
+      array of shape (x.shape[1:], intervals, 2).
 
     Notes
     -----
@@ -51,8 +54,7 @@ def geweke(x, first=.1, last=.5, intervals=20):
     Geweke (1992)
     """
 
-    if np.ndim(x) > 1:
-        return [geweke(y, first, last, intervals) for y in np.transpose(x)]
+    x = np.asarray(x)
 
     # Filter out invalid intervals
     for interval in (first, last):
@@ -67,9 +69,6 @@ def geweke(x, first=.1, last=.5, intervals=20):
             (first,
              last))
 
-    # Initialize list of z-scores
-    zscores = []
-
     # Last index value
     end = len(x) - 1
 
@@ -80,24 +79,143 @@ def geweke(x, first=.1, last=.5, intervals=20):
     start_indices = np.arange(0, int(last_start_idx), step=int(
         (last_start_idx) / (intervals - 1)))
 
-    # Loop over start indices
-    for start in start_indices:
-        # Calculate slices
-        first_slice = x[start: start + int(first * (end - start))]
-        last_slice = x[int(end - last * (end - start)):]
+    # Calculate slices
+    first_stops = start_indices + (first * (end - start_indices)).astype(int)
+    last_starts = (end - last * (end - start_indices)).astype(int)
+
+    # The means and variances of all slices of all elements follow from
+    # the cumulative sums of the centered values and their squares.
+    flat = x.reshape(len(x), -1).astype(float)
+    flat -= flat.mean(axis=0)
+    zeros = np.zeros((1, flat.shape[1]))
+    csum = np.concatenate([zeros, np.cumsum(flat, axis=0)])
+    csum2 = np.concatenate([zeros, np.cumsum(flat ** 2, axis=0)])
+
+    def slice_moments(start, stop):
+        n = (stop - start)[:, None]
+        mean = (csum[stop] - csum[start]) / n
+        var = np.maximum((csum2[stop] - csum2[start]) / n - mean ** 2, 0.)
+        return mean, var
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        first_mean, first_var = slice_moments(start_indices, first_stops)
+        last_mean, last_var = slice_moments(
+            last_starts, np.full_like(last_starts, len(x)))
+        z = (first_mean - last_mean) / np.sqrt(first_var + last_var)
+
+    zscores = np.empty(z.shape + (2,))
+    zscores[..., 0] = start_indices[:, None]
+    zscores[..., 1] = z
+
+    if x.ndim == 1:
+        return zscores[:, 0]
+    # Return the scores of each element of the variable
+    zscores = np.swapaxes(zscores, 0, 1)
+    return zscores.reshape(x.shape[1:] + zscores.shape[1:])
+
+
+def _rscore(x, num_samples):
+    """Compute the potential scale reduction factor for each element of
+    an array of shape (nchain, num_samples, ...)
+    """
+    # Calculate between-chain variance
+    B = num_samples * np.var(np.mean(x, axis=1), axis=0, ddof=1)
+
+    # Calculate within-chain variance
+    W = np.mean(np.var(x, axis=1, ddof=1), axis=0)
+
+    # Estimate of marginal posterior variance
+    Vhat = W * (num_samples - 1) / num_samples + B / num_samples
+
+    return np.sqrt(Vhat / W)
+
+
+def _get_neff(x):
+    """Compute the effective sample size for each column of a 3D array
+    of shape (nchain, n_samples, n_columns)
+    """
+    nchain, n_samples = x.shape[:2]
+
+    acov = _autocov_batch(np.swapaxes(x, 0, 1))
 
-        z = first_slice.mean() - last_slice.mean()
-        z /= np.sqrt(first_slice.var() + last_slice.var())
+    chain_mean = x.mean(axis=1)
+    chain_var = acov[0] * n_samples / (n_samples - 1.)
+    acov_t = acov[1] * n_samples / (n_samples - 1.)
+    mean_var = np.mean(chain_var, axis=0)
+    var_plus = mean_var * (n_samples - 1.) / n_samples
+    var_plus += np.var(chain_mean, axis=0, ddof=1)
 
-        zscores.append([start, z])
+    rho_hat_odd = 1. - (mean_var - np.mean(acov_t, axis=0)) / var_plus
+    # Sums of the autocorrelations of the lag pairs (2, 3), (4, 5), ...
+    n_pairs = (n_samples - 2) // 2
+    rho_hat_t = 1. - (mean_var - np.mean(acov[2:2 * n_pairs + 2], axis=1)) / var_plus
+    pair_sums = rho_hat_t[0::2] + rho_hat_t[1::2]
 
-    if intervals is None:
-        return np.array(zscores[0])
-    else:
-        return np.array(zscores)
+    # Geyer's initial positive sequence: keep the pairs until the
+    # first pair (starting with lags (0, 1)) with a negative sum.
+    positive = np.concatenate([[1. + rho_hat_odd >= 0.], pair_sums >= 0.])
+    positive = np.logical_and.accumulate(positive, axis=0)[1:]
+    pair_sums = np.where(positive, pair_sums, 0.)
 
+    # Geyer's initial monotone sequence
+    pair_sums = np.minimum.accumulate(pair_sums, axis=0)
 
-def gelman_rubin(mtrace, varnames=None, include_transformed=False):
+    ess = nchain * n_samples
+    ess = ess / (-1. + 2. * (1. + rho_hat_odd + np.sum(pair_sums, axis=0)))
+    return ess
+
+
+def _split_chains(x):
+    """Split each chain of an array of shape (nchain, n_samples, ...) in
+    halves, dropping the middle draw of chains of odd length."""
+    half = x.shape[1] // 2
+    return np.concatenate([x[:, :half], x[:, x.shape[1] - half:]])
+
+
+def _rank_normalize(x):
+    """Rank-normalize the draws of all chains of an array of shape
+    (nchain, n_samples, ...) for each element.
+
+    Ties get their average rank, and the ranks are transformed with the
+    normal quantile function.
+    """
+    shape = x.shape
+    flat = x.reshape((shape[0] * shape[1], -1))
+    n = len(flat)
+    order = np.argsort(flat, axis=0, kind='mergesort')
+    columns = np.arange(flat.shape[1])
+    sx = flat[order, columns]
+
+    # First and last position of the group of ties of each sorted draw
+    idx = np.arange(n)[:, None]
+    is_first = np.ones(sx.shape, dtype=bool)
+    is_first[1:] = sx[1:] != sx[:-1]
+    is_last = np.ones(sx.shape, dtype=bool)
+    is_last[:-1] = is_first[1:]
+    first = np.maximum.accumulate(np.where(is_first, idx, 0), axis=0)
+    last = np.minimum.accumulate(
+        np.where(is_last, idx, n - 1)[::-1], axis=0)[::-1]
+
+    ranks = np.empty(flat.shape)
+    ranks[order, columns] = (first + last) / 2. + 1.
+    z = ndtri((ranks - 3. / 8) / (n + 1. / 4))
+    return z.reshape(shape)
+
+
+def _rank_rscore(x, split=True):
+    """Maximum of the potential scale reduction factors of the
+    rank-normalized draws and of the rank-normalized distances to the
+    median, for an array of shape (nchain, n_samples, ...)."""
+    if split:
+        x = _split_chains(x)
+    folded = np.abs(x - np.median(x, axis=(0, 1)))
+    num_samples = x.shape[1]
+    return np.maximum(_rscore(_rank_normalize(x), num_samples),
+                      _rscore(_rank_normalize(folded), num_samples))
+
+
+def gelman_rubin(mtrace, varnames=None, include_transformed=False,
+                 split=False, rank=False):
     R"""Returns estimate of R for a set of traces.
 
     The Gelman-Rubin diagnostic tests for lack of convergence by comparing
@@ -117,6 +235,14 @@ def gelman_rubin(mtrace, varnames=None, include_transformed=False):
     include_transformed : bool
       Flag for reporting automatically transformed variables in addition
       to original variables (defaults to False).
+    split : bool
+      Split each chain in halves before comparing the chains, so that
+      trends within the chains are detected (defaults to False).
+    rank : bool
+      Compute the statistic of the rank-normalized draws, and of the
+      rank-normalized absolute deviations from the median, and return
+      the larger of both. This is robust to heavy tails and detects
+      differences in scale (defaults to False).
 
     Returns
     -------
@@ -140,23 +266,19 @@ def gelman_rubin(mtrace, varnames=None, include_transformed=False):
     References
     ----------
     Brooks and Gelman (1998)
-    Gelman and Rubin (1992)"""
-
-    def rscore(x, num_samples):
-        # Calculate between-chain variance
-        B = num_samples * np.var(np.mean(x, axis=1), axis=0, ddof=1)
-
-        # Calculate within-chain variance
-        W = np.mean(np.var(x, axis=1, ddof=1), axis=0)
-
-        # Estimate of marginal posterior variance
-        Vhat = W * (num_samples - 1) / num_samples + B / num_samples
+    Gelman and Rubin (1992)
+    Vehtari et al. (2019) for the rank-normalized split statistic"""
 
-        return np.sqrt(Vhat / W)
+    def generate_rhat(x):
+        if rank:
+            return _rank_rscore(x, split)
+        if split:
+            x = _split_chains(x)
+        return _rscore(x, x.shape[1])
 
     if not isinstance(mtrace, MultiTrace):
         # Return rscore for passed arrays
-        return rscore(np.array(mtrace), mtrace.shape[1])
+        return generate_rhat(np.array(mtrace))
 
     if mtrace.nchains < 2:
         raise ValueError(
@@ -170,8 +292,7 @@ def gelman_rubin(mtrace, varnames=None, include_transformed=False):
 
     for var in varnames:
         x = np.array(mtrace.get_values(var, combine=False))
-        num_samples = x.shape[1]
-        Rhat[var] = rscore(x, num_samples)
+        Rhat[var] = generate_rhat(x)
 
     return Rhat
 
@@ -212,49 +333,6 @@ def effective_n(mtrace, varnames=None, include_transformed=False):
     ----------
     Gelman et al. BDA (2014)"""
 
-    def get_neff(x):
-        """Compute the effective sample size for a 2D array
-        """
-        trace_value = x.T
-        nchain, n_samples = trace_value.shape
-
-        acov = np.asarray([autocov(trace_value[chain]) for chain in range(nchain)])
-
-        chain_mean = trace_value.mean(axis=1)
-        chain_var = acov[:, 0] * n_samples / (n_samples - 1.)
-        acov_t = acov[:, 1] * n_samples / (n_samples - 1.)
-        mean_var = np.mean(chain_var)
-        var_plus = mean_var * (n_samples - 1.) / n_samples
-        var_plus += np.var(chain_mean, ddof=1)
-
-        rho_hat_t = np.zeros(n_samples)
-        rho_hat_even = 1.
-        rho_hat_t[0] = rho_hat_even
-        rho_hat_odd = 1. - (mean_var - np.mean(acov_t)) / var_plus
-        rho_hat_t[1] = rho_hat_odd
-        # Geyer's initial positive sequence
-        max_t = 1
-        t = 1
-        while t < (n_samples - 2) and (rho_hat_even + rho_hat_odd) >= 0.:
-            rho_hat_even = 1. - (mean_var - np.mean(acov[:, t + 1])) / var_plus
-            rho_hat_odd = 1. - (mean_var - np.mean(acov[:, t + 2])) / var_plus
-            if (rho_hat_even + rho_hat_odd) >= 0:
-                rho_hat_t[t + 1] = rho_hat_even
-                rho_hat_t[t + 2] = rho_hat_odd
-            max_t = t + 2
-            t += 2
-
-        # Geyer's initial monotone sequence
-        t = 3
-        while t <= max_t - 2:
-            if (rho_hat_t[t + 1] + rho_hat_t[t + 2]) > (rho_hat_t[t - 1] + rho_hat_t[t]):
-                rho_hat_t[t + 1] = (rho_hat_t[t - 1] + rho_hat_t[t]) / 2.
-                rho_hat_t[t + 2] = rho_hat_t[t + 1]
-            t += 2
-        ess = nchain * n_samples
-        ess = ess / (-1. + 2. * np.sum(rho_hat_t))
-        return ess
-
     def generate_neff(trace_values):
         x = np.array(trace_values)
         shape = x.shape
@@ -265,22 +343,16 @@ def effective_n(mtrace, varnames=None, include_transformed=False):
         if len(shape) == 2:
             x = np.atleast_3d(trace_values)
 
-        # Transpose all dimensions, which makes the loop below
-        # easier by moving the axes of the variable to the front instead
-        # of the chain and sample axes.
-        x = x.transpose()
-
-        # Get an array the same shape as the var
-        _n_eff = np.zeros(x.shape[:-2])
-
-        # Iterate over tuples of indices of the shape of var
-        for tup in np.ndindex(*list(x.shape[:-2])):
-            _n_eff[tup] = get_neff(x[tup])
+        # Flatten the axes of the variable, so that all elements are
+        # computed at once.
+        var_shape = x.shape[2:]
+        x = x.reshape(x.shape[:2] + (int(np.prod(var_shape)),))
+        _n_eff = _get_neff(x)
 
         if len(shape) == 2:
             return _n_eff[0]
 
-        return np.transpose(_n_eff)
+        return _n_eff.reshape(var_shape)
 
     if not isinstance(mtrace, MultiTrace):
         # Return neff for non-multitrace array
@@ -300,3 +372,225 @@ def effective_n(mtrace, varnames=None, include_transformed=False):
         n_eff[var] = generate_neff(mtrace.get_values(var, combine=False))
 
     return n_eff
+
+
+class _ChainAccumulator(object):
+    """Running statistics of the flattened draws of one chain."""
+
+    def __init__(self, size, n_batches, window):
+        self.n = 0
+        # Welford's algorithm for the mean and variance
+        self.mean = np.zeros(size)
+        self.m2 = np.zeros(size)
+        # Means of consecutive batches of draws. When 2 * n_batches
+        # batches are full, neighbouring batches are merged, so that the
+        # batch size grows with the number of draws.
+        self.batch_size = 1
+        self.batch_means = np.zeros((2 * n_batches, size))
+        self.n_full = 0
+        self._batch_sum = np.zeros(size)
+        self._batch_n = 0
+        # The last `window` draws
+        self.window = np.zeros((window, size))
+
+    def update(self, x):
+        self.window[self.n % len(self.window)] = x
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+        self._batch_sum += x
+        self._batch_n += 1
+        if self._batch_n == self.batch_size:
+            self.batch_means[self.n_full] = self._batch_sum / self.batch_size
+            self.n_full += 1
+            self._batch_sum[:] = 0.
+            self._batch_n = 0
+            if self.n_full == len(self.batch_means):
+                half = self.n_full // 2
+                means = self.batch_means
+                means[:half] = (means[0::2] + means[1::2]) / 2.
+                self.n_full = half
+                self.batch_size *= 2
+
+    @property
+    def variance(self):
+        return self.m2 / (self.n - 1.)
+
+    def batch_variance(self):
+        """Estimate of the asymptotic variance of the chain mean, times
+        the number of draws."""
+        means = self.batch_means[:self.n_full]
+        return self.batch_size * np.var(means, axis=0, ddof=1)
+
+    def last_draws(self, n):
+        """The last `n` draws in order."""
+        idx = np.arange(self.n - n, self.n) % len(self.window)
+        return self.window[idx]
+
+
+class OnlineDiagnostics(object):
+    R"""Running convergence diagnostics, which are updated one draw at a
+    time while the chains are sampled.
+
+    For each chain, the mean and variance of each element of the
+    variables are accumulated with Welford's algorithm, the means of
+    consecutive batches of draws are kept to estimate the autocorrelation
+    of the chain, and the last `window` draws are kept for windowed
+    autocovariances.
+
+    Parameters
+    ----------
+    varnames : list of str
+        Names of the variables to track. Defaults to all variables of the
+        first point.
+    n_batches : int
+        Minimum number of batches for the batch means. At most twice as
+        many batches are stored per chain.
+    window : int
+        Number of draws per chain kept for `effective_n(method='window')`.
+
+    Examples
+    --------
+    ::
+
+        diagnostics = OnlineDiagnostics()
+        trace = pm.sample(1000, diagnostics=diagnostics)
+        diagnostics.gelman_rubin()
+    """
+
+    def __init__(self, varnames=None, n_batches=32, window=500):
+        if n_batches < 2:
+            raise ValueError('n_batches must be at least 2.')
+        if window < 4:
+            raise ValueError('window must be at least 4.')
+        self.varnames = varnames
+        self.n_batches = n_batches
+        self.window = window
+        self._slices = None
+        self._chains = {}
+
+    def _setup(self, point):
+        if self.varnames is None:
+            self.varnames = list(point.keys())
+        self._slices = []
+        start = 0
+        for varname in self.varnames:
+            shape = np.shape(point[varname])
+            size = int(np.prod(shape))
+            self._slices.append((varname, slice(start, start + size), shape))
+            start += size
+        self._size = start
+
+    def update(self, chain, point):
+        """Add a draw of a chain.
+
+        Parameters
+        ----------
+        chain : int
+            Chain number
+        point : dict
+            Values of the variables, mapped to variable names
+        """
+        if self._slices is None:
+            self._setup(point)
+        x = np.concatenate(
+            [np.ravel(point[varname]) for varname in self.varnames])
+        if chain not in self._chains:
+            self._chains[chain] = _ChainAccumulator(
+                self._size, self.n_batches, self.window)
+        self._chains[chain].update(x)
+
+    @property
+    def nchains(self):
+        return len(self._chains)
+
+    @property
+    def draws(self):
+        """Number of draws of each chain, mapped to chain numbers."""
+        return {chain: acc.n for chain, acc in self._chains.items()}
+
+    def _unflatten(self, values):
+        return {varname: values[slc].reshape(shape)
+                for varname, slc, shape in self._slices}
+
+    def gelman_rubin(self):
+        """Running estimate of the Gelman-Rubin statistic.
+
+        Returns
+        -------
+        Rhat : dict
+            Returns dictionary of the potential scale reduction
+            factors, :math:`\hat{R}`
+        """
+        accs = list(self._chains.values())
+        if len(accs) < 2 or any(acc.n < 2 for acc in accs):
+            raise ValueError(
+                'Gelman-Rubin diagnostic requires at least two chains '
+                'with two draws each.')
+        num_samples = np.mean([acc.n for acc in accs])
+        B = num_samples * np.var([acc.mean for acc in accs], axis=0, ddof=1)
+        W = np.mean([acc.variance for acc in accs], axis=0)
+        Vhat = W * (num_samples - 1) / num_samples + B / num_samples
+        return self._unflatten(np.sqrt(Vhat / W))
+
+    def effective_n(self, method='batch_means'):
+        R"""Running estimate of the effective sample size.
+
+        Parameters
+        ----------
+        method : str
+            With 'batch_means', the autocorrelation of the chains is
+            estimated from the variance of the batch means of all draws.
+            With 'window', the effective sample size of the last `window`
+            draws of each chain is computed like in `effective_n` and
+            scaled to the number of draws.
+
+        Returns
+        -------
+        n_eff : dict
+            Returns dictionary of the effective sample sizes,
+            :math:`\hat{n}_{eff}`
+        """
+        accs = list(self._chains.values())
+        total = sum(acc.n for acc in accs)
+        if method == 'batch_means':
+            if not accs or any(acc.n_full < 2 for acc in accs):
+                raise ValueError('Not enough draws to estimate the effective '
+                                 'sample size.')
+            W = np.mean([acc.variance for acc in accs], axis=0)
+            sigma2 = np.mean([acc.batch_variance() for acc in accs], axis=0)
+            n_eff = total * W / sigma2
+        elif method == 'window':
+            length = min([acc.n for acc in accs] + [self.window])
+            if len(accs) < 2 or length < 4:
+                raise ValueError('Not enough draws to estimate the effective '
+                                 'sample size.')
+            x = np.array([acc.last_draws(length) for acc in accs])
+            n_eff = _get_neff(x) * total / (len(accs) * length)
+        else:
+            raise ValueError('Unknown method: %s' % method)
+        return self._unflatten(n_eff)
+
+    def converged(self, target_ess=None, max_rhat=None):
+        """Whether the effective sample size (estimated from the batch
+        means) of all elements is at least `target_ess` and their
+        Gelman-Rubin statistic is at most `max_rhat`.
+
+        Returns False as long as there are not enough draws to estimate
+        the diagnostics.
+        """
+        try:
+            if max_rhat is not None:
+                rhat = self.gelman_rubin()
+                if not all(np.all(val <= max_rhat) for val in rhat.values()):
+                    return False
+            if target_ess is not None:
+                n_eff = self.effective_n()
+                if not all(np.all(val >= target_ess)
+                           for val in n_eff.values()):
+                    return False
+        except ValueError:
+            return False
+        return True
@@ -1,4 +1,5 @@
 import collections
+import itertools
 import numbers
 
 import numpy as np
@@ -214,6 +215,31 @@ class DensityDist(Distribution):
                             "Define a custom random method and pass it as kwarg random")
 
 
+class _PerSample(np.ndarray):
+    """Values with a leading axis of samples, one for each point of a
+    `_BatchPoint`."""
+
+
+def _per_sample(value):
+    return np.asarray(value).view(_PerSample)
+
+
+class _BatchPoint(dict):
+    """A batch of `n` points, which maps variable names to the values of
+    all points stacked along a leading axis.
+
+    If `draw_values` is called with a batch point and `size=n`, the theano
+    graphs of the parameters are evaluated once for each point, and
+    `generate_samples` draws one sample for each point from the
+    parameters of that point.
+    """
+
+    def __init__(self, values, n):
+        super(_BatchPoint, self).__init__(
+            (name, _per_sample(value)) for name, value in values.items())
+        self.n = n
+
+
 def draw_values(params, point=None, size=None):
     """
     Draw (fix) parameter values. Handles a number of cases:
@@ -231,7 +257,101 @@ def draw_values(params, point=None, size=None):
             a) are named parameters in the point
             b) are *RVs with a random method
 
+    Evaluating the parameters requires finding an order in which the
+    named nodes of their graphs can be drawn. This order only depends on
+    the parameters and on the variables given in `point`, so it is cached
+    on the model and reused by subsequent calls. The cache keeps the plans
+    of the `DRAW_VALUES_PLANS_SIZE` most recently used parameter lists, and
+    is cleared when variables are added to the model.
+    """
+    plans = _draw_values_plans(params)
+    key = _draw_values_key(params, point)
+    if plans is not None and key is not None and key in plans:
+        # Mark the plan as the most recently used
+        plan = plans.pop(key)
+        try:
+            values = _draw_values_from_plan(plan, params, point, size)
+        except theano.gof.fg.MissingInputError:
+            pass
+        else:
+            plans[key] = plan
+            return values
+
+    plan = _DrawValuesPlan([], [])
+    values = _draw_values(params, point, size, plan)
+    if plans is not None and key is not None:
+        plans[key] = plan
+        while len(plans) > DRAW_VALUES_PLANS_SIZE:
+            plans.popitem(last=False)
+    return values
+
+
+# Maximum number of cached evaluation plans of `draw_values` per model
+DRAW_VALUES_PLANS_SIZE = 100
+
+
+_DrawValuesPlan = collections.namedtuple('_DrawValuesPlan', 'givens, params')
+
+
+def _draw_values_plans(params):
+    """Get the cache of `draw_values` evaluation plans of the model that
+    `params` belong to, or None if no model is known."""
+    model = None
+    for param in params:
+        if isinstance(getattr(param, 'model', None), Model):
+            model = param.model
+            break
+    else:
+        try:
+            model = Model.get_context()
+        except TypeError:
+            return None
+    return model.root._draw_values_plans
+
+
+def _draw_values_key(params, point):
+    """Cache key for the evaluation plan of `params` given `point`.
+
+    Numbers and arrays are evaluated as they are and do not need to be
+    distinguished. Returns None if a parameter has an unexpected type.
     """
+    key = []
+    for param in params:
+        if isinstance(param, (numbers.Number, np.ndarray)):
+            key.append(None)
+        elif isinstance(param, (theano.Variable, MultiObservedRV)):
+            key.append(param)
+        else:
+            return None
+    point_keys = frozenset(point) if point else frozenset()
+    return tuple(key), point_keys
+
+
+def _draw_values_from_plan(plan, params, point, size):
+    """Draw `params` following the evaluation order recorded in `plan`."""
+    givens = {}
+    for node, children in plan.givens:
+        temp_givens = [givens[k] for k in givens if k in children]
+        givens[node.name] = (node, _draw_value(node, point=point,
+                                               givens=temp_givens,
+                                               size=size))
+
+    evaluated = {}
+    for param_idx, from_givens, add_given in plan.params:
+        param = params[param_idx]
+        if from_givens:
+            evaluated[param_idx] = givens[param.name][1]
+        else:
+            evaluated[param_idx] = _draw_value(param, point=point,
+                                               givens=givens.values(),
+                                               size=size)
+            if add_given:
+                givens[param.name] = (param, evaluated[param_idx])
+    return [evaluated[j] for j in range(len(params))]
+
+
+def _draw_values(params, point, size, plan):
+    """Draw `params` and record the order of evaluation in `plan`."""
     # Distribution parameters may be nodes which have named node-inputs
     # specified in the point. Need to find the node-inputs, their
     # parents and children to replace them.
@@ -292,6 +412,7 @@ def draw_values(params, point=None, size=None):
                                                          givens=temp_givens,
                                                          size=size))
                 stored.add(next_.name)
+                plan.givens.append((next_, children))
             except theano.gof.fg.MissingInputError:
                 # The node failed, so we must add the node's parents to
                 # the stack of nodes to try to draw from. We exclude the
@@ -316,11 +437,15 @@ def draw_values(params, point=None, size=None):
             param = params[param_idx]
             if hasattr(param, 'name') and param.name in givens:
                 evaluated[param_idx] = givens[param.name][1]
+                plan.params.append((param_idx, True, False))
             else:
                 try:  # might evaluate in a bad order,
                     evaluated[param_idx] = _draw_value(param, point=point, givens=givens.values(), size=size)
-                    if isinstance(param, collections.Hashable) and named_nodes_parents.get(param):
+                    add_given = bool(isinstance(param, collections.Hashable) and
+                                     named_nodes_parents.get(param))
+                    if add_given:
                         givens[param.name] = (param, evaluated[param_idx])
+                    plan.params.append((param_idx, False, add_given))
                 except theano.gof.fg.MissingInputError:
                     missing_inputs.add(param_idx)
 
@@ -381,7 +506,7 @@ def _draw_value(param, point=None, givens=None, size=None):
         if point and hasattr(param, 'model') and param.name in point:
             return point[param.name]
         elif hasattr(param, 'random') and param.random is not None:
-            return param.random(point=point, size=size)
+            return _batch_value(param.random(point=point, size=size), point)
         elif (hasattr(param, 'distribution') and
                 hasattr(param.distribution, 'random') and
                 param.distribution.random is not None):
@@ -402,15 +527,19 @@ def _draw_value(param, point=None, givens=None, size=None):
                     dist_tmp.shape = np.array([])
                     val = dist_tmp.random(point=point, size=None)
                     dist_tmp.shape = val.shape
-                return dist_tmp.random(point=point, size=size)
+                return _batch_value(dist_tmp.random(point=point, size=size),
+                                    point)
             else:
-                return param.distribution.random(point=point, size=size)
+                return _batch_value(
+                    param.distribution.random(point=point, size=size), point)
         else:
             if givens:
                 variables, values = list(zip(*givens))
             else:
                 variables = values = []
             func = _compile_theano_function(param, variables)
+            if isinstance(point, _BatchPoint):
+                return _eval_per_sample(func, values, point.n)
             if size and values and not all(var.dshape == val.shape for var, val in zip(variables, values)):
                 return np.array([func(*v) for v in zip(*values)])
             else:
@@ -418,6 +547,24 @@ def _draw_value(param, point=None, givens=None, size=None):
     raise ValueError('Unexpected type in draw_value: %s' % type(param))
 
 
+def _batch_value(value, point):
+    """Mark a value drawn for a batch point as having a sample axis."""
+    if isinstance(point, _BatchPoint):
+        return _per_sample(value)
+    return value
+
+
+def _eval_per_sample(func, values, n):
+    """Evaluate `func` once for each of `n` samples. Values that are not
+    `_PerSample` are the same for all samples."""
+    if not any(isinstance(value, _PerSample) for value in values):
+        return func(*values)
+    columns = [np.asarray(value) if isinstance(value, _PerSample)
+               else itertools.repeat(value, n)
+               for value in values]
+    return _per_sample([func(*sample) for sample in zip(*columns)])
+
+
 def to_tuple(shape):
     """Convert ints, arrays, and Nones to tuples"""
     try:
@@ -437,6 +584,57 @@ def _is_one_d(dist_shape):
         return True
     return False
 
+def _expand_dims(param, expand):
+    """Append trailing axes to a non-scalar parameter."""
+    if np.ndim(param) > 0:
+        return np.asarray(param)[expand]
+    return param
+
+
+def _generate_batch_samples(generator, size, dist_shape, broadcast_shape,
+                            args, kwargs):
+    """Draw one sample for each of `size` points, with the parameters that
+    are `_PerSample` taken from the point of each sample.
+
+    The sample axis of these parameters is aligned with the sample axis of
+    the result, and their remaining axes with the trailing axes of
+    `dist_shape`. Raises a TypeError if the parameters do not broadcast to
+    ``(size,) + dist_shape`` this way.
+    """
+    dist_shape = to_tuple(dist_shape)
+    shape = (size,) + dist_shape
+    if broadcast_shape is not None:
+        raise TypeError('Can not draw a batch of samples with an explicit '
+                        'broadcast_shape.')
+
+    def align(param):
+        if not isinstance(param, _PerSample):
+            return param
+        param = np.asarray(param)
+        missing = len(shape) - param.ndim
+        if param.shape[:1] != (size,) or missing < 0:
+            raise TypeError('Parameter of shape %s does not match the '
+                            'samples of shape %s.' % (param.shape, shape))
+        return param.reshape(param.shape[:1] + (1,) * missing +
+                             param.shape[1:])
+
+    args = tuple(align(p) for p in args)
+    kwargs = {k: align(v) for k, v in kwargs.items()}
+    inputs = args + tuple(kwargs.values())
+    try:
+        broadcast = np.broadcast(np.empty(shape, dtype=bool), *inputs).shape
+    except ValueError:
+        broadcast = None
+    if broadcast != shape:
+        raise TypeError('Parameters do not broadcast to the samples of '
+                        'shape %s.' % (shape,))
+
+    samples = np.asarray(generator(size=shape, *args, **kwargs))
+    if _is_one_d(dist_shape) and samples.shape[-1] == 1:
+        samples = samples.reshape(samples.shape[:-1])
+    return samples
+
+
 def generate_samples(generator, *args, **kwargs):
     """Generate samples from the distribution of a random variable.
 
@@ -479,6 +677,11 @@ def generate_samples(generator, *args, **kwargs):
         p = kwargs[key]
         kwargs[key] = p[0] if isinstance(p, tuple) else p
 
+    if any(isinstance(p, _PerSample)
+           for p in args + tuple(kwargs.values())):
+        return _generate_batch_samples(generator, size, dist_shape,
+                                       broadcast_shape, args, kwargs)
+
     if broadcast_shape is None:
         inputs = args + tuple(kwargs.values())
         try:
@@ -508,6 +711,12 @@ def generate_samples(generator, *args, **kwargs):
     # Args have been broadcast correctly, can just ask for the right shape out
     elif dist_shape[-len(broadcast_shape):] == broadcast_shape:
         samples = generator(size=size_tup + dist_shape, *args, **kwargs)
+    # One set of parameters per sample, broadcast them against dist_shape
+    elif broadcast_shape == size_tup:
+        expand = (Ellipsis,) + (np.newaxis,) * len(dist_shape)
+        args = tuple(_expand_dims(p, expand) for p in args)
+        kwargs = {k: _expand_dims(v, expand) for k, v in kwargs.items()}
+        samples = generator(size=size_tup + dist_shape, *args, **kwargs)
     # Inputs have the right size, have to manually broadcast to the right dist_shape
     elif broadcast_shape[:len(size_tup)] == size_tup:
         suffix = broadcast_shape[len(size_tup):] + dist_shape
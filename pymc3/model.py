@@ -383,6 +383,10 @@ class ValueGradFunction(object):
         See `numpy.can_cast` for a description of the options.
         Keep in mind that we cast the variables to the array *and*
         back from the array dtype to the variable dtype.
+    batched : bool, default=False
+        Compile the function of `batch`, which evaluates many points at
+        once, right away. Otherwise it is compiled on the first call of
+        `batch`.
     kwargs
         Extra arguments are passed on to `theano.function`.
 
@@ -396,7 +400,7 @@ class ValueGradFunction(object):
         kwargs.
     """
     def __init__(self, cost, grad_vars, extra_vars=None, dtype=None,
-                 casting='no', **kwargs):
+                 casting='no', batched=False, **kwargs):
         if extra_vars is None:
             extra_vars = []
 
@@ -441,12 +445,19 @@ class ValueGradFunction(object):
 
         grad = tt.grad(self._cost_joined, self._vars_joined)
         grad.name = '__grad'
+        self._grad_joined = grad
+        self._givens = givens
+        self._theano_kwargs = kwargs
 
         inputs = [self._vars_joined]
 
         self._theano_function = theano.function(
             inputs, [self._cost_joined, grad], givens=givens, **kwargs)
 
+        self._theano_batch_function = None
+        if batched:
+            self._build_batch_function()
+
     def set_extra_values(self, extra_vars):
         self._extra_are_set = True
         for var in self._extra_vars:
@@ -482,6 +493,58 @@ class ValueGradFunction(object):
             out[...] = dlogp
             return logp
 
+    def batch(self, arrays, grad_out=None, extra_vars=None):
+        """Compute the value and gradient at each row of `arrays`.
+
+        Parameters
+        ----------
+        arrays : array, shape (n, size)
+            The points, one per row.
+        grad_out : array, shape (n, size), optional
+            If given, the gradients are written to it, and only the
+            values are returned.
+        extra_vars : dict, optional
+            Values of the extra variables, like in `set_extra_values`.
+            They are the same for all points.
+
+        Returns
+        -------
+        The `(n,)` values and the `(n, size)` gradients
+        """
+        if extra_vars is not None:
+            self.set_extra_values(extra_vars)
+
+        if not self._extra_are_set:
+            raise ValueError('Extra values are not set.')
+
+        if arrays.ndim != 2 or arrays.shape[1] != self.size:
+            raise ValueError('Invalid shape for arrays. Must be (n, %s) but '
+                             'is %s.' % (self.size, arrays.shape))
+
+        if self._theano_batch_function is None:
+            self._build_batch_function()
+
+        logps, dlogps = self._theano_batch_function(arrays)
+        if grad_out is None:
+            return logps, dlogps
+        else:
+            grad_out[...] = dlogps
+            return logps
+
+    def _build_batch_function(self):
+        """Compile a scan of the joined value and gradient over the rows
+        of a matrix."""
+        arrays = tt.matrix('__args_batch', dtype=self._vars_joined.dtype)
+
+        def value_grad(array):
+            return theano.clone([self._cost_joined, self._grad_joined],
+                                replace={self._vars_joined: array})
+
+        (values, grads), _ = theano.scan(value_grad, sequences=[arrays])
+        self._theano_batch_function = theano.function(
+            [arrays], [values, grads], givens=self._givens,
+            **self._theano_kwargs)
+
     @property
     def profile(self):
         """Profiling information of the underlying theano function."""
@@ -679,6 +742,12 @@ class Model(six.with_metaclass(InitContextMeta, Context, Factor, WithMemoization
 
         return bij
 
+    @property
+    @memoize(bound=True)
+    def _draw_values_plans(self):
+        """Evaluation plans cached by `draw_values`, see there."""
+        return collections.OrderedDict()
+
     @property
     def dict_to_array(self):
         return self.bijection.map
@@ -697,6 +766,18 @@ class Model(six.with_metaclass(InitContextMeta, Context, Factor, WithMemoization
         return self.bijection.mapf(self.fastdlogp(vars))
 
     def logp_dlogp_function(self, grad_vars=None, **kwargs):
+        """Compile a theano function that computes logp and gradient.
+
+        Parameters
+        ----------
+        grad_vars : list of random variables, optional
+            Compute the gradient with respect to those variables. If None,
+            use all free random variables of this model.
+        kwargs
+            Extra arguments are passed on to `ValueGradFunction`. Use
+            `batched=True` to also compile `ValueGradFunction.batch`,
+            which evaluates an `(n, size)` array of points at once.
+        """
         if grad_vars is None:
             grad_vars = list(typefilter(self.free_RVs, continuous_types))
         else:
@@ -853,6 +934,8 @@ class Model(six.with_metaclass(InitContextMeta, Context, Factor, WithMemoization
         self.named_vars[var.name] = var
         if not hasattr(self, self.name_of(var.name)):
             setattr(self, self.name_of(var.name), var)
+        # cached evaluation plans may be invalid for the changed graph
+        self.root._draw_values_plans.clear()
 
     @property
     def prefix(self):
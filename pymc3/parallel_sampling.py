@@ -40,36 +40,94 @@ def rebuild_exc(exc, tb):
 
 
 # Messages
-# ('writing_done', is_last, sample_idx, tuning, stats)
+# ('writing_done', num_written, is_last, warnings)
 # ('error', *exception_info)
 
 # ('abort', reason)
-# ('write_next',)
+# ('read',)
 # ('start',)
 
+# The number of draws the main process has read from the buffer is
+# shared with the worker through `_ReadState`. The worker only waits
+# for a ('read',) message if it set the `waiting` flag.
+
+
+# Default upper bound on the memory of the draw buffer of each chain
+DEFAULT_BUFFER_BYTES = 2 ** 24
+# Default upper bound on the number of draws in the buffer of each chain
+DEFAULT_BUFFER_DEPTH = 100
+# Minimal time in seconds between two notifications about new draws
+# unless the buffer is half full
+NOTIFY_INTERVAL = 0.05
+
+
+class _ReadState(ctypes.Structure):
+    _fields_ = [('num_read', ctypes.c_int64), ('waiting', ctypes.c_bool)]
+
+
+def _make_shared_array(name, shape, dtype):
+    size = 1
+    for dim in shape:
+        size *= int(dim)
+    size *= dtype.itemsize
+    if size != ctypes.c_size_t(size).value:
+        raise ValueError('Variable %s is too large' % name)
+
+    array = multiprocessing.sharedctypes.RawArray('c', size)
+    return array, np.frombuffer(array, dtype).reshape(shape)
+
+
+def _default_buffer_depth(step_method):
+    """Number of draws that fit into `DEFAULT_BUFFER_BYTES`."""
+    point_bytes = 0
+    for shape, dtype in step_method.vars_shape_dtype.values():
+        point_bytes += int(np.prod(shape, dtype=int)) * dtype.itemsize
+    depth = DEFAULT_BUFFER_BYTES // max(point_bytes, 1)
+    return int(min(max(depth, 1), DEFAULT_BUFFER_DEPTH))
+
+
+def _stats_dtypes(step_method):
+    if step_method.generates_stats:
+        return step_method.stats_dtypes
+    return []
+
 
 class _Process(multiprocessing.Process):
     """Seperate process for each chain.
 
-    We communicate with the main process using a pipe,
-    and send finished samples using shared memory.
+    We communicate with the main process using a pipe, and send
+    finished samples and sampler stats using a ring buffer in shared
+    memory. The process only waits for the main process if the buffer
+    is full.
+
+    If a trace is given, the process records the samples in the trace
+    itself and only reports its progress to the main process.
     """
     def __init__(self, name, msg_pipe, step_method, shared_point,
-                 draws, tune, seed):
+                 shared_stats, read_state, read_lock, buffer_depth,
+                 draws, tune, seed, chain, strace=None):
         super(_Process, self).__init__(daemon=True, name=name)
         self._msg_pipe = msg_pipe
         self._step_method = step_method
         self._shared_point = shared_point
+        self._shared_stats = shared_stats
+        self._read_state = read_state
+        self._read_lock = read_lock
+        self._buffer_depth = buffer_depth
         self._seed = seed
         self._tt_seed = seed + 1
         self._draws = draws
         self._tune = tune
+        self._chain = chain
+        self._strace = strace
 
     def run(self):
         try:
             # We do not create this in __init__, as pickling this
             # would destroy the shared memory.
-            self._point = self._make_numpy_refs()
+            self._buffer, self._stats_buffer = self._make_numpy_refs()
+            self._point = {name: np.array(vals[0])
+                           for name, vals in self._buffer.items()}
             self._start_loop()
         except KeyboardInterrupt:
             pass
@@ -81,26 +139,89 @@ class _Process(multiprocessing.Process):
 
     def _make_numpy_refs(self):
         shape_dtypes = self._step_method.vars_shape_dtype
-        point = {}
+        buffer = {}
         for name, (shape, dtype) in shape_dtypes.items():
             array = self._shared_point[name]
-            self._shared_point[name] = array
-            point[name] = np.frombuffer(array, dtype).reshape(shape)
-        return point
+            buffer[name] = np.frombuffer(array, dtype).reshape(
+                (self._buffer_depth,) + tuple(shape))
+        stats_buffer = []
+        all_stats_dtypes = _stats_dtypes(self._step_method)
+        for arrays, stats_dtypes in zip(self._shared_stats, all_stats_dtypes):
+            stats_buffer.append({
+                key: np.frombuffer(arrays[key], np.dtype(dtype))
+                for key, dtype in stats_dtypes.items()})
+        return buffer, stats_buffer
+
+    def _setup_trace(self):
+        strace = self._strace
+        if self._step_method.generates_stats and strace.supports_sampler_stats:
+            strace.setup(self._draws + self._tune, self._chain,
+                         self._step_method.stats_dtypes)
+        else:
+            strace.setup(self._draws + self._tune, self._chain)
 
-    def _write_point(self, point):
+    def _write_draw(self, idx, point, stats):
+        if self._strace is not None:
+            self._point = point
+            if stats is not None and self._strace.supports_sampler_stats:
+                self._strace.record(point, stats)
+            else:
+                self._strace.record(point)
+            return
         for name, vals in point.items():
             self._point[name][...] = vals
+            self._buffer[name][idx] = vals
+        if stats is not None:
+            for stats_buffer, stat in zip(self._stats_buffer, stats):
+                for key, vals in stats_buffer.items():
+                    vals[idx] = stat[key]
 
     def _recv_msg(self):
         return self._msg_pipe.recv()
 
+    def _handle_msg(self, msg):
+        if msg[0] == 'abort':
+            raise KeyboardInterrupt()
+        elif msg[0] != 'read':
+            raise ValueError('Unknown message ' + msg[0])
+
+    def _num_read(self, wait_for=None):
+        """Number of draws the main process has read from the buffer.
+
+        If `wait_for` is given, block until at least that many draws
+        have been read.
+        """
+        while True:
+            with self._read_lock:
+                num_read = self._read_state.num_read
+                if wait_for is None or num_read >= wait_for:
+                    return num_read
+                self._read_state.waiting = True
+            self._handle_msg(self._recv_msg())
+
+    def _notify(self, num_written, is_last):
+        while self._msg_pipe.poll():
+            self._handle_msg(self._recv_msg())
+        if is_last:
+            warns = self._collect_warnings()
+        else:
+            warns = None
+        self._msg_pipe.send(('writing_done', num_written, is_last, warns))
+        self._num_notified = num_written
+        self._last_notify = time.time()
+
     def _start_loop(self):
         np.random.seed(self._seed)
         theanof.set_tt_rng(self._tt_seed)
 
         draw = 0
-        tuning = True
+        depth = self._buffer_depth
+        if self._strace is not None:
+            # Nothing is read from the buffer, so the worker never has
+            # to wait and only the interval limits the notifications.
+            depth = self._draws + self._tune
+        self._num_notified = 0
+        self._last_notify = time.time()
 
         msg = self._recv_msg()
         if msg[0] == 'abort':
@@ -108,31 +229,41 @@ class _Process(multiprocessing.Process):
         if msg[0] != 'start':
             raise ValueError('Unexpected msg ' + msg[0])
 
-        while True:
-            if draw < self._draws + self._tune:
+        if self._strace is not None:
+            self._setup_trace()
+        try:
+            while draw < self._draws + self._tune:
                 point, stats = self._compute_point()
-            else:
-                return
-
-            if draw == self._tune:
-                self._step_method.stop_tuning()
-                tuning = False
-
-            msg = self._recv_msg()
-            if msg[0] == 'abort':
-                raise KeyboardInterrupt()
-            elif msg[0] == 'write_next':
-                self._write_point(point)
-                is_last = draw + 1 == self._draws + self._tune
-                if is_last:
-                    warns = self._collect_warnings()
-                else:
-                    warns = None
-                self._msg_pipe.send(
-                    ('writing_done', is_last, draw, tuning, stats, warns))
+
+                if draw == self._tune:
+                    self._step_method.stop_tuning()
+
+                # Wait until the main process has read the oldest draw.
+                # We only notify the main process if it has read
+                # everything it knows about, it then reads all draws
+                # written since.
+                while draw - self._num_read() >= depth:
+                    if self._num_read() == self._num_notified:
+                        self._notify(draw, False)
+                    self._num_read(wait_for=self._num_notified)
+
+                self._write_draw(draw % depth, point, stats)
                 draw += 1
-            else:
-                raise ValueError('Unknown message ' + msg[0])
+
+                if draw == self._draws + self._tune:
+                    break
+                if self._num_read() == self._num_notified:
+                    if (2 * (draw - self._num_notified) >= depth or
+                            time.time() - self._last_notify > NOTIFY_INTERVAL):
+                        self._notify(draw, False)
+        finally:
+            # The trace has to be complete before the main process
+            # reads it, and also if sampling was aborted.
+            if self._strace is not None:
+                self._strace.close()
+
+        self._num_read(wait_for=self._num_notified)
+        self._notify(draw, True)
 
     def _compute_point(self):
         if self._step_method.generates_stats:
@@ -150,56 +281,113 @@ class _Process(multiprocessing.Process):
 
 
 class ProcessAdapter(object):
-    """Control a Chain process from the main thread."""
-    def __init__(self, draws, tune, step_method, chain, seed, start):
+    """Control a Chain process from the main thread.
+
+    Draws are stored by the process in a ring buffer of `buffer_depth`
+    draws. If `buffer_depth` is None, it is chosen such that the buffer
+    takes at most `DEFAULT_BUFFER_BYTES` bytes, with at most
+    `DEFAULT_BUFFER_DEPTH` draws.
+
+    If `strace` is given, it is set up, filled and closed in the process,
+    and the draws returned by `read_draws` contain neither points nor
+    stats. The trace must support this, see
+    `pymc3.backends.base.BaseTrace.supports_worker_recording`.
+    """
+    def __init__(self, draws, tune, step_method, chain, seed, start,
+                 buffer_depth=None, strace=None):
         self.chain = chain
         process_name = "worker_chain_%s" % chain
         self._msg_pipe, remote_conn = multiprocessing.Pipe()
 
+        self._strace = strace
+        if strace is not None:
+            # Only the start point goes through the buffer.
+            buffer_depth = 1
+        elif buffer_depth is None:
+            buffer_depth = _default_buffer_depth(step_method)
+        if buffer_depth < 1:
+            raise ValueError('buffer_depth must be positive.')
+        self._buffer_depth = buffer_depth
+
         self._shared_point = {}
-        self._point = {}
+        self._buffer = {}
         for name, (shape, dtype) in step_method.vars_shape_dtype.items():
-            size = 1
-            for dim in shape:
-                size *= int(dim)
-            size *= dtype.itemsize
-            if size != ctypes.c_size_t(size).value:
-                raise ValueError('Variable %s is too large' % name)
-
-            array = multiprocessing.sharedctypes.RawArray('c', size)
+            array, array_np = _make_shared_array(
+                name, (buffer_depth,) + tuple(shape), dtype)
+            # The process starts from the point in the first slot
+            array_np[0] = start[name]
             self._shared_point[name] = array
-            array_np = np.frombuffer(array, dtype).reshape(shape)
-            array_np[...] = start[name]
-            self._point[name] = array_np
+            self._buffer[name] = array_np
+
+        self._shared_stats = []
+        self._stats_buffer = []
+        for stats_dtypes in _stats_dtypes(step_method):
+            arrays = {}
+            arrays_np = {}
+            for key, dtype in stats_dtypes.items():
+                arrays[key], arrays_np[key] = _make_shared_array(
+                    key, (buffer_depth,), np.dtype(dtype))
+            self._shared_stats.append(arrays)
+            self._stats_buffer.append(arrays_np)
+        self._generates_stats = (step_method.generates_stats and
+                                 strace is None)
 
-        self._readable = True
         self._num_samples = 0
+        self._num_written = 0
+        self._read_state = multiprocessing.sharedctypes.RawValue(_ReadState)
+        self._read_lock = multiprocessing.Lock()
 
         self._process = _Process(
             process_name, remote_conn, step_method, self._shared_point,
-            draws, tune, seed)
+            self._shared_stats, self._read_state, self._read_lock,
+            buffer_depth, draws, tune, seed, chain, strace)
         # We fork right away, so that the main process can start tqdm threads
         self._process.start()
 
-    @property
-    def shared_point_view(self):
-        """May only be written to or read between a `recv_draw`
-        call from the process and a `write_next` or `abort` call.
+    def read_draws(self):
+        """Copy the draws announced by the last `recv_draws` call out of
+        the buffer. Returns a list of `(draw_idx, point, stats)` tuples.
+
+        The buffer slots are only released by a call to `ack`.
         """
-        if not self._readable:
-            raise RuntimeError()
-        return self._point
+        draws = []
+        for draw_idx in range(self._num_samples, self._num_written):
+            if self._strace is not None:
+                draws.append((draw_idx, None, None))
+                continue
+            idx = draw_idx % self._buffer_depth
+            point = {name: np.array(vals[idx])
+                     for name, vals in self._buffer.items()}
+            if self._generates_stats:
+                stats = [{key: vals[idx] for key, vals in stats_buffer.items()}
+                         for stats_buffer in self._stats_buffer]
+            else:
+                stats = None
+            draws.append((draw_idx, point, stats))
+        self._num_samples = self._num_written
+        return draws
 
     def start(self):
         self._msg_pipe.send(('start',))
 
-    def write_next(self):
-        self._readable = False
-        self._msg_pipe.send(('write_next',))
+    def ack(self):
+        """Tell the process that all draws up to now have been read."""
+        with self._read_lock:
+            self._read_state.num_read = self._num_samples
+            waiting = self._read_state.waiting
+            self._read_state.waiting = False
+        if waiting:
+            self._msg_pipe.send(('read',))
 
     def abort(self):
         self._msg_pipe.send(('abort',))
 
+    def reopen_trace(self):
+        """Make the trace the process recorded to readable in the
+        main process."""
+        if self._strace is not None:
+            self._strace.reopen(self.chain)
+
     def join(self, timeout=None):
         self._process.join(timeout)
 
@@ -207,7 +395,12 @@ class ProcessAdapter(object):
         self._process.terminate()
 
     @staticmethod
-    def recv_draw(processes, timeout=3600):
+    def recv_draws(processes, timeout=3600):
+        """Wait until one of the processes has written new draws.
+
+        Returns a tuple `(process, is_last, warnings)`. The new draws
+        can be retrieved with `process.read_draws()`.
+        """
         if not processes:
             raise ValueError('No processes.')
         pipes = [proc._msg_pipe for proc in processes]
@@ -222,9 +415,8 @@ class ProcessAdapter(object):
             old = msg[1]
             six.raise_from(RuntimeError('Chain %s failed.' % proc.chain), old)
         elif msg[0] == 'writing_done':
-            proc._readable = True
-            proc._num_samples += 1
-            return (proc,) + msg[1:]
+            proc._num_written = msg[1]
+            return (proc,) + msg[2:]
         else:
             raise ValueError('Sampler sent bad message.')
 
@@ -259,26 +451,46 @@ Draw = namedtuple(
 
 
 class ParallelSampler(object):
+    """Sample chains in parallel processes.
+
+    If `traces` is given, each process records its chain in its trace
+    and the draws yielded by the sampler only contain the progress. The
+    traces can be read in the main process once the sampler was closed.
+
+    If `diagnostics` (an `OnlineDiagnostics` instance) is given, it is
+    updated with each draw after the tuning draws as the draws arrive.
+    """
     def __init__(self, draws, tune, chains, cores, seeds, start_points,
-                 step_method, start_chain_num=0, progressbar=True):
+                 step_method, start_chain_num=0, progressbar=True,
+                 buffer_depth=None, traces=None, diagnostics=None):
         if progressbar:
             import tqdm
             tqdm_ = tqdm.tqdm
 
-        if any(len(arg) != chains for arg in [seeds, start_points]):
+        if traces is None:
+            traces = [None] * chains
+        elif diagnostics is not None:
+            raise ValueError('Online diagnostics need the draws, which are '
+                             'not sent by processes that record traces.')
+        if any(len(arg) != chains for arg in [seeds, start_points, traces]):
             raise ValueError(
-                'Number of seeds and start_points must be %s.' % chains)
+                'Number of seeds, start_points and traces must be %s.'
+                % chains)
 
         self._samplers = [
             ProcessAdapter(draws, tune, step_method,
-                           chain + start_chain_num, seed, start)
-            for chain, seed, start in zip(range(chains), seeds, start_points)
+                           chain + start_chain_num, seed, start,
+                           buffer_depth, strace)
+            for chain, seed, start, strace
+            in zip(range(chains), seeds, start_points, traces)
         ]
 
         self._inactive = self._samplers.copy()
         self._finished = []
         self._active = []
         self._max_active = cores
+        self._tune = tune
+        self._diagnostics = diagnostics
 
         self._in_context = False
         self._start_chain_num = start_chain_num
@@ -293,7 +505,6 @@ class ParallelSampler(object):
         while self._inactive and len(self._active) < self._max_active:
             proc = self._inactive.pop(0)
             proc.start()
-            proc.write_next()
             self._active.append(proc)
 
     def __iter__(self):
@@ -302,29 +513,27 @@ class ParallelSampler(object):
         self._make_active()
 
         while self._active:
-            draw = ProcessAdapter.recv_draw(self._active)
-            proc, is_last, draw, tuning, stats, warns = draw
-            if self._progress is not None:
-                self._progress.update()
+            proc, is_last, warns = ProcessAdapter.recv_draws(self._active)
+            draws = proc.read_draws()
 
             if is_last:
                 proc.join()
                 self._active.remove(proc)
                 self._finished.append(proc)
                 self._make_active()
-
-            # We could also yield proc.shared_point_view directly,
-            # and only call proc.write_next() after the yield returns.
-            # This seems to be faster overally though, as the worker
-            # loses less time waiting.
-            point = {name: val.copy()
-                     for name, val in proc.shared_point_view.items()}
-
-            # Already called for new proc in _make_active
-            if not is_last:
-                proc.write_next()
-
-            yield Draw(proc.chain, is_last, draw, tuning, stats, point, warns)
+            else:
+                # Release the buffer before yielding, so that the worker
+                # loses less time waiting.
+                proc.ack()
+
+            for i, (draw_idx, point, stats) in enumerate(draws):
+                if self._progress is not None:
+                    self._progress.update()
+                last = is_last and i == len(draws) - 1
+                if self._diagnostics is not None and draw_idx >= self._tune:
+                    self._diagnostics.update(proc.chain, point)
+                yield Draw(proc.chain, last, draw_idx, draw_idx < self._tune,
+                           stats, point, warns if last else None)
 
     def __enter__(self):
         self._in_context = True
@@ -332,5 +541,7 @@ class ParallelSampler(object):
 
     def __exit__(self, *args):
         ProcessAdapter.terminate_all(self._samplers)
+        for proc in self._samplers:
+            proc.reopen_trace()
         if self._progress is not None:
             self._progress.close()
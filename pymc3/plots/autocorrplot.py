@@ -1,18 +1,18 @@
 import itertools
 import numpy as np
 
-try:
-    import matplotlib.pyplot as plt
-except ImportError:  # mpl is optional
-    pass
-
 from .utils import get_default_varnames, get_axis
+from ..stats import autocorr_batch
 
 
 def autocorrplot(trace, varnames=None, max_lag=100, burn=0, plot_transformed=False,
                  symmetric_plot=False, ax=None, figsize=None):
     """Bar plot of the autocorrelation function for a trace.
 
+    The autocorrelations of all chains and elements of a variable are
+    computed at once, up to `max_lag`, like in `pymc3.stats.autocorr_batch`.
+    Variables with more than one dimension get one plot for each element.
+
     Parameters
     ----------
     trace : result of MCMC run
@@ -41,44 +41,53 @@ def autocorrplot(trace, varnames=None, max_lag=100, burn=0, plot_transformed=Fal
     """
     def _handle_array_varnames(varname):
         if trace[0][varname].__class__ is np.ndarray:
-            k = trace[varname].shape[1]
-            for i in range(k):
-                yield varname + '_{0}'.format(i)
+            shape = trace[0][varname].shape
+            for k, idx in enumerate(np.ndindex(*shape)):
+                name = '_'.join([varname] + [str(i) for i in idx])
+                yield name, varname, k
         else:
-            yield varname
+            yield varname, varname, None
 
     if varnames is None:
         varnames = get_default_varnames(trace.varnames, plot_transformed)
 
-    varnames = list(itertools.chain.from_iterable(map(_handle_array_varnames, varnames)))
+    entries = list(itertools.chain.from_iterable(map(_handle_array_varnames, varnames)))
 
     nchains = trace.nchains
 
     if figsize is None:
-        figsize = (12, len(varnames) * 2)
+        figsize = (12, len(entries) * 2)
 
-    ax = get_axis(ax, len(varnames), nchains,
+    ax = get_axis(ax, len(entries), nchains,
                   squeeze=False, sharex=True, sharey=True, figsize=figsize)
 
-    max_lag = min(len(trace) - 1, max_lag)
+    max_lag = min(len(trace) - burn - 1, max_lag)
+    lags = np.arange(-max_lag, max_lag + 1)
+
+    acorrs = {}
+    for i, (v, varname, k) in enumerate(entries):
+        if varname not in acorrs:
+            values = np.array(trace.get_values(varname, burn=burn,
+                                               combine=False))
+            acorr = autocorr_batch(values, max_lag)
+            # One column for each element of the variable
+            acorrs[varname] = acorr.reshape(acorr.shape[:2] + (-1,))
+        acorr = acorrs[varname]
+        if k is not None:
+            acorr = acorr[:, :, k]
+        else:
+            acorr = acorr[:, :, 0]
 
-    for i, v in enumerate(varnames):
         for j, chain in enumerate(trace.chains):
-            try:
-                d = np.squeeze(trace.get_values(v, chains=[chain], burn=burn,
-                                                combine=False))
-            except KeyError:
-                k = int(v.split('_')[-1])
-                v_use = '_'.join(v.split('_')[:-1])
-                d = np.squeeze(trace.get_values(v_use, chains=[chain],
-                                                burn=burn, combine=False)[:, k])
-
-            ax[i, j].acorr(d, detrend=plt.mlab.detrend_mean, maxlags=max_lag)
+            # Symmetric around lag 0, like `matplotlib.axes.Axes.acorr`
+            c = np.concatenate([acorr[j, :0:-1], acorr[j]])
+            ax[i, j].vlines(lags, 0, c)
+            ax[i, j].axhline(0)
 
             if j == 0:
                 ax[i, j].set_ylabel("correlation")
 
-            if i == len(varnames) - 1:
+            if i == len(entries) - 1:
                 ax[i, j].set_xlabel("lag")
 
             if not symmetric_plot:
@@ -1,5 +1,6 @@
 from collections import defaultdict, Iterable
 from copy import copy
+import itertools
 import pickle
 import logging
 import warnings
@@ -12,13 +13,14 @@ import theano.gradient as tg
 
 from .backends.base import BaseTrace, MultiTrace
 from .backends.ndarray import NDArray
-from .distributions.distribution import draw_values
+from .distributions.distribution import draw_values, _BatchPoint
 from .model import modelcontext, Point, all_continuous
 from .step_methods import (NUTS, HamiltonianMC, Metropolis, BinaryMetropolis,
                            BinaryGibbsMetropolis, CategoricalGibbsMetropolis,
-                           Slice, CompoundStep, arraystep, smc)
+                           Slice, CompoundStep, VectorizedNUTS, arraystep, smc)
 from .util import update_start_vals, get_untransformed_name, is_transformed_name, get_default_varnames
 from .vartypes import discrete_types
+from .diagnostics import OnlineDiagnostics
 from pymc3.step_methods.hmc import quadpotential
 from pymc3 import plots
 import pymc3 as pm
@@ -190,7 +192,8 @@ def _cpu_count():
 def sample(draws=500, step=None, init='auto', n_init=200000, start=None, trace=None, chain_idx=0,
            chains=None, cores=None, tune=500, nuts_kwargs=None, step_kwargs=None, progressbar=True,
            model=None, random_seed=None, live_plot=False, discard_tuned_samples=True,
-           live_plot_kwargs=None, compute_convergence_checks=True, use_mmap=False, **kwargs):
+           live_plot_kwargs=None, compute_convergence_checks=True, use_mmap=False,
+           target_ess=None, max_rhat=None, check_interval=100, **kwargs):
     """Draw samples from the posterior using the given step methods.
 
     Multiple step methods are supported via compound step methods.
@@ -214,6 +217,8 @@ def sample(draws=500, step=None, init='auto', n_init=200000, start=None, trace=N
           as starting point.
         * jitter+adapt_diag : Same as `adapt_diag`, but add uniform jitter in [-1, 1] to the
           starting point in each chain.
+        * jitter+adapt_full : Same as `jitter+adapt_diag`, but adapt a dense mass matrix based
+          on the covariance of the tuning samples.
         * advi+adapt_diag : Run ADVI and then adapt the resulting diagonal mass matrix based on the
           sample variance of the tuning samples.
         * advi+adapt_diag_grad : Run ADVI and then adapt the resulting diagonal mass matrix based
@@ -290,6 +295,29 @@ def sample(draws=500, step=None, init='auto', n_init=200000, start=None, trace=N
     use_mmap : bool, default=False
         Whether to use joblib's memory mapping to share numpy arrays when sampling across multiple
         cores. Ignored when using 'SMC'
+    target_ess : float
+        If given, stop sampling all chains once the running estimate of the effective sample size
+        of all free variables (see `pymc3.diagnostics.OnlineDiagnostics`) reaches this target.
+        `draws` is then the maximum number of draws per chain, and the returned trace is trimmed
+        to the length of the shortest chain. Ignored when using 'SMC'.
+    max_rhat : float
+        If given, stop sampling only once the running Gelman-Rubin statistic of all free variables
+        is at most this threshold (and `target_ess` is reached, if given). When sampling in
+        parallel, `target_ess` and `max_rhat` require `cores >= chains`.
+    check_interval : int
+        Number of draws per chain between two checks of `target_ess` and `max_rhat`. When the
+        chains are not sampled in parallel, they are advanced in turns of this many draws, each
+        with its own copy of the step methods and of their adaptation state (e.g. the mass matrix
+        and step size of NUTS).
+    buffer_depth : int
+        Only used when sampling in parallel (`cores > 1`): number of draws per chain in the shared
+        memory ring buffer through which the worker processes pass their draws to the main
+        process. By default, the buffer holds up to 100 draws and at most 16MB.
+    record_in_workers : bool, default=False
+        Only used when sampling in parallel (`cores > 1`): if True, each worker process records its
+        chain directly in the trace backend, and the main process only tracks the progress. This is
+        supported by the `Text`, `SQLite` and `MemmapNDArray` backends, and by `HDF5` with
+        `chain_files=True`. Other backends raise a ValueError.
 
     Returns
     -------
@@ -440,8 +468,33 @@ def sample(draws=500, step=None, init='auto', n_init=200000, start=None, trace=N
 
         has_population_samplers = np.any([ isinstance(m, arraystep.PopulationArrayStepShared)
             for m in (step.methods if isinstance(step, CompoundStep) else [step])])
-
-        parallel = cores > 1 and chains > 1 and not has_population_samplers
+        vectorized = isinstance(step, VectorizedNUTS)
+        if vectorized:
+            free_vars = set(var.name for var in model.vars)
+            if set(var.name for var in step.vars) != free_vars:
+                raise ValueError('VectorizedNUTS must sample all free '
+                                 'variables of the model.')
+
+        stopping = None
+        if target_ess is not None or max_rhat is not None:
+            if has_population_samplers or vectorized:
+                raise ValueError('Early stopping is not supported with '
+                                 'population samplers or VectorizedNUTS.')
+            diagnostics = sample_args.get('diagnostics')
+            if diagnostics is None:
+                diagnostics = sample_args['diagnostics'] = OnlineDiagnostics()
+            stopping = _EarlyStopping(diagnostics, chains, target_ess,
+                                      max_rhat, check_interval)
+            sample_args['stopping'] = stopping
+
+        parallel = (cores > 1 and chains > 1 and not has_population_samplers
+                    and not vectorized)
+        if parallel and stopping is not None and cores < chains:
+            # Chains beyond the first `cores` would only start once the
+            # first ones used up all their draws
+            raise ValueError('Early stopping with parallel sampling needs a '
+                             'process for each chain. Use cores >= chains, '
+                             'or cores=1 to sample the chains in turns.')
         if parallel:
             _log.info('Multiprocess sampling ({} chains in {} jobs)'.format(chains, cores))
             _print_step_hierarchy(step)
@@ -463,11 +516,19 @@ def sample(draws=500, step=None, init='auto', n_init=200000, start=None, trace=N
                 _log.info('Population sampling ({} chains)'.format(chains))
                 _print_step_hierarchy(step)
                 trace = _sample_population(**sample_args)
+            elif vectorized:
+                _log.info('Vectorized sampling ({} chains in 1 job)'.format(chains))
+                _print_step_hierarchy(step)
+                trace = _sample_vectorized(**sample_args)
             else:
                 _log.info('Sequential sampling ({} chains in 1 job)'.format(chains))
                 _print_step_hierarchy(step)
                 trace = _sample_many(**sample_args)
 
+        if stopping is not None and stopping.stopped:
+            _log.info('Convergence targets reached after {} draws per '
+                      'chain.'.format(len(trace) - tune))
+
         discard = tune if discard_tuned_samples else 0
         trace = trace[discard:]
 
@@ -508,7 +569,11 @@ def _check_start_shape(model, start):
         raise ValueError("Bad shape for start argument:{}".format(e))
 
 
-def _sample_many(draws, chain, chains, start, random_seed, step, **kwargs):
+def _sample_many(draws, chain, chains, start, random_seed, step,
+                 stopping=None, **kwargs):
+    if stopping is not None:
+        return _sample_interleaved(draws, chain, chains, start, random_seed,
+                                   step, stopping, **kwargs)
     traces = []
     for i in range(chains):
         trace = _sample(draws=draws, chain=chain + i, start=start[i],
@@ -527,6 +592,64 @@ def _sample_many(draws, chain, chains, start, random_seed, step, **kwargs):
     return MultiTrace(traces)
 
 
+def _sample_interleaved(draws, chain, chains, start, random_seed, step,
+                        stopping, trace=None, tune=None, model=None,
+                        progressbar=True, diagnostics=None, **kwargs):
+    """Sample the chains in turns of `stopping.check_interval` draws,
+    until `stopping` is met or all draws are done."""
+    samplers = []
+    for i in range(chains):
+        # need indepenent samplers for each chain, like population sampling
+        chainstep = _copy_step_for_chain(step)
+        strace = copy(trace) if isinstance(trace, BaseTrace) else trace
+        samplers.append(_iter_sample(draws, chainstep, start[i], strace,
+                                     chain + i, tune, model, random_seed[i],
+                                     diagnostics))
+
+    if progressbar:
+        progress = tqdm(total=chains * draws, unit='draws',
+                        desc='Sampling %s chains' % chains)
+    traces = [None] * chains
+    try:
+        while True:
+            active = False
+            for i, sampling in enumerate(samplers):
+                for strace in itertools.islice(sampling,
+                                               stopping.check_interval):
+                    traces[i] = strace
+                    active = True
+                    if progressbar:
+                        progress.update()
+            if not active or stopping.check():
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for sampling in samplers:
+            sampling.close()
+        if progressbar:
+            progress.close()
+
+    traces = [strace for strace in traces if strace is not None]
+    if not traces:
+        raise ValueError('Sampling stopped before a sample was created.')
+    length = min(len(strace) for strace in traces)
+    return MultiTrace(traces)[:length]
+
+
+def _copy_step_for_chain(step):
+    """Copy `step` for one of several chains that are sampled in turns.
+
+    Step methods with adaptation state that is changed in place, like the
+    potential of NUTS, copy it in their `_copy_for_chain` method.
+    """
+    if isinstance(step, CompoundStep):
+        return CompoundStep([_copy_step_for_chain(m) for m in step.methods])
+    if hasattr(step, '_copy_for_chain'):
+        return step._copy_for_chain()
+    return copy(step)
+
+
 def _sample_population(draws, chain, chains, start, random_seed, step, tune,
                        model, progressbar=None, parallelize=False, **kwargs):
     # create the generator that iterates all chains in parallel
@@ -544,14 +667,89 @@ def _sample_population(draws, chain, chains, start, random_seed, step, tune,
     return MultiTrace(latest_traces)
 
 
+def _sample_vectorized(draws, chain, chains, start, random_seed, step, tune,
+                       model, progressbar=None, trace=None, diagnostics=None,
+                       **kwargs):
+    """Sample all chains at once with a `VectorizedNUTS` step method."""
+    model = modelcontext(model)
+    draws = int(draws)
+    if random_seed is not None:
+        np.random.seed(random_seed)
+    if draws < 1:
+        raise ValueError('Argument `draws` should be above 0.')
+
+    chains = [chain + c for c in range(chains)]
+    traces = [_choose_backend(copy(trace), c, model=model) for c in chains]
+    for c, strace in enumerate(traces):
+        update_start_vals(start[c], model.test_point, model)
+        if strace.supports_sampler_stats:
+            strace.setup(draws, chains[c], step.stats_dtypes)
+        else:
+            strace.setup(draws, chains[c])
+    points = [Point(start[c], model=model) for c in range(len(chains))]
+    step.setup_chains(len(chains))
+
+    sampling = _iter_vectorized(draws, tune, step, traces, points,
+                                diagnostics)
+    if progressbar:
+        sampling = tqdm(sampling, total=draws)
+    try:
+        for _ in sampling:
+            pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if progressbar:
+            sampling.close()
+    length = min(len(strace) for strace in traces)
+    return MultiTrace(traces)[:length]
+
+
+def _iter_vectorized(draws, tune, step, traces, points, diagnostics=None):
+    """Generator that advances all chains with `step.step_chains`, records
+    the draws in `traces` and yields the traces after each draw.
+
+    If `diagnostics` is given, it is updated with the draws after tuning.
+    """
+    def close():
+        for c, strace in enumerate(traces):
+            strace.close()
+            strace._add_warnings(step.chain_warnings(c))
+
+    try:
+        step.tune = bool(tune)
+        for i in range(draws):
+            if i == tune:
+                step = stop_tuning(step)
+            updates = step.step_chains(points)
+            for c, strace in enumerate(traces):
+                points[c], states = updates[c]
+                if strace.supports_sampler_stats:
+                    strace.record(points[c], states)
+                else:
+                    strace.record(points[c])
+                if diagnostics is not None and i >= (tune or 0):
+                    diagnostics.update(strace.chain, points[c])
+            yield traces
+    except KeyboardInterrupt:
+        close()
+        raise
+    except BaseException:
+        for strace in traces:
+            strace.close()
+        raise
+    else:
+        close()
+
+
 def _sample(chain, progressbar, random_seed, start, draws=None, step=None,
             trace=None, tune=None, model=None, live_plot=False,
-            live_plot_kwargs=None, **kwargs):
+            live_plot_kwargs=None, diagnostics=None, **kwargs):
     skip_first = kwargs.get('skip_first', 0)
     refresh_every = kwargs.get('refresh_every', 100)
 
     sampling = _iter_sample(draws, step, start, trace, chain,
-                            tune, model, random_seed)
+                            tune, model, random_seed, diagnostics)
     if progressbar:
         sampling = tqdm(sampling, total=draws)
     try:
@@ -616,7 +814,13 @@ def iter_sample(draws, step, start=None, trace=None, chain=0, tune=None,
 
 
 def _iter_sample(draws, step, start=None, trace=None, chain=0, tune=None,
-                 model=None, random_seed=None):
+                 model=None, random_seed=None, diagnostics=None):
+    """Generator that records the draws of one chain in a trace and
+    yields the trace after each draw.
+
+    If `diagnostics` (an `OnlineDiagnostics` instance) is given, it is
+    updated with each draw after the tuning draws.
+    """
     model = modelcontext(model)
     draws = int(draws)
     if random_seed is not None:
@@ -660,6 +864,8 @@ def _iter_sample(draws, step, start=None, trace=None, chain=0, tune=None,
             else:
                 point = step.step(point)
                 strace.record(point)
+            if diagnostics is not None and i >= (tune or 0):
+                diagnostics.update(chain, point)
             yield strace
     except KeyboardInterrupt:
         strace.close()
@@ -968,7 +1174,8 @@ def _choose_backend(trace, chain, shortcuts=None, **kwds):
 
 def _mp_sample(draws, tune, step, chains, cores, chain, random_seed,
                start, progressbar, trace=None, model=None, use_mmap=False,
-               **kwargs):
+               buffer_depth=None, record_in_workers=False, diagnostics=None,
+               stopping=None, **kwargs):
 
     if sys.version_info.major >= 3:
         import pymc3.parallel_sampling as ps
@@ -985,7 +1192,13 @@ def _mp_sample(draws, tune, step, chains, cores, chain, random_seed,
             # for user supply start value, fill-in missing value if the supplied
             # dict does not contain all parameters
             update_start_vals(start[idx - chain], model.test_point, model)
-            if step.generates_stats and strace.supports_sampler_stats:
+            if record_in_workers:
+                # The worker processes set up the traces themselves
+                if not strace.supports_worker_recording:
+                    raise ValueError(
+                        'Backend %s does not support recording in the '
+                        'worker processes.' % type(strace).__name__)
+            elif step.generates_stats and strace.supports_sampler_stats:
                 strace.setup(draws + tune, idx + chain, step.stats_dtypes)
             else:
                 strace.setup(draws + tune, idx + chain)
@@ -993,28 +1206,45 @@ def _mp_sample(draws, tune, step, chains, cores, chain, random_seed,
 
         sampler = ps.ParallelSampler(
             draws, tune, chains, cores, random_seed, start, step,
-            chain, progressbar)
+            chain, progressbar, buffer_depth,
+            traces if record_in_workers else None, diagnostics)
         try:
             with sampler:
                 for draw in sampler:
                     trace = traces[draw.chain - chain]
-                    if trace.supports_sampler_stats and draw.stats is not None:
+                    if record_in_workers:
+                        # The worker already recorded the draw
+                        pass
+                    elif trace.supports_sampler_stats and draw.stats is not None:
                         trace.record(draw.point, draw.stats)
                     else:
                         trace.record(draw.point)
                     if draw.is_last:
-                        trace.close()
+                        if not record_in_workers:
+                            trace.close()
                         if draw.warnings is not None:
                             trace._add_warnings(draw.warnings)
+                    if (stopping is not None and not draw.tuning and
+                            stopping.check()):
+                        break
+            if stopping is not None and stopping.stopped:
+                length = min(len(trace) for trace in traces)
+                return MultiTrace(traces)[:length]
             return MultiTrace(traces)
         except KeyboardInterrupt:
             traces, length = _choose_chains(traces, tune)
             return MultiTrace(traces)[:length]
         finally:
-            for trace in traces:
-                trace.close()
+            if not record_in_workers:
+                for trace in traces:
+                    trace.close()
 
     else:
+        # The joblib workers would only update pickled copies
+        if diagnostics is not None or stopping is not None:
+            raise ValueError('Online diagnostics, target_ess and max_rhat '
+                             'are not supported with parallel sampling on '
+                             'python 2. Use cores=1 instead.')
         chain_nums = list(range(chain, chain + chains))
         pbars = [progressbar] + [False] * (chains - 1)
         jobs = (
@@ -1061,6 +1291,33 @@ def _choose_chains(traces, tune):
     return [traces[idx] for idx in idxs[:use_until]], final_length + tune
 
 
+class _EarlyStopping(object):
+    """Check the convergence targets of `sample` on online diagnostics,
+    each time all chains made `check_interval` more draws."""
+
+    def __init__(self, diagnostics, chains, target_ess=None, max_rhat=None,
+                 check_interval=100):
+        if check_interval < 1:
+            raise ValueError('check_interval must be positive.')
+        self.diagnostics = diagnostics
+        self.chains = chains
+        self.target_ess = target_ess
+        self.max_rhat = max_rhat
+        self.check_interval = check_interval
+        self.stopped = False
+        self._next_check = check_interval
+
+    def check(self):
+        """Whether sampling should stop."""
+        draws = self.diagnostics.draws
+        if len(draws) < self.chains or min(draws.values()) < self._next_check:
+            return False
+        self._next_check = min(draws.values()) + self.check_interval
+        self.stopped = self.diagnostics.converged(self.target_ess,
+                                                  self.max_rhat)
+        return self.stopped
+
+
 def stop_tuning(step):
     """ stop tuning the current step method """
 
@@ -1069,7 +1326,7 @@ def stop_tuning(step):
 
 
 def sample_ppc(trace, samples=None, model=None, vars=None, size=None,
-               random_seed=None, progressbar=True):
+               random_seed=None, progressbar=True, batch_size=None):
     """Generate posterior predictive samples from a model given a trace.
 
     Parameters
@@ -1093,6 +1350,15 @@ def sample_ppc(trace, samples=None, model=None, vars=None, size=None,
         Whether or not to display a progress bar in the command line. The bar shows the percentage
         of completion, the sampling speed in samples per second (SPS), and the estimated remaining
         time until completion ("expected time of arrival"; ETA).
+    batch_size : int
+        If given, the selected trace points are stacked into arrays and the
+        variables are drawn once for every `batch_size` points: the
+        parameters of the distributions are computed for each point, and
+        the random number generator is called once for all points of the
+        batch. Smaller batches use less memory. Batches that can not be
+        drawn at once, e.g. because a distribution does not draw its
+        samples with `generate_samples`, are drawn point by point with a
+        warning. Can not be combined with `size`.
 
     Returns
     -------
@@ -1114,14 +1380,14 @@ def sample_ppc(trace, samples=None, model=None, vars=None, size=None,
     if vars is None:
         vars = model.observed_RVs
 
+    if batch_size is not None and size is not None:
+        raise ValueError('sample_ppc can not combine batch_size and size.')
+
     if random_seed is not None:
         np.random.seed(random_seed)
 
     indices = np.random.randint(0, nchain * len_trace, samples)
 
-    if progressbar:
-        indices = tqdm(indices, total=samples)
-
     varnames = [var.name for var in vars]
 
     # draw once to inspect the shape
@@ -1131,6 +1397,14 @@ def sample_ppc(trace, samples=None, model=None, vars=None, size=None,
     for varname, value in var_values:
         ppc_trace[varname] = np.zeros((samples,) + value.shape, value.dtype)
 
+    if batch_size is not None:
+        shapes = [value.shape for _, value in var_values]
+        return _sample_ppc_batched(trace, indices, nchain, len_trace, vars,
+                                   shapes, batch_size, ppc_trace, progressbar)
+
+    if progressbar:
+        indices = tqdm(indices, total=samples)
+
     try:
         for slc, idx in enumerate(indices):
             if nchain > 1:
@@ -1153,6 +1427,97 @@ def sample_ppc(trace, samples=None, model=None, vars=None, size=None,
     return ppc_trace
 
 
+def _sample_ppc_batched(trace, indices, nchain, len_trace, vars, shapes,
+                        batch_size, ppc_trace, progressbar):
+    """Fill `ppc_trace` drawing `vars` for batches of stacked trace points."""
+    points = _stack_points(trace, indices, nchain, len_trace)
+    samples = len(indices)
+    warned = False
+
+    if progressbar:
+        progress = tqdm(total=samples)
+
+    try:
+        for start in range(0, samples, batch_size):
+            slc = slice(start, min(start + batch_size, samples))
+            n = slc.stop - slc.start
+            batch = {name: value[slc] for name, value in points.items()}
+            values = _draw_batch(vars, batch, n, shapes) if n > 1 else None
+            if values is not None:
+                for k, v in zip(vars, values):
+                    ppc_trace[k.name][slc] = v
+            else:
+                if n > 1 and not warned:
+                    warnings.warn('Could not draw a batch of %s points at '
+                                  'once, drawing it point by point.' % n)
+                    warned = True
+                for i in range(n):
+                    param = {name: value[i] for name, value in batch.items()}
+                    values = draw_values(vars, point=param)
+                    for k, v in zip(vars, values):
+                        ppc_trace[k.name][slc.start + i] = v
+            if progressbar:
+                progress.update(n)
+
+    except KeyboardInterrupt:
+        pass
+
+    finally:
+        if progressbar:
+            progress.close()
+
+    return ppc_trace
+
+
+def _stack_points(trace, indices, nchain, len_trace):
+    """Stack the trace points at `indices` into one array per variable.
+
+    Indices are resolved like in `sample_ppc`, i.e. index `i` refers to
+    draw ``i % len_trace`` of chain ``i // len_trace``.
+    """
+    if not isinstance(trace, MultiTrace):
+        points = [trace[idx] for idx in indices]
+        if not points:
+            return {}
+        return {name: np.asarray([point[name] for point in points])
+                for name in points[0]}
+
+    chain_idx, point_idx = np.divmod(indices, len_trace)
+    chains = trace.chains if nchain > 1 else trace.chains[-1:]
+    stacked = {}
+    for name in trace.varnames:
+        values = None
+        for i, chain in enumerate(chains):
+            mask = chain_idx == i
+            if not mask.any():
+                continue
+            chain_values = trace._straces[chain].get_values(name)[point_idx[mask]]
+            if values is None:
+                values = np.empty((len(indices),) + chain_values.shape[1:],
+                                  chain_values.dtype)
+            values[mask] = chain_values
+        stacked[name] = values
+    return stacked
+
+
+def _draw_batch(vars, point, n, shapes):
+    """Draw `vars` once for `n` points stacked along the first axis of the
+    values in `point`.
+
+    Returns None if the variables can not be drawn for the whole batch at
+    once, i.e. if drawing fails or the values do not have the shape
+    ``(n,) + shape`` for the corresponding entry of `shapes`.
+    """
+    try:
+        values = draw_values(vars, point=_BatchPoint(point, n), size=n)
+    except (ValueError, TypeError):
+        return None
+    if any(np.shape(value) != (n,) + shape
+           for value, shape in zip(values, shapes)):
+        return None
+    return values
+
+
 def sample_ppc_w(traces, samples=None, models=None, weights=None,
                  random_seed=None, progressbar=True):
     """Generate weighted posterior predictive samples from a list of models and
@@ -1351,6 +1716,8 @@ def init_nuts(init='auto', chains=1, n_init=500000, model=None,
           as starting point.
         * jitter+adapt_diag : Same as `adapt_diag`, but use uniform jitter in [-1, 1] as starting
           point in each chain.
+        * jitter+adapt_full : Same as `jitter+adapt_diag`, but adapt a dense mass matrix based
+          on the covariance of the tuning samples.
         * advi+adapt_diag : Run ADVI and then adapt the resulting diagonal mass matrix based on the
           sample variance of the tuning samples.
         * advi+adapt_diag_grad : Run ADVI and then adapt the resulting diagonal mass matrix based
@@ -1427,6 +1794,17 @@ def init_nuts(init='auto', chains=1, n_init=500000, model=None,
         var = np.ones_like(mean)
         potential = quadpotential.QuadPotentialDiagAdapt(
             model.ndim, mean, var, 10)
+    elif init == 'jitter+adapt_full':
+        start = []
+        for _ in range(chains):
+            mean = {var: val.copy() for var, val in model.test_point.items()}
+            for val in mean.values():
+                val[...] += 2 * np.random.rand(*val.shape) - 1
+            start.append(mean)
+        mean = np.mean([model.dict_to_array(vals) for vals in start], axis=0)
+        cov = np.eye(model.ndim)
+        potential = quadpotential.QuadPotentialFullAdapt(
+            model.ndim, mean, cov, 10)
     elif init == 'advi+adapt_diag_grad':
         approx = pm.fit(
             random_seed=random_seed,
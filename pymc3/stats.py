@@ -1,11 +1,18 @@
 """Statistical utility functions for PyMC"""
 
+import hashlib
 import numpy as np
 import pandas as pd
 import itertools
 from tqdm import tqdm
 import warnings
+import weakref
 from collections import namedtuple
+from multiprocessing.pool import ThreadPool
+from joblib import Parallel, delayed
+from six import string_types
+import theano
+import theano.tensor as tt
 from .model import modelcontext
 from .util import get_default_varnames
 import pymc3 as pm
@@ -17,8 +24,9 @@ from scipy.optimize import minimize
 from scipy.signal import fftconvolve
 
 
-__all__ = ['autocorr', 'autocov', 'waic', 'loo', 'hpd', 'quantiles',
-           'mc_error', 'summary', 'compare', 'bfmi', 'r2_score']
+__all__ = ['autocorr', 'autocov', 'autocorr_batch', 'autocov_batch', 'waic',
+           'loo', 'hpd', 'quantiles', 'mc_error', 'summary', 'compare', 'bfmi',
+           'r2_score']
 
 
 def statfunc(f):
@@ -116,9 +124,87 @@ def autocov(x, lag=None):
         return acov[lag]
 
 
-def _log_post_trace(trace, model=None, progressbar=False):
+def autocov_batch(x, max_lag=None):
+    """Compute the autocovariance estimates of `autocov` for every lag of
+    all chains and all elements of a variable at once.
+
+    Parameters
+    ----------
+    x : Numpy array
+        An array of shape (chains, draws, ...) containing MCMC samples
+    max_lag : int
+        Largest lag to compute. Defaults to all lags.
+
+    Returns
+    -------
+    acov: Numpy array of shape (chains, max_lag + 1, ...)
+    """
+    return _autocov_batch(np.asarray(x), max_lag, axis=1)
+
+
+def autocorr_batch(x, max_lag=None):
+    """Compute the autocorrelations of `autocorr` for every lag of all
+    chains and all elements of a variable at once.
+
+    Parameters
+    ----------
+    x : Numpy array
+        An array of shape (chains, draws, ...) containing MCMC samples
+    max_lag : int
+        Largest lag to compute. Defaults to all lags.
+
+    Returns
+    -------
+    acorr: Numpy array of shape (chains, max_lag + 1, ...)
+    """
+    acov = autocov_batch(x, max_lag)
+    return acov / acov[:, :1]
+
+
+def _autocov_batch(x, max_lag=None, axis=0):
+    """Compute the autocovariance estimates of `autocov` for every lag
+    along `axis` of `x`, for all other elements of `x` at once.
+
+    Parameters
+    ----------
+    x : Numpy array
+        An array with the MCMC samples along `axis`
+    max_lag : int
+        Largest lag to compute. Defaults to all lags.
+    axis : int
+        Axis of the samples
+
+    Returns
+    -------
+    acov: Numpy array of the same shape as `x`, except for `max_lag + 1`
+        lags along `axis`
+    """
+    n = x.shape[axis]
+    if max_lag is None or max_lag > n - 1:
+        max_lag = n - 1
+    y = x - x.mean(axis=axis, keepdims=True)
+    # Zero padding to a power of two of at least n + max_lag avoids the
+    # circular wrap-around of the FFT for the requested lags.
+    nfft = 2 ** int(np.ceil(np.log2(max(n + max_lag, 1))))
+    fy = np.fft.rfft(y, n=nfft, axis=axis)
+    acov = np.fft.irfft(fy * np.conjugate(fy), n=nfft, axis=axis)
+    index = [slice(None)] * x.ndim
+    index[axis] = slice(0, max_lag + 1)
+    # Copy the requested lags, so that the full result can be freed
+    acov = acov[tuple(index)].copy()
+    shape = [1] * x.ndim
+    shape[axis] = max_lag + 1
+    acov /= np.arange(n, n - max_lag - 1, -1).reshape(shape)
+    return acov
+
+
+def _log_post_trace(trace, model=None, progressbar=False, chunk_size=1000,
+                    cores=1):
     """Calculate the elementwise log-posterior for the sampled trace.
 
+    The log-likelihood of blocks of `chunk_size` draws is evaluated by a
+    single Theano function, which scans over the draws.
+
     Parameters
     ----------
     trace : result of MCMC run
@@ -128,6 +214,11 @@ def _log_post_trace(trace, model=None, progressbar=False):
         Whether or not to display a progress bar in the command line. The
         bar shows the percentage of completion, the evaluation speed, and
         the estimated time to completion
+    chunk_size : int
+        Number of draws that are evaluated at once. Bounds the memory
+        used for the values of the draws and their log-likelihood.
+    cores : int
+        Number of processes that evaluate the chunks of draws.
 
     Returns
     -------
@@ -135,37 +226,76 @@ def _log_post_trace(trace, model=None, progressbar=False):
         The contribution of the observations to the logp of the whole model.
     """
     model = modelcontext(model)
-    cached = [(var, var.logp_elemwise) for var in model.observed_RVs]
-
-    def logp_vals_point(pt):
-        if len(model.observed_RVs) == 0:
-            return floatX(np.array([], dtype='d'))
-
-        logp_vals = []
-        for var, logp in cached:
-            logp = logp(pt)
-            if var.missing_values:
-                logp = logp[~var.observations.mask]
-            logp_vals.append(logp.ravel())
-
-        return np.concatenate(logp_vals)
 
     try:
-        points = trace.points()
-    except AttributeError:
-        points = trace
-
-    points = tqdm(points) if progressbar else points
-
+        values = [trace.get_values(var.name) for var in model.vars]
+    except AttributeError:  # A list of points
+        values = [np.stack([pt[var.name] for pt in trace])
+                  for var in model.vars]
+    n_draws = len(values[0]) if values else len(trace)
+
+    if len(model.observed_RVs) == 0:
+        return floatX(np.empty((n_draws, 0), dtype='d'))
+
+    fn = _logp_elemwise_batch_fn(model)
+    if cores > 1:
+        bounds = np.linspace(0, n_draws, cores + 1).astype(int)
+        parts = Parallel(n_jobs=cores)(
+            delayed(_logp_elemwise_chunks)(
+                fn, [v[start:stop] for v in values], chunk_size)
+            for start, stop in zip(bounds[:-1], bounds[1:]))
+        return np.concatenate(parts)
+    return _logp_elemwise_chunks(fn, values, chunk_size, progressbar)
+
+
+def _logp_elemwise_batch_fn(model):
+    """Compile a function that maps values of the free variables of
+    `model`, stacked along a new first axis, to the matrix of the
+    elementwise log-likelihood of the observed variables."""
+    logps = []
+    for var in model.observed_RVs:
+        logp = tt.flatten(var.logp_elemwiset)
+        if var.missing_values:
+            logp = logp[np.flatnonzero(~np.ravel(var.observations.mask))]
+        logps.append(logp)
+    logp = tt.concatenate(logps)
+
+    vars = model.vars
+    batches = [tt.TensorType(var.dtype, (False,) + var.broadcastable)(var.name)
+               for var in vars]
+
+    def step(*var_values):
+        return theano.clone(logp, replace=dict(zip(vars, var_values)))
+
+    logp_batch, _ = theano.scan(step, sequences=batches)
+    with model:
+        return theano.function(batches, logp_batch,
+                               allow_input_downcast=True,
+                               on_unused_input='ignore',
+                               accept_inplace=True)
+
+
+def _logp_elemwise_chunks(fn, values, chunk_size, progressbar=False):
+    n_draws = len(values[0])
+    logp = []
+    if progressbar:
+        pbar = tqdm(total=n_draws)
     try:
-        logp = (logp_vals_point(pt) for pt in points)
-        return np.stack(logp)
+        for start in range(0, n_draws, chunk_size):
+            stop = min(start + chunk_size, n_draws)
+            logp.append(fn(*[v[start:stop] for v in values]))
+            if progressbar:
+                pbar.update(stop - start)
     finally:
         if progressbar:
-            points.close()
+            pbar.close()
+    if not logp:
+        return np.empty((0, 0))
+    return np.concatenate(logp)
 
 
-def waic(trace, model=None, pointwise=False, progressbar=False):
+def waic(trace, model=None, pointwise=False, progressbar=False, cores=1,
+         log_likelihood=None):
     """Calculate the widely available information criterion, its standard error
     and the effective number of parameters of the samples in trace from model.
     Read more theory here - in a paper by some of the leading authorities on
@@ -183,6 +313,11 @@ def waic(trace, model=None, pointwise=False, progressbar=False):
         Whether or not to display a progress bar in the command line. The
         bar shows the percentage of completion, the evaluation speed, and
         the estimated time to completion
+    cores : int
+        Number of processes that evaluate the log-likelihood of the draws.
+    log_likelihood : array
+        Precomputed pointwise log-likelihood of the draws, of shape
+        (n_samples, n_observations), instead of evaluating it on the model.
 
     Returns
     -------
@@ -194,9 +329,12 @@ def waic(trace, model=None, pointwise=False, progressbar=False):
          densities exceeds 0.4
     waic_i: and array of the pointwise predictive accuracy, only if pointwise True
     """
-    model = modelcontext(model)
-
-    log_py = _log_post_trace(trace, model, progressbar=progressbar)
+    if log_likelihood is None:
+        model = modelcontext(model)
+        log_py = _log_post_trace(trace, model, progressbar=progressbar,
+                                 cores=cores)
+    else:
+        log_py = np.asarray(log_likelihood)
     if log_py.size == 0:
         raise ValueError('The model does not contain observed values.')
 
@@ -232,7 +370,8 @@ def waic(trace, model=None, pointwise=False, progressbar=False):
         return WAIC_r(waic, waic_se, p_waic, warn_mg)
 
 
-def loo(trace, model=None, pointwise=False, reff=None, progressbar=False):
+def loo(trace=None, model=None, pointwise=False, reff=None, progressbar=False,
+        cores=1, log_likelihood=None):
     """Calculates leave-one-out (LOO) cross-validation for out of sample
     predictive model fit, following Vehtari et al. (2015). Cross-validation is
     computed using Pareto-smoothed importance sampling (PSIS).
@@ -240,6 +379,7 @@ def loo(trace, model=None, pointwise=False, reff=None, progressbar=False):
     Parameters
     ----------
     trace : result of MCMC run
+        Can be None if `log_likelihood` and `reff` are given.
     model : PyMC Model
         Optional model. Default None, taken from context.
     pointwise: bool
@@ -248,11 +388,19 @@ def loo(trace, model=None, pointwise=False, reff=None, progressbar=False):
     reff : float
         relative MCMC efficiency, `effective_n / n` i.e. number of effective
         samples divided by the number of actual samples. Computed from trace by
-        default.
+        default, or 1 if there is no trace.
     progressbar: bool
         Whether or not to display a progress bar in the command line. The
         bar shows the percentage of completion, the evaluation speed, and
         the estimated time to completion
+    cores : int
+        Number of processes that evaluate the log-likelihood of the draws
+        and smooth the importance weights of chunks of observations.
+    log_likelihood : array or str
+        Precomputed pointwise log-likelihood of the draws, of shape
+        (n_samples, n_observations), instead of evaluating it on the model.
+        A string is the path of a `.npy` file, which is memory-mapped and
+        read in chunks of observations.
 
     Returns
     -------
@@ -264,10 +412,8 @@ def loo(trace, model=None, pointwise=False, reff=None, progressbar=False):
         Pareto distribution is greater than 0.7 for one or more samples
     loo_i: array of pointwise predictive accuracy, only if pointwise True
     """
-    model = modelcontext(model)
-
     if reff is None:
-        if trace.nchains == 1:
+        if trace is None or trace.nchains == 1:
             reff = 1.
         else:
             eff = pm.effective_n(trace)
@@ -275,12 +421,30 @@ def loo(trace, model=None, pointwise=False, reff=None, progressbar=False):
             samples = len(trace) * trace.nchains
             reff = eff_ave / samples
 
-    log_py = _log_post_trace(trace, model, progressbar=progressbar)
+    if log_likelihood is None:
+        model = modelcontext(model)
+        log_py = _log_post_trace(trace, model, progressbar=progressbar,
+                                 cores=cores)
+    elif isinstance(log_likelihood, string_types):
+        log_py = np.load(log_likelihood, mmap_mode='r')
+    else:
+        log_py = log_likelihood
     if log_py.size == 0:
         raise ValueError('The model does not contain observed values.')
 
-    lw, ks = _psislw(-log_py, reff)
-    lw += log_py
+    # Smooth the importance weights of chunks of observations, so that only
+    # a few copies of the chunks are needed at a time.
+    n_obs = log_py.shape[1]
+    chunk = max(1, 2 ** 22 // len(log_py))
+    if cores > 1:
+        chunk = min(chunk, -(-n_obs // cores))
+    chunks = (log_py[:, i:i + chunk] for i in range(0, n_obs, chunk))
+    if cores > 1:
+        results = Parallel(n_jobs=cores)(
+            delayed(_psis_loo)(log_py_chunk, reff) for log_py_chunk in chunks)
+    else:
+        results = [_psis_loo(log_py_chunk, reff) for log_py_chunk in chunks]
+    loo_lppd_i, lppd_i, ks = [np.concatenate(res) for res in zip(*results)]
 
     warn_mg = 0
     if np.any(ks > 0.7):
@@ -292,10 +456,9 @@ def loo(trace, model=None, pointwise=False, reff=None, progressbar=False):
         happen with a non-robust model and highly influential observations.""")
         warn_mg = 1
 
-    loo_lppd_i = - 2 * logsumexp(lw, axis=0)
     loo_lppd = loo_lppd_i.sum()
     loo_lppd_se = (len(loo_lppd_i) * np.var(loo_lppd_i)) ** 0.5
-    lppd = np.sum(logsumexp(log_py, axis=0, b=1. / log_py.shape[0]))
+    lppd = np.sum(lppd_i)
     p_loo = lppd + (0.5 * loo_lppd)
 
     if pointwise:
@@ -311,9 +474,25 @@ def loo(trace, model=None, pointwise=False, reff=None, progressbar=False):
         return LOO_r(loo_lppd, loo_lppd_se, p_loo, warn_mg)
 
 
+def _psis_loo(log_py, reff):
+    """Pointwise LOO and log predictive densities and Pareto tail indices
+    of the observations in the columns of `log_py`."""
+    log_py = np.asarray(log_py, dtype=float)
+    lw, ks = _psislw(-log_py, reff)
+    lw += log_py
+    loo_lppd_i = - 2 * logsumexp(lw, axis=0)
+    lppd_i = logsumexp(log_py, axis=0, b=1. / log_py.shape[0])
+    return loo_lppd_i, lppd_i, ks
+
+
 def _psislw(lw, reff):
     """Pareto smoothed importance sampling (PSIS).
 
+    The columns are smoothed in blocks. In each block the log weights are
+    sorted at once, and the generalized Pareto distributions of all columns
+    whose right tail has the regular length are fitted together. Only
+    columns with ties at the cutoff are smoothed one by one.
+
     Parameters
     ----------
     lw : array
@@ -330,55 +509,100 @@ def _psislw(lw, reff):
     """
     n, m = lw.shape
 
-    lw_out = np.copy(lw, order='F')
+    lw_out = np.array(lw, dtype=float, order='F')
     kss = np.empty(m)
 
     # precalculate constants
     cutoff_ind = - int(np.ceil(min(n / 5., 3 * (n / reff) ** 0.5))) - 1
     cutoffmin = np.log(np.finfo(float).tiny)
     k_min = 1. / 3
-
-    # loop over sets of log weights
-    for i, x in enumerate(lw_out.T):
+    # length of the right tail if there are no ties at the cutoff
+    n_tail = - cutoff_ind - 1
+    n_grid = 30 + int(n_tail ** 0.5)
+    block = max(1, 2 ** 22 // (n_grid * max(n, n_tail)))
+
+    for start in range(0, m, block):
+        cols = slice(start, start + block)
+        x = lw_out[:, cols]
         # improve numerical accuracy
-        x -= np.max(x)
-        # sort the array
-        x_sort_ind = np.argsort(x)
+        x -= np.max(x, axis=0)
+        # sort the columns
+        x_sort_ind = np.argsort(x, axis=0)
+        x_sort = x[x_sort_ind, np.arange(x.shape[1])]
         # divide log weights into body and right tail
-        xcutoff = max(x[x_sort_ind[cutoff_ind]], cutoffmin)
-
-        expxcutoff = np.exp(xcutoff)
-        tailinds, = np.where(x > xcutoff)
-        x2 = x[tailinds]
-        n2 = len(x2)
-        if n2 <= 4:
-            # not enough tail samples for gpdfit
-            k = np.inf
-        else:
-            # order of tail samples
-            x2si = np.argsort(x2)
-            # fit generalized Pareto distribution to the right tail samples
-            x2 = np.exp(x2) - expxcutoff
-            k, sigma = _gpdfit(x2[x2si])
-
-        if k >= k_min and not np.isinf(k):
-            # no smoothing if short tail or GPD fit failed
-            # compute ordered statistic for the fit
-            sti = np.arange(0.5, n2) / n2
-            qq = _gpinv(sti, k, sigma)
-            qq = np.log(qq + expxcutoff)
-            # place the smoothed tail into the output array
-            x[tailinds[x2si]] = qq
-            # truncate smoothed values to the largest raw weight 0
-            x[x > 0] = 0
+        xcutoff = np.maximum(x_sort[cutoff_ind], cutoffmin)
+        regular = np.sum(x > xcutoff, axis=0) == n_tail
+
+        k = np.full(x.shape[1], np.inf)
+        if n_tail > 4 and np.any(regular):
+            # fit generalized Pareto distributions to the right tails
+            expxcutoff = np.exp(xcutoff[regular])
+            x2 = np.exp(x_sort[-n_tail:, regular]) - expxcutoff
+            k_reg, sigma = _gpdfit_columns(x2)
+            k[regular] = k_reg
+
+            smooth = (k_reg >= k_min) & ~np.isinf(k_reg)
+            if np.any(smooth):
+                # compute ordered statistic for the fit
+                sti = np.arange(0.5, n_tail) / n_tail
+                qq = _gpinv_columns(sti, k_reg[smooth], sigma[smooth])
+                qq = np.log(qq + expxcutoff[smooth])
+                # place the smoothed tails into the output array
+                smooth_cols = np.flatnonzero(regular)[smooth]
+                tailinds = x_sort_ind[-n_tail:, smooth_cols]
+                xs = x[:, smooth_cols]
+                xs[tailinds, np.arange(len(smooth_cols))] = qq
+                # truncate smoothed values to the largest raw weight 0
+                xs[xs > 0] = 0
+                x[:, smooth_cols] = xs
+
+        # columns with ties at the cutoff
+        for i in np.flatnonzero(~regular):
+            k[i] = _psislw_column(x[:, i], cutoff_ind, cutoffmin, k_min)
+
         # renormalize weights
-        x -= logsumexp(x)
+        x -= logsumexp(x, axis=0)
         # store tail index k
-        kss[i] = k
+        kss[cols] = k
 
     return lw_out, kss
 
 
+def _psislw_column(x, cutoff_ind, cutoffmin, k_min):
+    """Smooth the log weights `x` of one observation in place and return
+    the Pareto tail index."""
+    # sort the array
+    x_sort_ind = np.argsort(x)
+    # divide log weights into body and right tail
+    xcutoff = max(x[x_sort_ind[cutoff_ind]], cutoffmin)
+
+    expxcutoff = np.exp(xcutoff)
+    tailinds, = np.where(x > xcutoff)
+    x2 = x[tailinds]
+    n2 = len(x2)
+    if n2 <= 4:
+        # not enough tail samples for gpdfit
+        k = np.inf
+    else:
+        # order of tail samples
+        x2si = np.argsort(x2)
+        # fit generalized Pareto distribution to the right tail samples
+        x2 = np.exp(x2) - expxcutoff
+        k, sigma = _gpdfit(x2[x2si])
+
+    if k >= k_min and not np.isinf(k):
+        # no smoothing if short tail or GPD fit failed
+        # compute ordered statistic for the fit
+        sti = np.arange(0.5, n2) / n2
+        qq = _gpinv(sti, k, sigma)
+        qq = np.log(qq + expxcutoff)
+        # place the smoothed tail into the output array
+        x[tailinds[x2si]] = qq
+        # truncate smoothed values to the largest raw weight 0
+        x[x > 0] = 0
+    return k
+
+
 def _gpdfit(x):
     """Estimate the parameters for the Generalized Pareto Distribution (GPD)
 
@@ -429,6 +653,65 @@ def _gpdfit(x):
     return k, sigma
 
 
+def _gpdfit_columns(x):
+    """Estimate the parameters of the Generalized Pareto Distribution
+    (GPD) for each column of `x`, like `_gpdfit`.
+
+    Parameters
+    ----------
+    x : array
+        2D data array, with sorted columns
+
+    Returns
+    -------
+    k : array
+        estimated shape parameters
+    sigma : array
+        estimated scale parameters
+    """
+    prior_bs = 3
+    prior_k = 10
+    n = len(x)
+    m = 30 + int(n**0.5)
+
+    bs = 1 - np.sqrt(m / (np.arange(1, m + 1, dtype=float) - 0.5))
+    bs = bs[:, None] / (prior_bs * x[int(n/4 + 0.5) - 1])
+    bs += 1 / x[-1]
+
+    ks = np.log1p(-bs[:, None, :] * x).mean(axis=1)
+    L = n * (np.log(-(bs / ks)) - ks - 1)
+    w = 1 / np.exp(L[None, :, :] - L[:, None, :]).sum(axis=1)
+
+    # remove negligible weights
+    w[w < 10 * np.finfo(float).eps] = 0
+    # normalise w
+    w /= w.sum(axis=0)
+
+    # posterior mean for b
+    b = np.sum(bs * w, axis=0)
+    # estimate for k
+    k = np.log1p(- b * x).mean(axis=0)
+    # add prior for k
+    k = (n * k + prior_k * 0.5) / (n + prior_k)
+    sigma = - k / b
+
+    return k, sigma
+
+
+def _gpinv_columns(p, k, sigma):
+    """Inverse Generalized Pareto distribution function of the
+    probabilities `p` (with 0 < p < 1) for each pair of `k` and `sigma`.
+    """
+    p = p[:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = np.where(np.abs(k) < np.finfo(float).eps,
+                     - np.log1p(-p),
+                     np.expm1(-k * np.log1p(-p)) / k)
+    x = x * sigma
+    x[:, sigma <= 0] = np.nan
+    return x
+
+
 def _gpinv(p, k, sigma):
     """Inverse Generalized Pareto distribution function"""
     x = np.full_like(p, np.nan)
@@ -494,6 +777,10 @@ def compare(model_dict, ic='WAIC', method='stacking', b_samples=1000,
     round_to : int
         Number of decimals used to round results (default 2).
 
+    The pointwise log-likelihood and the IC of each pair of model and trace
+    are cached as long as the trace exists and does not change, so adding
+    a model to an existing comparison only computes the IC of the new model.
+
     Returns
     -------
     A DataFrame, ordered from lowest to highest IC. The index reflects
@@ -549,7 +836,7 @@ def compare(model_dict, ic='WAIC', method='stacking', b_samples=1000,
 
     ics = []
     for n, (m, t) in zip(names, model_dict.items()):
-        ics.append((n, ic_func(t, m, pointwise=True)))
+        ics.append((n, _cached_ic(ic_func, t, m)))
 
     ics.sort(key=lambda x: x[1][0])
 
@@ -563,18 +850,12 @@ def compare(model_dict, ic='WAIC', method='stacking', b_samples=1000,
 
         def log_score(w):
             w_full = w_fuller(w)
-            score = 0.
-            for i in range(N):
-                score += np.log(np.dot(exp_ic_i[i], w_full))
-            return -score
+            return -np.sum(np.log(np.dot(exp_ic_i, w_full)))
 
         def gradient(w):
             w_full = w_fuller(w)
-            grad = np.zeros(Km)
-            for k in range(Km):
-                for i in range(N):
-                    grad[k] += (exp_ic_i[i, k] - exp_ic_i[i, Km]) / \
-                        np.dot(exp_ic_i[i], w_full)
+            diff = exp_ic_i[:, :Km] - exp_ic_i[:, Km:]
+            grad = np.sum(diff / np.dot(exp_ic_i, w_full)[:, None], axis=0)
             return -grad
 
         theta = np.full(Km, 1. / K)
@@ -597,13 +878,10 @@ def compare(model_dict, ic='WAIC', method='stacking', b_samples=1000,
 
         b_weighting = dirichlet.rvs(alpha=[alpha] * N, size=b_samples,
                                     random_state=seed)
-        weights = np.zeros((b_samples, K))
-        z_bs = np.zeros_like(weights)
-        for i in range(b_samples):
-            z_b = np.dot(b_weighting[i], ic_i)
-            u_weights = np.exp(-0.5 * (z_b - np.min(z_b)))
-            z_bs[i] = z_b
-            weights[i] = u_weights / np.sum(u_weights)
+        # All bootstrap samples at once
+        z_bs = np.dot(b_weighting, ic_i)
+        u_weights = np.exp(-0.5 * (z_bs - np.min(z_bs, axis=1)[:, None]))
+        weights = u_weights / np.sum(u_weights, axis=1)[:, None]
 
         weights = weights.mean(0)
         ses = z_bs.std(0)
@@ -635,6 +913,53 @@ def compare(model_dict, ic='WAIC', method='stacking', b_samples=1000,
         return df_comp.sort_values(by=ic)
 
 
+_ic_cache = weakref.WeakKeyDictionary()
+
+
+def _cached_ic(ic_func, trace, model):
+    """Pointwise result of `ic_func` for `trace` and `model`.
+
+    The results are cached per trace and model, until the trace, its values
+    (through `add_values` or `remove_values` of a MultiTrace) or the values
+    of the shared variables of the model change. Values of the trace
+    changed in place otherwise are not noticed.
+    """
+    data_signature = _model_data_signature(model)
+    try:
+        if data_signature is None:
+            raise TypeError('The model data can not be fingerprinted.')
+        models = _ic_cache.setdefault(trace, weakref.WeakKeyDictionary())
+    except TypeError:
+        # The trace can not be referenced weakly
+        return ic_func(trace, model, pointwise=True)
+
+    signature = (len(trace), tuple(trace.chains), tuple(trace.varnames),
+                 getattr(trace, '_version', None), data_signature)
+    cache = models.get(model)
+    if cache is None or cache['signature'] != signature:
+        cache = models[model] = {'signature': signature}
+    if ic_func.__name__ not in cache:
+        cache[ic_func.__name__] = ic_func(trace, model, pointwise=True)
+    return cache[ic_func.__name__]
+
+
+def _model_data_signature(model):
+    """Digests of the values of the shared variables that the observed
+    variables of `model` depend on, or None if one of them is not an
+    array."""
+    outputs = [var.logpt for var in model.observed_RVs]
+    signature = []
+    for var in theano.gof.graph.inputs(outputs):
+        if not isinstance(var, theano.compile.SharedVariable):
+            continue
+        value = var.get_value(borrow=True)
+        if not isinstance(value, np.ndarray):
+            return None
+        digest = hashlib.sha1(value.tobytes()).hexdigest()
+        signature.append((value.shape, value.dtype.str, digest))
+    return tuple(signature)
+
+
 def _ic_matrix(ics):
     """Store the previously computed pointwise predictive accuracy values (ics)
     in a 2D matrix array.
@@ -693,6 +1018,28 @@ def calc_min_interval(x, alpha):
     return hdi_min, hdi_max
 
 
+def _calc_min_interval_columns(sx, alpha):
+    """Determine the minimum intervals of each column of a 2D array.
+
+    Assumes that each column of sx is sorted. Returns an array of shape
+    (n_columns, 2) with the same intervals as `calc_min_interval`.
+    """
+    n = len(sx)
+    cred_mass = 1.0 - alpha
+
+    interval_idx_inc = int(np.floor(cred_mass * n))
+    n_intervals = n - interval_idx_inc
+    interval_width = sx[interval_idx_inc:] - sx[:n_intervals]
+
+    if len(interval_width) == 0:
+        raise ValueError('Too few elements for interval calculation')
+
+    min_idx = np.argmin(interval_width, axis=0)
+    columns = np.arange(sx.shape[1])
+    return np.column_stack([sx[min_idx, columns],
+                            sx[min_idx + interval_idx_inc, columns]])
+
+
 @statfunc
 def hpd(x, alpha=0.05, transform=lambda x: x):
     """Calculate highest posterior density (HPD) of array for given alpha. The HPD is the
@@ -712,29 +1059,10 @@ def hpd(x, alpha=0.05, transform=lambda x: x):
 
     # For multivariate node
     if x.ndim > 1:
-
-        # Transpose first, then sort
-        tx = np.transpose(x, list(range(x.ndim))[1:] + [0])
-        dims = np.shape(tx)
-
-        # Container list for intervals
-        intervals = np.resize(0.0, dims[:-1] + (2,))
-
-        for index in make_indices(dims[:-1]):
-
-            try:
-                index = tuple(index)
-            except TypeError:
-                pass
-
-            # Sort trace
-            sx = np.sort(tx[index])
-
-            # Append to list
-            intervals[index] = calc_min_interval(sx, alpha)
-
-        # Transpose back before returning
-        return np.array(intervals)
+        # Sort all elements along the draws at once
+        sx = np.sort(x.reshape(len(x), -1), axis=0)
+        intervals = _calc_min_interval_columns(sx, alpha)
+        return intervals.reshape(x.shape[1:] + (2,))
 
     else:
         # Sort univariate node
@@ -791,6 +1119,20 @@ def mc_error(x, batches=5):
         return np.std(means) / np.sqrt(batches)
 
 
+def _mc_error_columns(x, batches):
+    """Simulation standard error of each column of a 2D array, equal to
+    `mc_error` applied to the columns one by one.
+    """
+    if batches == 1:
+        return np.std(x, 0) / np.sqrt(len(x))
+    # Excess samples that do not fill a batch are trimmed
+    batch_len = len(x) // batches
+    batched_traces = x[:batches * batch_len].reshape(
+        (batches, batch_len) + x.shape[1:])
+    means = np.mean(batched_traces, 1)
+    return np.std(means, 0) / np.sqrt(batches)
+
+
 @statfunc
 def quantiles(x, qlist=(2.5, 25, 50, 75, 97.5), transform=lambda x: x):
     R"""Returns a dictionary of requested quantiles from array
@@ -811,22 +1153,22 @@ def quantiles(x, qlist=(2.5, 25, 50, 75, 97.5), transform=lambda x: x):
     # Make a copy of trace
     x = transform(x.copy())
 
-    # For multivariate node
-    if x.ndim > 1:
-        # Transpose first, then sort, then transpose back
-        sx = np.sort(x.T).T
-    else:
-        # Sort univariate node
-        sx = np.sort(x)
+    n = len(x)
+    idxs = [int(n * q / 100.0) for q in qlist]
+    if not idxs:
+        return {}
+    if any(not -n <= idx < n for idx in idxs):
+        pm._log.warning("Too few elements for quantile calculation")
+        return None
 
-    try:
-        # Generate specified quantiles
-        quants = [sx[int(len(sx) * q / 100.0)] for q in qlist]
+    # Only partially sort the draws, so that the requested order
+    # statistics are in place.
+    idxs = [idx % n for idx in idxs]
+    sx = np.partition(x, sorted(set(idxs)), axis=0)
+    quants = [sx[idx] for idx in idxs]
 
-        return dict(zip(qlist, quants))
+    return dict(zip(qlist, quants))
 
-    except IndexError:
-        pm._log.warning("Too few elements for quantile calculation")
 
 def dict2pd(statdict, labelname):
     """Small helper function to transform a diagnostics output dict into a
@@ -844,9 +1186,14 @@ def dict2pd(statdict, labelname):
 
 def summary(trace, varnames=None, transform=lambda x: x, stat_funcs=None,
                extend=False, include_transformed=False,
-               alpha=0.05, start=0, batches=None):
+               alpha=0.05, start=0, batches=None, chunk_size=None,
+               cores=1):
     R"""Create a data frame with summary statistics.
 
+    The values of each variable are fetched from the trace once, and the
+    default statistics and the convergence diagnostics are computed from
+    them together.
+
     Parameters
     ----------
     trace : MultiTrace instance
@@ -883,12 +1230,19 @@ def summary(trace, varnames=None, transform=lambda x: x, stat_funcs=None,
         The alpha level for generating posterior intervals. Defaults
         to 0.05. This is only meaningful when `stat_funcs` is None.
     start : int
-        The starting index from which to summarize (each) chain. Defaults
-        to zero.
+        The starting index from which to summarize (each) chain, also for
+        `n_eff` and `Rhat`. Defaults to zero.
     batches : None or int
         Batch size for calculating standard deviation for non-independent
         samples. Defaults to the smaller of 100 or the number of samples.
         This is only meaningful when `stat_funcs` is None.
+    chunk_size : None or int
+        Number of elements of a variable that are summarized at a time.
+        Smaller chunks reduce the size of the temporary arrays for
+        variables with many elements. Defaults to all elements at once.
+    cores : int
+        Number of threads used to summarize variables in parallel.
+        Defaults to 1.
 
     Returns
     -------
@@ -929,6 +1283,7 @@ def summary(trace, varnames=None, transform=lambda x: x, stat_funcs=None,
         mu__1  0.067513 -0.159097 -0.045637  0.062912
     """
     from .backends import tracetab as ttab
+    from .diagnostics import _get_neff, _rscore
 
     if varnames is None:
         varnames = get_default_varnames(trace.varnames,
@@ -937,41 +1292,81 @@ def summary(trace, varnames=None, transform=lambda x: x, stat_funcs=None,
     if batches is None:
         batches = min([100, len(trace)])
 
-    funcs = [lambda x: pd.Series(np.mean(x, 0), name='mean'),
-             lambda x: pd.Series(np.std(x, 0), name='sd'),
-             lambda x: pd.Series(mc_error(x, batches), name='mc_error'),
-             lambda x: _hpd_df(x, alpha)]
-
-    if stat_funcs is not None:
-        if extend:
-            funcs = funcs + stat_funcs
+    if chunk_size is not None and chunk_size < 1:
+        raise ValueError('chunk_size must be positive.')
+
+    default_stats = stat_funcs is None or extend
+    if stat_funcs is None:
+        stat_funcs = []
+    diagnostics = default_stats and trace.nchains >= 2
+    hpd_names = ['hpd_{0:g}'.format(100 * alpha / 2),
+                 'hpd_{0:g}'.format(100 * (1 - alpha / 2))]
+
+    def summarize_columns(flat_vals, flat_chains):
+        dfs = []
+        if default_stats:
+            # One sort of the samples is shared by all interval statistics
+            sx = np.sort(flat_vals, axis=0)
+            dfs.append(pd.DataFrame(
+                np.column_stack([np.mean(flat_vals, 0),
+                                 np.std(flat_vals, 0),
+                                 _mc_error_columns(flat_vals, batches),
+                                 _calc_min_interval_columns(sx, alpha)]),
+                columns=['mean', 'sd', 'mc_error'] + hpd_names))
+            del sx
+        dfs.extend(f(flat_vals) for f in stat_funcs)
+        if diagnostics:
+            dfs.append(pd.DataFrame(
+                {'n_eff': _get_neff(flat_chains),
+                 'Rhat': _rscore(flat_chains, flat_chains.shape[1])},
+                columns=['n_eff', 'Rhat']))
+        return pd.concat(dfs, axis=1)
+
+    def summarize_var(var):
+        # The values of each variable are only fetched once, as an array
+        # of shape (nchains, ndraws, ...) for the convergence diagnostics
+        chains = trace.get_values(var, burn=start, combine=False,
+                                  squeeze=False)
+        if diagnostics:
+            if len(set(len(values) for values in chains)) > 1:
+                raise ValueError('Calculation of effective sample size and '
+                                 'Gelman-Rubin statistic requires chains '
+                                 'of the same length.')
+            chains = np.stack(chains)
+            vals = chains.reshape((-1,) + chains.shape[2:])
+            flat_chains = chains.reshape(chains.shape[:2] + (-1,))
         else:
-            funcs = stat_funcs
-
-    var_dfs = []
-    for var in varnames:
-        vals = transform(trace.get_values(var, burn=start, combine=True))
+            vals = np.concatenate(chains)
+            flat_chains = None
+        vals = transform(vals)
         flat_vals = vals.reshape(vals.shape[0], -1)
-        var_df = pd.concat([f(flat_vals) for f in funcs], axis=1)
+
+        n_columns = flat_vals.shape[1]
+        step = n_columns if chunk_size is None else chunk_size
+        if n_columns == 0 or step >= n_columns:
+            var_df = summarize_columns(flat_vals, flat_chains)
+        else:
+            var_df = pd.concat(
+                [summarize_columns(
+                    flat_vals[:, i:i + step],
+                    None if flat_chains is None
+                    else flat_chains[:, :, i:i + step])
+                 for i in range(0, n_columns, step)],
+                axis=0)
         var_df.index = ttab.create_flat_names(var, vals.shape[1:])
-        var_dfs.append(var_df)
-    dforg = pd.concat(var_dfs, axis=0)
+        return var_df
 
-    if (stat_funcs is not None) and (not extend):
-        return dforg
-    elif trace.nchains < 2:
-        return dforg
+    if cores > 1:
+        # NumPy releases the GIL while sorting and transforming, so the
+        # variables can be summarized by threads sharing the trace.
+        pool = ThreadPool(cores)
+        try:
+            var_dfs = pool.map(summarize_var, varnames)
+        finally:
+            pool.close()
     else:
-        n_eff = pm.effective_n(trace,
-                               varnames=varnames,
-                               include_transformed=include_transformed)
-        n_eff_pd = dict2pd(n_eff, 'n_eff')
-        rhat = pm.gelman_rubin(trace,
-                               varnames=varnames,
-                               include_transformed=include_transformed)
-        rhat_pd = dict2pd(rhat, 'Rhat')
-        return pd.concat([dforg, n_eff_pd, rhat_pd],
-                         axis=1, join_axes=[dforg.index])
+        var_dfs = [summarize_var(var) for var in varnames]
+    return pd.concat(var_dfs, axis=0)
 
 
 def _calculate_stats(sample, batches, alpha):
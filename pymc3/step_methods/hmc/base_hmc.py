@@ -1,4 +1,5 @@
 from collections import namedtuple
+from copy import copy, deepcopy
 
 import numpy as np
 
@@ -124,7 +125,12 @@ class BaseHMC(arraystep.GradientSharedStep):
             step_size = self._step_rand(step_size)
 
         hmc_step = self._hamiltonian_step(start, p0, step_size)
+        stats = self._finish_step(hmc_step, adapt_step)
+        return hmc_step.end.q, [stats]
 
+    def _finish_step(self, hmc_step, adapt_step):
+        """Adapt the step size and potential, and record warnings after
+        a trajectory. Return the sampler stats."""
         self.step_adapt.update(hmc_step.accept_stat, adapt_step)
         self.potential.update(hmc_step.end.q, hmc_step.end.q_grad, self.tune)
         if hmc_step.divergence_info:
@@ -157,13 +163,23 @@ class BaseHMC(arraystep.GradientSharedStep):
 
         stats.update(hmc_step.stats)
         stats.update(self.step_adapt.stats())
-
-        return hmc_step.end.q, [stats]
+        return stats
 
     def reset(self, start=None):
         self.tune = True
         self.potential.reset()
 
+    def _copy_for_chain(self):
+        """Return a copy with its own potential, step size adaptation and
+        warnings, which shares the compiled logp function."""
+        chain_step = copy(self)
+        chain_step.potential = deepcopy(self.potential)
+        chain_step.step_adapt = deepcopy(self.step_adapt)
+        chain_step.integrator = copy(self.integrator)
+        chain_step.integrator._potential = chain_step.potential
+        chain_step._warnings = []
+        return chain_step
+
     def warnings(self):
         # list.copy() is not available in python2
         warnings = self._warnings[:]
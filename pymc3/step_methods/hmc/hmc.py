@@ -1,8 +1,11 @@
+from copy import copy
+
 import numpy as np
 
 from ..arraystep import Competence
 from pymc3.vartypes import discrete_types
-from pymc3.step_methods.hmc.integration import IntegrationError
+from pymc3.step_methods.hmc.integration import (
+    IntegrationError, CompiledTrajectoryIntegrator)
 from pymc3.step_methods.hmc.base_hmc import BaseHMC, HMCStepData, DivergenceInfo
 
 
@@ -38,7 +41,7 @@ class HamiltonianMC(BaseHMC):
 
     def __init__(self, vars=None, path_length=2.,
                  adapt_step_size=True, gamma=0.05, k=0.75, t0=10,
-                 target_accept=0.8, **kwargs):
+                 target_accept=0.8, compile_trajectory=False, **kwargs):
         """Set up the Hamiltonian Monte Carlo sampler.
 
         Parameters
@@ -80,12 +83,29 @@ class HamiltonianMC(BaseHMC):
         adapt_step_size : bool, default=True
             Whether step size adaptation should be enabled. If this is
             disabled, `k`, `t0`, `gamma` and `target_accept` are ignored.
+        compile_trajectory : bool, default=False
+            Compute all leapfrog steps of a trajectory in one compiled
+            theano function instead of calling the logp and gradient once
+            per step from python. This is faster for small models, but
+            needs a diagonal or dense potential.
         model : pymc3.Model
             The model
         **kwargs : passed to BaseHMC
         """
         super(HamiltonianMC, self).__init__(vars, **kwargs)
         self.path_length = path_length
+        self.compile_trajectory = compile_trajectory
+        if compile_trajectory:
+            self._trajectory_integrator = CompiledTrajectoryIntegrator(
+                self.potential, self._logp_dlogp_func)
+
+    def _copy_for_chain(self):
+        chain_step = super(HamiltonianMC, self)._copy_for_chain()
+        if self.compile_trajectory:
+            integrator = copy(self._trajectory_integrator)
+            integrator._potential = chain_step.potential
+            chain_step._trajectory_integrator = integrator
+        return chain_step
 
     def _hamiltonian_step(self, start, p0, step_size):
         path_length = np.random.rand() * self.path_length
@@ -95,8 +115,12 @@ class HamiltonianMC(BaseHMC):
         state = start
         div_info = None
         try:
-            for _ in range(n_steps):
-                state = self.integrator.step(step_size, state)
+            if self.compile_trajectory:
+                state = self._trajectory_integrator.integrate(
+                    step_size, state, n_steps)
+            else:
+                for _ in range(n_steps):
+                    state = self.integrator.step(step_size, state)
         except IntegrationError as e:
             div_info = DivergenceInfo('Divergence encountered.', e, state)
         else:
@@ -3,6 +3,9 @@ from collections import namedtuple
 import numpy as np
 from scipy import linalg
 
+from pymc3.step_methods.hmc.trajectory import _theano_leapfrog_trajectory
+from pymc3.theanof import floatX
+
 
 State = namedtuple("State", 'q, p, v, q_grad, energy')
 
@@ -44,14 +47,15 @@ class CpuLeapfrogIntegrator(object):
         state: State namedtuple,
             current position data
         out: (optional) State namedtuple,
-            preallocated arrays to write to in place
+            preallocated arrays to write to in place. The energy of
+            `out` is ignored.
 
         Returns
         -------
-        None if `out` is provided, else a State namedtuple
+        A State namedtuple, which uses the arrays of `out` if it is provided
         """
         try:
-            return self._step(epsilon, state, out=None)
+            return self._step(epsilon, state, out=out)
         except linalg.LinAlgError as err:
             msg = "LinAlgError during leapfrog step."
             raise IntegrationError(msg)
@@ -76,8 +80,8 @@ class CpuLeapfrogIntegrator(object):
             q_new_grad = np.empty_like(q)
         else:
             q_new, p_new, v_new, q_new_grad, energy = out
-            q_new[:] = q
-            p_new[:] = p
+            np.copyto(q_new, q)
+            np.copyto(p_new, p)
 
         dt = 0.5 * epsilon
 
@@ -98,8 +102,54 @@ class CpuLeapfrogIntegrator(object):
         kinetic = pot.velocity_energy(p_new, v_new)
         energy = kinetic - logp
 
-        if out is not None:
-            out.energy = energy
-            return
-        else:
-            return State(q_new, p_new, v_new, q_new_grad, energy)
+        return State(q_new, p_new, v_new, q_new_grad, energy)
+
+
+class CompiledTrajectoryIntegrator(object):
+    def __init__(self, potential, logp_dlogp_func, **theano_kwargs):
+        """Leapfrog integrator that computes whole trajectories in theano.
+
+        All steps of a trajectory are done in one call of a compiled
+        `scan`, which avoids the overhead of a python loop and a theano
+        function call per step. The potential must provide a
+        `velocity_scaling`, which is passed to every call so that
+        adaptation of the mass matrix still works.
+        """
+        self._potential = potential
+        self._logp_dlogp_func = logp_dlogp_func
+        self._dtype = self._logp_dlogp_func.dtype
+        if self._potential.dtype != self._dtype:
+            raise ValueError("dtypes of potential (%s) and logp function (%s)"
+                             "don't match."
+                             % (self._potential.dtype, self._dtype))
+        try:
+            scaling = potential.velocity_scaling()
+        except NotImplementedError:
+            raise ValueError("Compiled trajectories need a potential with a "
+                             "diagonal or dense velocity scaling, not %s."
+                             % type(potential).__name__)
+        self._trajectory = _theano_leapfrog_trajectory(
+            logp_dlogp_func, dense=np.ndim(scaling) == 2, **theano_kwargs)
+
+    def integrate(self, epsilon, state, n_steps):
+        """Do `n_steps` leapfrog steps from `state`.
+
+        Parameters
+        ----------
+        epsilon: float
+            step scale
+        state: State namedtuple,
+            current position data
+        n_steps: int, > 0
+            number of leapfrog steps
+
+        Returns
+        -------
+        A State namedtuple at the end of the trajectory
+        """
+        q, p, v, q_grad, energy = state
+        scaling = self._potential.velocity_scaling()
+        q_new, p_new, v_new, q_new_grad, energy = self._trajectory(
+            q, p, q_grad, floatX(np.asarray(epsilon)), np.int32(n_steps),
+            scaling)
+        return State(q_new, p_new, v_new, q_new_grad, energy)
@@ -7,7 +7,7 @@ import numpy.random as nr
 
 from ..arraystep import Competence
 from .base_hmc import BaseHMC, HMCStepData, DivergenceInfo
-from .integration import IntegrationError
+from .integration import IntegrationError, State
 from pymc3.backends.report import SamplerWarning, WarningType
 from pymc3.theanof import floatX
 from pymc3.vartypes import continuous_types
@@ -155,13 +155,19 @@ class NUTS(BaseHMC):
         self.early_max_treedepth = early_max_treedepth
         self._reached_max_treedepth = 0
 
+        size = self._logp_dlogp_func.size
+        dtype = self._logp_dlogp_func.dtype
+        self._state_pool = _BufferPool(size, dtype, n_arrays=4)
+        self._p_sum_pool = _BufferPool(size, dtype)
+
     def _hamiltonian_step(self, start, p0, step_size):
         if self.tune and self.iter_count < 200:
             max_treedepth = self.early_max_treedepth
         else:
             max_treedepth = self.max_treedepth
 
-        tree = _Tree(len(p0), self.integrator, start, step_size, self.Emax)
+        tree = _Tree(len(p0), self.integrator, start, step_size, self.Emax,
+                     self._state_pool, self._p_sum_pool)
 
         for _ in range(max_treedepth):
             direction = logbern(np.log(0.5)) * 2 - 1
@@ -175,7 +181,10 @@ class NUTS(BaseHMC):
 
         stats = tree.stats()
         accept_stat = stats['mean_tree_accept']
-        return HMCStepData(tree.proposal, accept_stat, divergence_info, stats)
+        # The buffers of the pools are reused by the next tree
+        proposal = tree.proposal._replace(
+            q=tree.proposal.q.copy(), q_grad=tree.proposal.q_grad.copy())
+        return HMCStepData(proposal, accept_stat, divergence_info, stats)
 
     @staticmethod
     def competence(var, has_grad):
@@ -207,10 +216,58 @@ Subtree = namedtuple(
     "left, right, p_sum, proposal, log_size, accept_sum, n_proposals")
 
 
+class _BufferPool(object):
+    def __init__(self, ndim, dtype, n_arrays=1):
+        """Reusable sets of `n_arrays` arrays of length `ndim`.
+
+        Buffers are allocated when the pool is empty, and are kept for
+        later trees after they are released. A set of arrays is identified
+        by its first array, so that releasing an array that does not
+        belong to the pool (like the start of a trajectory) is a no-op.
+        The number of buffers is the largest number that were in use at
+        the same time, at most about `3 * max_treedepth` states for NUTS.
+        """
+        self.ndim = ndim
+        self.dtype = dtype
+        self.n_arrays = n_arrays
+        self._buffers = {}
+        self._free = []
+
+    def acquire(self):
+        """Return a list of `n_arrays` unused arrays."""
+        if self._free:
+            return self._buffers[self._free.pop()]
+        arrays = list(np.empty((self.n_arrays, self.ndim), dtype=self.dtype))
+        self._buffers[id(arrays[0])] = arrays
+        return arrays
+
+    def owns(self, array):
+        return array is not None and id(array) in self._buffers
+
+    def release(self, array):
+        """Return the buffer whose first array is `array` to the pool."""
+        if self.owns(array) and id(array) not in self._free:
+            self._free.append(id(array))
+
+    def reset(self):
+        """Mark all buffers as unused."""
+        self._free = list(self._buffers)
+
+    def __len__(self):
+        return len(self._buffers)
+
+
 class _Tree(object):
-    def __init__(self, ndim, integrator, start, step_size, Emax):
+    def __init__(self, ndim, integrator, start, step_size, Emax,
+                 state_pool=None, p_sum_pool=None):
         """Binary tree from the NUTS algorithm.
 
+        The leapfrog steps write to states from `state_pool` in place, and
+        the momentum sums of the subtrees are accumulated in arrays from
+        `p_sum_pool`, so that building a tree does not allocate arrays
+        once the pools are large enough. States that are not an end point
+        or the proposal of a subtree any more are returned to the pool.
+
         Parameters
         ----------
         leapfrog : function
@@ -222,6 +279,12 @@ class _Tree(object):
         Emax : float
             The maximum energy change to accept before aborting the
             transition as diverging.
+        state_pool : _BufferPool, optional
+            Buffers for the four arrays of a `State`. All of its buffers
+            are reused by this tree.
+        p_sum_pool : _BufferPool, optional
+            Buffers for the momentum sums. All of its buffers are reused
+            by this tree.
         """
         self.ndim = ndim
         self.integrator = integrator
@@ -230,13 +293,23 @@ class _Tree(object):
         self.Emax = Emax
         self.start_energy = np.array(start.energy)
 
+        if state_pool is None:
+            state_pool = _BufferPool(ndim, start.q.dtype, n_arrays=4)
+        if p_sum_pool is None:
+            p_sum_pool = _BufferPool(ndim, start.p.dtype)
+        state_pool.reset()
+        p_sum_pool.reset()
+        self._state_pool = state_pool
+        self._p_sum_pool = p_sum_pool
+
         self.left = self.right = start
         self.proposal = Proposal(start.q, start.q_grad, start.energy, 1.0)
         self.depth = 0
         self.log_size = 0
         self.accept_sum = 0
         self.n_proposals = 0
-        self.p_sum = start.p.copy()
+        self.p_sum, = p_sum_pool.acquire()
+        np.copyto(self.p_sum, start.p)
         self.max_energy_change = 0
 
     def extend(self, direction):
@@ -252,10 +325,12 @@ class _Tree(object):
         was reached (the trajectory is turning back).
         """
         if direction > 0:
+            end = self.right
             tree, diverging, turning = self._build_subtree(
                 self.right, self.depth, floatX(np.asarray(self.step_size)))
             self.right = tree.right
         else:
+            end = self.left
             tree, diverging, turning = self._build_subtree(
                 self.left, self.depth, floatX(np.asarray(-self.step_size)))
             self.left = tree.right
@@ -267,12 +342,18 @@ class _Tree(object):
         if diverging or turning:
             return diverging, turning
 
+        old_proposal = self.proposal
         size1, size2 = self.log_size, tree.log_size
         if logbern(size2 - size1):
             self.proposal = tree.proposal
 
         self.log_size = np.logaddexp(self.log_size, tree.log_size)
-        self.p_sum[:] += tree.p_sum
+        self.p_sum += tree.p_sum
+
+        self._release_states(
+            [end, old_proposal, tree.left, tree.right, tree.proposal],
+            [self.left, self.right, self.proposal])
+        self._p_sum_pool.release(tree.p_sum)
 
         left, right = self.left, self.right
         p_sum = self.p_sum
@@ -280,10 +361,21 @@ class _Tree(object):
 
         return diverging, turning
 
+    def _release_states(self, states, keep):
+        """Return the buffers of `states` that are not in `keep` to the pool.
+
+        States and proposals are identified by their position array.
+        """
+        keep = set(id(state.q) for state in keep if state is not None)
+        for state in states:
+            if state is not None and id(state.q) not in keep:
+                self._state_pool.release(state.q)
+
     def _single_step(self, left, epsilon):
         """Perform a leapfrog step and handle error cases."""
+        out = State(*self._state_pool.acquire(), energy=None)
         try:
-            right = self.integrator.step(epsilon, left)
+            right = self.integrator.step(epsilon, left, out=out)
         except IntegrationError as err:
             error_msg = str(err)
             error = err
@@ -306,6 +398,7 @@ class _Tree(object):
                 error_msg = ("Energy change in leapfrog step is too large: %s."
                              % energy_change)
                 error = None
+        self._state_pool.release(out.q)
         tree = Subtree(None, None, None, None, -np.inf, 0, 1)
         divergance_info = DivergenceInfo(error_msg, error, left)
         return tree, divergance_info, False
@@ -325,7 +418,12 @@ class _Tree(object):
         left, right = tree1.left, tree2.right
 
         if not (diverging or turning):
-            p_sum = tree1.p_sum + tree2.p_sum
+            # The momentum sum of a single step is the momentum of its state
+            if self._p_sum_pool.owns(tree1.p_sum):
+                p_sum = tree1.p_sum
+            else:
+                p_sum, = self._p_sum_pool.acquire()
+            np.add(tree1.p_sum, tree2.p_sum, out=p_sum)
             turning = (p_sum.dot(left.v) <= 0) or (p_sum.dot(right.v) <= 0)
 
             log_size = np.logaddexp(tree1.log_size, tree2.log_size)
@@ -343,6 +441,11 @@ class _Tree(object):
 
         tree = Subtree(left, right, p_sum, proposal,
                        log_size, accept_sum, n_proposals)
+        self._release_states(
+            [tree1.left, tree1.right, tree1.proposal,
+             tree2.left, tree2.right, tree2.proposal],
+            [left, right, proposal])
+        self._p_sum_pool.release(tree2.p_sum)
         return tree, diverging, turning
 
     def stats(self):
@@ -8,7 +8,9 @@ from pymc3.theanof import floatX
 
 
 __all__ = ['quad_potential', 'QuadPotentialDiag', 'QuadPotentialFull',
-           'QuadPotentialFullInv', 'QuadPotentialDiagAdapt', 'isquadpotential']
+           'QuadPotentialFullInv', 'QuadPotentialDiagAdapt',
+           'QuadPotentialFullAdapt', 'QuadPotentialLowRankAdapt',
+           'isquadpotential']
 
 
 def quad_potential(C, is_cov):
@@ -86,6 +88,16 @@ class QuadPotential(object):
     def velocity_energy(self, x, v_out):
         raise NotImplementedError('Abstract method')
 
+    def velocity_scaling(self):
+        """Return the vector or matrix that maps momentum to velocity.
+
+        A vector is interpreted as the diagonal of the matrix. Compiled
+        trajectories of `HamiltonianMC` use this to compute the velocity
+        in theano.
+        """
+        raise NotImplementedError('%s does not provide a velocity scaling.'
+                                  % type(self).__name__)
+
     def update(self, sample, grad, tune):
         """Inform the potential about a new sample during tuning.
 
@@ -146,6 +158,9 @@ class QuadPotentialDiagAdapt(QuadPotential):
         """Compute the current velocity at a position in parameter space."""
         return np.multiply(self._var, x, out=out)
 
+    def velocity_scaling(self):
+        return self._var
+
     def energy(self, x, velocity=None):
         """Compute kinetic energy at a position in parameter space."""
         if velocity is not None:
@@ -302,6 +317,274 @@ class _WeightedVariance(object):
         return self.mean.copy(dtype=self._dtype)
 
 
+def _raise_non_finite(values, kind):
+    if not np.all(np.isfinite(values)):
+        raise ValueError('Mass matrix contains non-finite values in the %s.'
+                         % kind)
+
+
+class QuadPotentialFullAdapt(QuadPotential):
+    """Adapt a dense mass matrix from the sample covariances.
+
+    The covariance is accumulated with Welford updates over two
+    overlapping windows, like the variances of `QuadPotentialDiagAdapt`.
+    The mass matrix and its Cholesky factor are only updated at the end
+    of each window. The sample covariance of `w` draws is regularized
+    towards its diagonal with weight `regularization / (w + regularization)`,
+    which keeps the estimate well conditioned when there are few draws
+    per dimension.
+    """
+
+    def __init__(self, n, initial_mean, initial_cov=None, initial_weight=0,
+                 adaptation_window=101, regularization=5, dtype=None):
+        """Set up a dense mass matrix."""
+        if initial_cov is not None and initial_cov.shape != (n, n):
+            raise ValueError('Wrong shape for initial_cov: expected %s got %s'
+                             % ((n, n), initial_cov.shape))
+        if initial_mean.ndim != 1:
+            raise ValueError('Initial mean must be one-dimensional.')
+        if len(initial_mean) != n:
+            raise ValueError('Wrong shape for initial_mean: expected %s got %s'
+                             % (n, len(initial_mean)))
+
+        if dtype is None:
+            dtype = theano.config.floatX
+
+        if initial_cov is None:
+            initial_cov = np.eye(n, dtype=dtype)
+            initial_weight = 1
+
+        self.dtype = dtype
+        self._n = n
+        self._cov = np.array(initial_cov, dtype=self.dtype, copy=True)
+        self._chol = scipy.linalg.cholesky(self._cov, lower=True)
+        self._foreground_cov = _WeightedCovariance(
+            self._n, initial_mean, initial_cov, initial_weight, self.dtype)
+        self._background_cov = _WeightedCovariance(self._n, dtype=self.dtype)
+        self._n_samples = 0
+        self.adaptation_window = adaptation_window
+        self.regularization = regularization
+
+    def velocity(self, x, out=None):
+        """Compute the current velocity at a position in parameter space."""
+        return np.dot(self._cov, x, out=out)
+
+    def velocity_scaling(self):
+        return self._cov
+
+    def energy(self, x, velocity=None):
+        """Compute kinetic energy at a position in parameter space."""
+        if velocity is None:
+            velocity = self.velocity(x)
+        return 0.5 * x.dot(velocity)
+
+    def velocity_energy(self, x, v_out):
+        """Compute velocity and return kinetic energy at a position in parameter space."""
+        self.velocity(x, out=v_out)
+        return 0.5 * np.dot(x, v_out)
+
+    def random(self):
+        """Draw random value from QuadPotential."""
+        vals = normal(size=self._n).astype(self.dtype)
+        return scipy.linalg.solve_triangular(self._chol.T, vals)
+
+    def _update_from_weightcov(self, weightcov):
+        cov = weightcov.current_covariance()
+        diag = np.diag(np.diag(cov))
+        weight = weightcov.w_sum
+        reg = self.regularization
+        cov = (weight * cov + reg * diag) / (weight + reg)
+        try:
+            chol = scipy.linalg.cholesky(cov, lower=True)
+        except (scipy.linalg.LinAlgError, ValueError):
+            # Fall back to the variances if the covariance is singular
+            cov = diag
+            chol = np.sqrt(cov)
+        self._cov[:] = cov
+        self._chol = chol.astype(self.dtype)
+
+    def update(self, sample, grad, tune):
+        """Inform the potential about a new sample during tuning."""
+        if not tune:
+            return
+
+        window = self.adaptation_window
+
+        self._foreground_cov.add_sample(sample, weight=1)
+        self._background_cov.add_sample(sample, weight=1)
+
+        if self._n_samples > 0 and self._n_samples % window == 0:
+            self._update_from_weightcov(self._foreground_cov)
+            self._foreground_cov = self._background_cov
+            self._background_cov = _WeightedCovariance(self._n, dtype=self.dtype)
+
+        self._n_samples += 1
+
+    def raise_ok(self, vmap=None):
+        _raise_non_finite(self._cov, 'covariance')
+
+
+class QuadPotentialLowRankAdapt(QuadPotential):
+    """Adapt a diagonal plus low rank mass matrix.
+
+    The covariance is approximated as `S (I + U (L - I) U^T) S`, where
+    `S` is the diagonal of the sample standard deviations, and `U` and
+    `L` are the `rank` leading eigenvectors and eigenvalues of the
+    correlations of the draws in the last window. Those are computed
+    from a singular value decomposition of the standardized draws at
+    the end of each window, so that the memory and the cost of a
+    velocity are linear in the number of dimensions. The eigenvalues
+    are regularized towards one like the covariance of
+    `QuadPotentialFullAdapt`.
+    """
+
+    def __init__(self, n, initial_mean, initial_diag=None, initial_weight=0,
+                 rank=10, adaptation_window=101, regularization=5,
+                 dtype=None):
+        """Set up a diagonal plus low rank mass matrix."""
+        if initial_diag is not None and initial_diag.ndim != 1:
+            raise ValueError('Initial diagonal must be one-dimensional.')
+        if initial_mean.ndim != 1:
+            raise ValueError('Initial mean must be one-dimensional.')
+        if initial_diag is not None and len(initial_diag) != n:
+            raise ValueError('Wrong shape for initial_diag: expected %s got %s'
+                             % (n, len(initial_diag)))
+        if len(initial_mean) != n:
+            raise ValueError('Wrong shape for initial_mean: expected %s got %s'
+                             % (n, len(initial_mean)))
+
+        if dtype is None:
+            dtype = theano.config.floatX
+
+        if initial_diag is None:
+            initial_diag = np.ones(n, dtype=dtype)
+            initial_weight = 1
+
+        self.dtype = dtype
+        self._n = n
+        self.rank = rank
+        self._stds = np.sqrt(initial_diag).astype(self.dtype)
+        self._inv_stds = floatX(1.) / self._stds
+        self._vecs = np.zeros((n, 0), dtype=self.dtype)
+        self._vals = np.zeros(0, dtype=self.dtype)
+        self._foreground_var = _WeightedVariance(
+            self._n, initial_mean, initial_diag, initial_weight, self.dtype)
+        self._background_var = _WeightedVariance(self._n, dtype=self.dtype)
+        self._window_samples = np.empty((adaptation_window + 1, n), dtype='d')
+        self._n_window = 0
+        self._n_samples = 0
+        self.adaptation_window = adaptation_window
+        self.regularization = regularization
+
+    def velocity(self, x, out=None):
+        """Compute the current velocity at a position in parameter space."""
+        x = self._stds * x
+        x += self._vecs.dot((self._vals - 1) * self._vecs.T.dot(x))
+        return np.multiply(self._stds, x, out=out)
+
+    def energy(self, x, velocity=None):
+        """Compute kinetic energy at a position in parameter space."""
+        if velocity is None:
+            velocity = self.velocity(x)
+        return 0.5 * x.dot(velocity)
+
+    def velocity_energy(self, x, v_out):
+        """Compute velocity and return kinetic energy at a position in parameter space."""
+        self.velocity(x, out=v_out)
+        return 0.5 * np.dot(x, v_out)
+
+    def random(self):
+        """Draw random value from QuadPotential."""
+        vals = normal(size=self._n).astype(self.dtype)
+        vals += self._vecs.dot(
+            (self._vals ** -0.5 - 1) * self._vecs.T.dot(vals))
+        return self._inv_stds * vals
+
+    def _update_from_window(self):
+        stds = np.sqrt(self._foreground_var.current_variance())
+        samples = self._window_samples[:self._n_window]
+        samples = (samples - samples.mean(axis=0)) / stds
+        samples /= np.sqrt(len(samples))
+        _, svals, vecs = np.linalg.svd(samples, full_matrices=False)
+        rank = min(self.rank, len(svals))
+        weight = len(samples)
+        reg = self.regularization
+        vals = (weight * svals[:rank] ** 2 + reg) / (weight + reg)
+
+        self._stds[:] = stds
+        np.divide(1, self._stds, out=self._inv_stds)
+        self._vecs = vecs[:rank].T.astype(self.dtype)
+        self._vals = vals.astype(self.dtype)
+
+    def update(self, sample, grad, tune):
+        """Inform the potential about a new sample during tuning."""
+        if not tune:
+            return
+
+        window = self.adaptation_window
+
+        self._foreground_var.add_sample(sample, weight=1)
+        self._background_var.add_sample(sample, weight=1)
+        self._window_samples[self._n_window] = sample
+        self._n_window += 1
+
+        if self._n_samples > 0 and self._n_samples % window == 0:
+            self._update_from_window()
+            self._foreground_var = self._background_var
+            self._background_var = _WeightedVariance(self._n, dtype=self.dtype)
+            self._n_window = 0
+
+        self._n_samples += 1
+
+    def raise_ok(self, vmap=None):
+        _raise_non_finite(self._stds, 'diagonal')
+        _raise_non_finite(self._vals, 'low rank eigenvalues')
+
+
+class _WeightedCovariance(object):
+    """Online algorithm for computing mean and covariance."""
+
+    def __init__(self, nelem, initial_mean=None, initial_covariance=None,
+                 initial_weight=0, dtype='d'):
+        self._dtype = dtype
+        self.w_sum = float(initial_weight)
+        if initial_mean is None:
+            self.mean = np.zeros(nelem, dtype='d')
+        else:
+            self.mean = np.array(initial_mean, dtype='d', copy=True)
+        if initial_covariance is None:
+            self.raw_cov = np.zeros((nelem, nelem), dtype='d')
+        else:
+            self.raw_cov = np.array(initial_covariance, dtype='d', copy=True)
+
+        self.raw_cov[:] *= self.w_sum
+
+        if self.raw_cov.shape != (nelem, nelem):
+            raise ValueError('Invalid shape for initial covariance.')
+        if self.mean.shape != (nelem,):
+            raise ValueError('Invalid shape for initial mean.')
+
+    def add_sample(self, x, weight):
+        x = np.asarray(x)
+        self.w_sum += weight
+        prop = weight / self.w_sum
+        old_diff = x - self.mean
+        self.mean[:] += prop * old_diff
+        new_diff = x - self.mean
+        self.raw_cov[:] += weight * np.outer(new_diff, old_diff)
+
+    def current_covariance(self, out=None):
+        if self.w_sum == 0:
+            raise ValueError('Can not compute covariance without samples.')
+        if out is not None:
+            return np.divide(self.raw_cov, self.w_sum, out=out)
+        else:
+            return (self.raw_cov / self.w_sum).astype(self._dtype)
+
+    def current_mean(self):
+        return self.mean.copy(dtype=self._dtype)
+
+
 class QuadPotentialDiag(QuadPotential):
     """Quad potential using a diagonal covariance matrix."""
 
@@ -330,6 +613,9 @@ class QuadPotentialDiag(QuadPotential):
             return
         return self.v * x
 
+    def velocity_scaling(self):
+        return self.v
+
     def random(self):
         """Draw random value from QuadPotential."""
         return floatX(normal(size=self.s.shape)) * self.inv_s
@@ -407,6 +693,9 @@ class QuadPotentialFull(QuadPotential):
         """Compute the current velocity at a position in parameter space."""
         return np.dot(self.A, x, out=out)
 
+    def velocity_scaling(self):
+        return self.A
+
     def random(self):
         """Draw random value from QuadPotential."""
         n = floatX(normal(size=self.L.shape[0]))
@@ -95,6 +95,70 @@ def _theano_leapfrog_integrator(H, q, p, **theano_kwargs):
     return f
 
 
+def _theano_leapfrog_trajectory(logp_dlogp_func, dense=False, **theano_kwargs):
+    """Compile a theano function that integrates a whole trajectory.
+
+    The `n_steps` leapfrog steps are a `scan` over the joined cost and
+    gradient of a `pymc3.model.ValueGradFunction`. The velocity is the
+    product of the `scaling` input (a vector, or a matrix if `dense`)
+    and the momentum.
+
+    Parameters
+    ----------
+    logp_dlogp_func : pymc3.model.ValueGradFunction
+    dense : bool
+        Whether the scaling of the velocity is a matrix.
+    theano_kwargs : passed to theano.function
+
+    Returns
+    -------
+    theano function with inputs q, p, q_grad, epsilon, n_steps, scaling
+    that returns q_new, p_new, v_new, q_new_grad, energy_new
+    """
+    vars_joined = logp_dlogp_func._vars_joined
+    cost = logp_dlogp_func._cost_joined
+    grad = logp_dlogp_func._grad_joined
+    replace = {var: logp_dlogp_func._extra_vars_shared[var.name]
+               for var in logp_dlogp_func._extra_vars}
+
+    q = vars_joined.type('q')
+    p = vars_joined.type('p')
+    q_grad = vars_joined.type('q_grad')
+    epsilon = tt.scalar('epsilon', dtype=vars_joined.dtype)
+    n_steps = tt.iscalar('n_steps')
+    if dense:
+        scaling = tt.matrix('scaling', dtype=vars_joined.dtype)
+    else:
+        scaling = tt.vector('scaling', dtype=vars_joined.dtype)
+
+    def velocity(p, scaling):
+        if dense:
+            return tt.dot(scaling, p)
+        return scaling * p
+
+    def step(q, p, q_grad, epsilon, scaling):
+        dt = floatX(0.5) * epsilon
+        p_new = p + dt * q_grad  # half momentum update
+        q_new = q + epsilon * velocity(p_new, scaling)  # full position update
+        replace_q = dict(replace)
+        replace_q[vars_joined] = q_new
+        logp_new, q_new_grad = theano.clone([cost, grad], replace=replace_q)
+        p_new = p_new + dt * q_new_grad  # half momentum update
+        return q_new, p_new, q_new_grad, logp_new
+
+    (q_seq, p_seq, grad_seq, logp_seq), _ = theano.scan(
+        step, outputs_info=[q, p, q_grad, None], n_steps=n_steps,
+        non_sequences=[epsilon, scaling])
+    q_new, p_new, q_new_grad = q_seq[-1], p_seq[-1], grad_seq[-1]
+    v_new = velocity(p_new, scaling)
+    energy_new = floatX(0.5) * p_new.dot(v_new) - logp_seq[-1]
+
+    return theano.function(
+        inputs=[q, p, q_grad, epsilon, n_steps, scaling],
+        outputs=[q_new, p_new, v_new, q_new_grad, energy_new],
+        **theano_kwargs)
+
+
 def get_theano_hamiltonian_functions(model_vars, shared, logpt, potential,
                                      use_single_leapfrog=False,
                                      integrator="leapfrog", **theano_kwargs):
@@ -0,0 +1,356 @@
+from __future__ import division
+
+import numpy as np
+import numpy.random as nr
+
+from .base_hmc import HMCStepData, DivergenceInfo
+from .integration import State
+from .nuts import NUTS, Proposal
+from pymc3.theanof import floatX
+
+__all__ = ['VectorizedNUTS']
+
+
+def _velocity(scaling, p):
+    """Velocities of the rows of `p` for diagonal or dense scalings."""
+    if scaling.ndim == 3:
+        return np.einsum('kij,kj->ki', scaling, p)
+    return scaling * p
+
+
+def _rowdot(x, y):
+    return np.einsum('ij,ij->i', x, y)
+
+
+class VectorizedNUTS(NUTS):
+    R"""The No-U-Turn sampler for many chains in one process.
+
+    All chains build their trees in lockstep: each leapfrog step
+    computes the log probability and gradient for all chains whose
+    trees are still growing with one call of `ValueGradFunction.batch`,
+    and the tree bookkeeping is done with numpy on arrays with one row per
+    chain.
+    Chains whose trees have terminated wait for the other chains. This
+    avoids the process and per-step python overhead of running many
+    chains of a small model with `NUTS`.
+
+    Each chain has its own step size adaptation and potential, and
+    generates the same sampler stats as `NUTS`. The potential must
+    provide a `velocity_scaling`. The step method has to sample all free
+    variables of the model, and is used by `pymc3.sample` for all
+    chains at once, like this::
+
+        with model:
+            step = pm.VectorizedNUTS()
+            trace = pm.sample(500, step=step, chains=16)
+
+    Trees are built depth by depth like in `NUTS`, but the proposal
+    within a subtree is chosen by sampling the leaves in order instead of
+    recursively, which gives the same distribution.
+    """
+
+    name = 'vectorized_nuts'
+
+    def __init__(self, vars=None, **kwargs):
+        R"""Set up the vectorized No-U-Turn sampler.
+
+        Parameters
+        ----------
+        vars : list of Theano variables, default all continuous vars
+        kwargs: passed to NUTS
+        """
+        kwargs['batched'] = True
+        super(VectorizedNUTS, self).__init__(vars, **kwargs)
+        try:
+            self.potential.velocity_scaling()
+        except NotImplementedError:
+            raise ValueError("VectorizedNUTS needs a potential with a "
+                             "diagonal or dense velocity scaling, not %s."
+                             % type(self.potential).__name__)
+        self._chain_steps = []
+
+    def setup_chains(self, nchains):
+        """Create the step size adaptation, potential and warnings of
+        each chain."""
+        self._chain_steps = [self._copy_for_chain() for _ in range(nchains)]
+
+    def _copy_for_chain(self):
+        chain_step = super(VectorizedNUTS, self)._copy_for_chain()
+        chain_step._samples_after_tune = 0
+        chain_step._num_divs_sample = 0
+        chain_step._reached_max_treedepth = 0
+        chain_step._chain_steps = []
+        return chain_step
+
+    def chain_warnings(self, chain):
+        """Warnings of the chain with index `chain`."""
+        return self._chain_steps[chain].warnings()
+
+    def step_chains(self, points):
+        """Draw the next point of each chain.
+
+        Parameters
+        ----------
+        points : list of dicts
+            The current point of each chain
+
+        Returns
+        -------
+        list of `(point, stats)` tuples, like `step` for each chain
+        """
+        func = self._logp_dlogp_func
+        func.set_extra_values(points[0])
+        if len(self._chain_steps) != len(points):
+            self.setup_chains(len(points))
+        q0 = np.array([func.dict_to_array(point) for point in points])
+        q, stats = self.astep_chains(q0)
+        return [(func.array_to_full_dict(q[c]), [stats[c]])
+                for c in range(len(points))]
+
+    def astep_chains(self, q0):
+        """Draw a sample for each row of `q0`.
+
+        Return the new positions as an array like `q0` and a list with the
+        sampler stats of each chain.
+        """
+        nchains = len(q0)
+        chain_steps = self._chain_steps
+        for chain_step in chain_steps:
+            chain_step.tune = self.tune
+
+        adapt_step = self.tune and self.adapt_step_size
+        step_size = np.array([chain_step.step_adapt.current(adapt_step)
+                              for chain_step in chain_steps])
+        if self._step_rand is not None:
+            step_size = np.array([self._step_rand(eps) for eps in step_size])
+
+        scaling = np.array([chain_step.potential.velocity_scaling()
+                            for chain_step in chain_steps])
+        p0 = np.array([chain_step.potential.random()
+                       for chain_step in chain_steps], dtype=q0.dtype)
+        logp0, q0_grad = self._logp_dlogp_func.batch(q0)
+        v0 = _velocity(scaling, p0)
+        energy0 = 0.5 * _rowdot(p0, v0) - logp0
+
+        bad, = np.nonzero(~np.isfinite(energy0))
+        if len(bad):
+            chain_steps[bad[0]].potential.raise_ok(
+                self._logp_dlogp_func._ordering.vmap)
+            raise ValueError('Bad initial energy: %s. The model '
+                             'might be misspecified.' % energy0[bad[0]])
+
+        if self.tune and self.iter_count < 200:
+            max_treedepth = self.early_max_treedepth
+        else:
+            max_treedepth = self.max_treedepth
+
+        start = State(q0, p0, v0, q0_grad, energy0)
+        tree = _MultiTree(self._logp_dlogp_func.batch, scaling, start,
+                          step_size, self.Emax)
+
+        active = np.ones(nchains, dtype=bool)
+        for _ in range(max_treedepth):
+            direction = np.where(nr.uniform(size=nchains) < 0.5, 1, -1)
+            diverging, turning = tree.extend(direction, active)
+            active &= ~(diverging | turning)
+            if not active.any():
+                break
+
+        q = tree.proposal_q.copy()
+        stats = []
+        for c, chain_step in enumerate(chain_steps):
+            if active[c] and not self.tune:
+                chain_step._reached_max_treedepth += 1
+            tree_stats = tree.stats(c)
+            proposal = Proposal(q[c], tree.proposal_grad[c].copy(),
+                                tree.proposal_energy[c], None)
+            hmc_step = HMCStepData(proposal, tree_stats['mean_tree_accept'],
+                                   tree.divergence_info[c], tree_stats)
+            stats.append(chain_step._finish_step(hmc_step, adapt_step))
+
+        self.iter_count += 1
+        if not self.tune:
+            self._samples_after_tune += 1
+        return q, stats
+
+
+class _MultiTree(object):
+    def __init__(self, logp_dlogp_batch, scaling, start, step_size, Emax):
+        """Binary trees of the NUTS algorithm for many chains.
+
+        Parameters
+        ----------
+        logp_dlogp_batch : function
+            Computes log probabilities and gradients for the rows of a
+            matrix.
+        scaling : array
+            The velocity scaling of the potential of each chain, as
+            rows of diagonals or as matrices.
+        start : integration.State
+            The starting points of the trajectories as rows.
+        step_size : array
+            The step size of each chain
+        Emax : float
+            The maximum energy change to accept before aborting the
+            transition as diverging.
+        """
+        self.logp_dlogp_batch = logp_dlogp_batch
+        self.scaling = scaling
+        self.step_size = step_size
+        self.Emax = Emax
+        self.start_energy = start.energy
+
+        nchains = len(start.q)
+        self.left_q, self.left_p, self.left_v, self.left_grad = (
+            start.q.copy(), start.p.copy(), start.v.copy(),
+            start.q_grad.copy())
+        self.right_q, self.right_p, self.right_v, self.right_grad = (
+            start.q.copy(), start.p.copy(), start.v.copy(),
+            start.q_grad.copy())
+        self.proposal_q = start.q.copy()
+        self.proposal_grad = start.q_grad.copy()
+        self.proposal_energy = start.energy.copy()
+
+        self.depth = 0
+        self.depths = np.zeros(nchains, dtype=int)
+        self.log_size = np.zeros(nchains)
+        self.accept_sum = np.zeros(nchains)
+        self.n_proposals = np.zeros(nchains, dtype=int)
+        self.p_sum = start.p.copy()
+        self.max_energy_change = np.zeros(nchains)
+        self.divergence_info = [None] * nchains
+
+    def _leapfrog(self, idx, epsilon, q, p, q_grad):
+        """Leapfrog steps for the chains `idx` from the rows q, p, q_grad."""
+        scaling = self.scaling[idx]
+        dt = 0.5 * epsilon[:, None]
+        p = p + dt * q_grad
+        q = q + epsilon[:, None] * _velocity(scaling, p)
+        logp, q_grad = self.logp_dlogp_batch(q)
+        p += dt * q_grad
+        v = _velocity(scaling, p)
+        energy = 0.5 * _rowdot(p, v) - logp
+        return q, p, v, q_grad, energy
+
+    def extend(self, direction, active):
+        """Double the trees of the `active` chains in the given directions.
+
+        Return boolean arrays `(diverging, turning)`, which are true for
+        chains whose trees stopped growing, like in `_Tree.extend`.
+        """
+        nchains, ndim = self.p_sum.shape
+        depth = self.depth
+        forward = direction > 0
+        epsilon = floatX(direction * self.step_size)
+
+        # The subtrees are built leaf by leaf, and the proposal is sampled
+        # from the leaves in order.
+        sub_log_size = np.full(nchains, -np.inf)
+        sub_q = np.empty_like(self.proposal_q)
+        sub_grad = np.empty_like(self.proposal_grad)
+        sub_energy = np.empty_like(self.proposal_energy)
+
+        # Cumulative momentum sum of the subtree. For the node of height j
+        # that starts at a leaf, the sum before that leaf and the velocity
+        # of the leaf are kept for the U-turn check of the node.
+        p_sum = np.zeros_like(self.p_sum)
+        node_p_sum = np.empty((depth + 1, nchains, ndim), dtype=p_sum.dtype)
+        node_v = np.empty((depth + 1, nchains, ndim), dtype=p_sum.dtype)
+
+        diverging = np.zeros(nchains, dtype=bool)
+        turning = np.zeros(nchains, dtype=bool)
+        stepping = active.copy()
+        for leaf in range(2 ** depth):
+            idx, = np.nonzero(stepping)
+            if not len(idx):
+                break
+            fwd = forward[idx][:, None]
+            q = np.where(fwd, self.right_q[idx], self.left_q[idx])
+            p = np.where(fwd, self.right_p[idx], self.left_p[idx])
+            q_grad = np.where(fwd, self.right_grad[idx], self.left_grad[idx])
+            q_new, p_new, v_new, grad_new, energy_new = self._leapfrog(
+                idx, epsilon[idx], q, p, q_grad)
+
+            energy_change = energy_new - self.start_energy[idx]
+            energy_change[np.isnan(energy_change)] = np.inf
+            larger = np.abs(energy_change) > np.abs(self.max_energy_change[idx])
+            self.max_energy_change[idx[larger]] = energy_change[larger]
+            self.n_proposals[idx] += 1
+
+            ok = np.abs(energy_change) < self.Emax
+            for i in np.nonzero(~ok)[0]:
+                c = idx[i]
+                error_msg = ("Energy change in leapfrog step is too large: %s."
+                             % energy_change[i])
+                state = State(q[i], p[i], None, q_grad[i], None)
+                self.divergence_info[c] = DivergenceInfo(error_msg, None, state)
+                diverging[c] = True
+                stepping[c] = False
+
+            idx, fwd, energy_change = idx[ok], fwd[ok], energy_change[ok]
+            q_new, p_new, v_new = q_new[ok], p_new[ok], v_new[ok]
+            grad_new, energy_new = grad_new[ok], energy_new[ok]
+
+            self.accept_sum[idx] += np.minimum(1, np.exp(-energy_change))
+            log_size = -energy_change
+            new_log_size = np.logaddexp(sub_log_size[idx], log_size)
+            accept = (np.log(nr.uniform(size=len(idx)))
+                      < log_size - new_log_size)
+            sub_log_size[idx] = new_log_size
+            sub_q[idx[accept]] = q_new[accept]
+            sub_grad[idx[accept]] = grad_new[accept]
+            sub_energy[idx[accept]] = energy_new[accept]
+
+            fwd = fwd[:, 0]
+            for end_q, end_p, end_v, end_grad, is_end in [
+                    (self.right_q, self.right_p, self.right_v,
+                     self.right_grad, fwd),
+                    (self.left_q, self.left_p, self.left_v,
+                     self.left_grad, ~fwd)]:
+                end_q[idx[is_end]] = q_new[is_end]
+                end_p[idx[is_end]] = p_new[is_end]
+                end_v[idx[is_end]] = v_new[is_end]
+                end_grad[idx[is_end]] = grad_new[is_end]
+
+            for height in range(1, depth + 1):
+                if leaf % 2 ** height == 0:
+                    node_p_sum[height, idx] = p_sum[idx]
+                    node_v[height, idx] = v_new
+            p_sum[idx] += p_new
+            for height in range(1, depth + 1):
+                if (leaf + 1) % 2 ** height == 0:
+                    node_sum = p_sum[idx] - node_p_sum[height, idx]
+                    turn = ((_rowdot(node_sum, node_v[height, idx]) <= 0)
+                            | (_rowdot(node_sum, v_new) <= 0))
+                    turning[idx[turn]] = True
+                    stepping[idx[turn]] = False
+
+        self.depth += 1
+        self.depths[active] += 1
+
+        idx, = np.nonzero(active & ~(diverging | turning))
+        accept = (np.log(nr.uniform(size=len(idx)))
+                  < sub_log_size[idx] - self.log_size[idx])
+        self.proposal_q[idx[accept]] = sub_q[idx[accept]]
+        self.proposal_grad[idx[accept]] = sub_grad[idx[accept]]
+        self.proposal_energy[idx[accept]] = sub_energy[idx[accept]]
+        self.log_size[idx] = np.logaddexp(self.log_size[idx], sub_log_size[idx])
+
+        self.p_sum[idx] += p_sum[idx]
+        p_sum = self.p_sum[idx]
+        turn = ((_rowdot(p_sum, self.left_v[idx]) <= 0)
+                | (_rowdot(p_sum, self.right_v[idx]) <= 0))
+        turning[idx[turn]] = True
+        return diverging, turning
+
+    def stats(self, chain):
+        return {
+            'depth': self.depths[chain],
+            'mean_tree_accept': (self.accept_sum[chain]
+                                 / self.n_proposals[chain]),
+            'energy_error': (self.proposal_energy[chain]
+                             - self.start_energy[chain]),
+            'energy': self.proposal_energy[chain],
+            'tree_size': self.n_proposals[chain],
+            'max_energy_error': self.max_energy_change[chain],
+        }
@@ -7,7 +7,8 @@ from ..step_methods import Slice, Metropolis, NUTS
 from ..distributions import Normal
 from ..tuning import find_MAP
 from ..sampling import sample
-from ..diagnostics import effective_n, geweke, gelman_rubin
+from ..diagnostics import effective_n, geweke, gelman_rubin, OnlineDiagnostics
+from ..stats import autocov
 from .test_examples import build_disaster_model
 import pytest
 import theano
@@ -213,3 +214,150 @@ class TestDiagnostics(SeededTest):
         """Check effective sample size shape is correct w/ scalar as shape=1"""
         self.test_effective_n_right_shape_python_float(shape=1,
                                                        test_shape=(1,))
+
+    def test_effective_n_elementwise(self):
+        """Check the vectorized effective sample size against Geyer's
+        sequences computed element by element"""
+        def get_neff(x):
+            nchain, n_samples = x.shape
+            acov = np.asarray([autocov(x[chain]) for chain in range(nchain)])
+            chain_mean = x.mean(axis=1)
+            chain_var = acov[:, 0] * n_samples / (n_samples - 1.)
+            acov_t = acov[:, 1] * n_samples / (n_samples - 1.)
+            mean_var = np.mean(chain_var)
+            var_plus = mean_var * (n_samples - 1.) / n_samples
+            var_plus += np.var(chain_mean, ddof=1)
+
+            rho_hat_t = np.zeros(n_samples)
+            rho_hat_even = 1.
+            rho_hat_t[0] = rho_hat_even
+            rho_hat_odd = 1. - (mean_var - np.mean(acov_t)) / var_plus
+            rho_hat_t[1] = rho_hat_odd
+            max_t = 1
+            t = 1
+            while t < (n_samples - 2) and (rho_hat_even + rho_hat_odd) >= 0.:
+                rho_hat_even = 1. - (mean_var - np.mean(acov[:, t + 1])) / var_plus
+                rho_hat_odd = 1. - (mean_var - np.mean(acov[:, t + 2])) / var_plus
+                if (rho_hat_even + rho_hat_odd) >= 0:
+                    rho_hat_t[t + 1] = rho_hat_even
+                    rho_hat_t[t + 2] = rho_hat_odd
+                max_t = t + 2
+                t += 2
+
+            t = 3
+            while t <= max_t - 2:
+                if (rho_hat_t[t + 1] + rho_hat_t[t + 2]) > (rho_hat_t[t - 1] + rho_hat_t[t]):
+                    rho_hat_t[t + 1] = (rho_hat_t[t - 1] + rho_hat_t[t]) / 2.
+                    rho_hat_t[t + 2] = rho_hat_t[t + 1]
+                t += 2
+            return nchain * n_samples / (-1. + 2. * np.sum(rho_hat_t))
+
+        np.random.seed(42)
+        for n_samples in (50, 51):
+            # Random walks have positive autocorrelations up to large lags,
+            # white noise has small negative ones.
+            walk = np.cumsum(np.random.randn(3, n_samples, 4), axis=1)
+            noise = np.random.randn(3, n_samples, 4)
+            x = np.concatenate([walk, noise, walk + noise], axis=2)
+            n_effective = effective_n(x)
+            expected = [get_neff(x[:, :, i]) for i in range(x.shape[2])]
+            assert_allclose(n_effective, expected, rtol=1e-8)
+
+
+class TestVectorizedDiagnostics(SeededTest):
+    def test_geweke_elementwise(self):
+        x = np.random.randn(500, 3, 2)
+        x[:, 1] += np.linspace(0, 2, 500)[:, None]
+        scores = geweke(x, first=.1, last=.5, intervals=10)
+        assert scores.shape == (3, 2, 10, 2)
+        for i in range(3):
+            for j in range(2):
+                assert_allclose(scores[i, j], geweke(x[:, i, j], intervals=10))
+
+        # Reference loop over the intervals
+        y = x[:, 1, 0]
+        end = len(y) - 1
+        for start, z in scores[1, 0]:
+            start = int(start)
+            first_slice = y[start: start + int(.1 * (end - start))]
+            last_slice = y[int(end - .5 * (end - start)):]
+            expected = first_slice.mean() - last_slice.mean()
+            expected /= np.sqrt(first_slice.var() + last_slice.var())
+            assert_allclose(z, expected)
+
+    def test_gelman_rubin_split(self):
+        x = np.random.randn(4, 101, 3)
+        # A trend within each chain only shows up in split R-hat
+        x[..., 0] += np.linspace(-3, 3, 101)
+        halves = np.concatenate([x[:, :50], x[:, 51:]])
+        assert_allclose(gelman_rubin(x, split=True), gelman_rubin(halves))
+        rhat = gelman_rubin(x, split=True)
+        assert rhat[0] > 1.1
+        assert gelman_rubin(x)[0] < 1.1
+
+    def test_gelman_rubin_rank(self):
+        from scipy.stats import rankdata, norm
+        x = np.random.standard_cauchy((4, 100, 2))
+        # Ties get their average rank
+        x[..., 1] = np.round(x[..., 1])
+        x[1, :, 0] *= 10
+
+        def rank_normalize(y):
+            ranks = rankdata(y.ravel()).reshape(y.shape)
+            return norm.ppf((ranks - 3. / 8) / (y.size + 1. / 4))
+
+        rhat = gelman_rubin(x, split=True, rank=True)
+        halves = np.concatenate([x[:, :50], x[:, 50:]])
+        for i in range(2):
+            y = halves[..., i]
+            z = rank_normalize(y)
+            z_folded = rank_normalize(np.abs(y - np.median(y)))
+            expected = max(gelman_rubin(z), gelman_rubin(z_folded))
+            assert_allclose(rhat[i], expected)
+        # The different scale of one chain is detected
+        assert rhat[0] > 1.05
+
+
+class TestOnlineDiagnostics(SeededTest):
+    def update(self, diagnostics, x):
+        for i in range(x.shape[1]):
+            for chain in range(x.shape[0]):
+                diagnostics.update(chain, {'a': x[chain, i, :2],
+                                           'b': x[chain, i, 2:]})
+
+    def test_equal_offline(self):
+        x = np.random.randn(3, 200, 5)
+        x[..., 1] = np.cumsum(x[..., 1], axis=1)
+        diagnostics = OnlineDiagnostics(window=200)
+        self.update(diagnostics, x)
+        assert diagnostics.draws == {0: 200, 1: 200, 2: 200}
+
+        rhat = diagnostics.gelman_rubin()
+        assert_allclose(rhat['a'], gelman_rubin(x[..., :2]))
+        assert_allclose(rhat['b'], gelman_rubin(x[..., 2:]))
+
+        n_eff = diagnostics.effective_n(method='window')
+        assert_allclose(n_eff['a'], effective_n(x[..., :2]))
+        assert_allclose(n_eff['b'], effective_n(x[..., 2:]))
+
+    def test_batch_means(self):
+        x = np.random.randn(2, 5000, 3)
+        diagnostics = OnlineDiagnostics(n_batches=16)
+        self.update(diagnostics, x)
+        n_eff = diagnostics.effective_n()
+        assert_allclose(n_eff['a'], 10000, rtol=0.5)
+        assert_allclose(n_eff['b'], 10000, rtol=0.5)
+
+        walk = OnlineDiagnostics(n_batches=16)
+        self.update(walk, np.cumsum(x, axis=1))
+        assert_array_less(walk.effective_n()['a'], 1000)
+
+    def test_sample(self):
+        with Model():
+            Normal('x', 0, 1, shape=2)
+            diagnostics = OnlineDiagnostics()
+            trace = sample(200, tune=50, chains=2, cores=1,
+                           diagnostics=diagnostics, progressbar=False)
+        assert diagnostics.draws == {0: 200, 1: 200}
+        assert_allclose(diagnostics.gelman_rubin()['x'],
+                        gelman_rubin(trace)['x'])
@@ -115,6 +115,42 @@ class TestDrawValues(SeededTest):
         assert isinstance(mu, np.ndarray)
         assert isinstance(tau, np.ndarray)
 
+    def test_draw_plan_cache(self):
+        with pm.Model() as model:
+            x = pm.Normal('x', mu=0., sd=1.)
+            exp_x = pm.Deterministic('exp_x', pm.math.exp(x))
+
+        exp_x1, x1 = draw_values([exp_x, x])
+        assert len(model._draw_values_plans) == 1
+        exp_x2, x2 = draw_values([exp_x, x])
+        assert len(model._draw_values_plans) == 1
+        npt.assert_almost_equal(np.exp(x2), exp_x2)
+        assert x1 != x2
+
+        exp_x3, x3 = draw_values([exp_x, x], point={'x': 2.})
+        assert len(model._draw_values_plans) == 2
+        npt.assert_almost_equal(x3, 2.)
+        npt.assert_almost_equal(exp_x3, np.exp(2.))
+
+        with model:
+            pm.Normal('y', mu=exp_x, sd=1.)
+        assert len(model._draw_values_plans) == 0
+
+    def test_draw_plan_cache_bounded(self):
+        with pm.Model() as model:
+            x = pm.Normal('x', mu=0., sd=1.)
+
+        size = pm.distributions.distribution.DRAW_VALUES_PLANS_SIZE
+        first = x + 1.
+        with model:
+            draw_values([first])
+            for i in range(2 * size):
+                # A fresh graph for each call, like gp.predict
+                draw_values([x * float(i)])
+                assert len(model._draw_values_plans) <= size
+        assert len(model._draw_values_plans) == size
+        assert ((first,), frozenset()) not in model._draw_values_plans
+
 
 class BaseTestCases(object):
     class BaseTestCase(SeededTest):
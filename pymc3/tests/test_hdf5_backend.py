@@ -1,3 +1,4 @@
+import functools
 import numpy as np
 from pymc3.tests import backend_fixtures as bf
 from pymc3.backends import ndarray, hdf5
@@ -106,3 +107,18 @@ class TestNDArrayHDF5Equality(bf.BackendEqualityTestCase):
     backend1 = hdf5.HDF5
     name1 = DBNAME
     shape = (2, 3)
+
+
+class TestHDF5Buffered2dSelection(bf.SelectionTestCase):
+    backend = functools.partial(hdf5.HDF5, buffer_size=2, compression='gzip')
+    name = DBNAME
+    shape = (2, 3)
+    sampler_vars = STATS2
+    skip_test_get_slice_neg_step = True
+
+
+class TestHDF5BufferedDumpLoad(bf.DumpLoadTestCase):
+    backend = functools.partial(hdf5.HDF5, buffer_size=2, compression='lzf')
+    load_func = staticmethod(hdf5.load)
+    name = DBNAME
+    shape = (2, 3)
@@ -3,6 +3,7 @@ import numpy.testing as npt
 
 from . import models
 from pymc3.step_methods.hmc.base_hmc import BaseHMC
+from pymc3.step_methods.hmc import integration
 import pymc3
 from pymc3.theanof import floatX
 
@@ -38,3 +39,69 @@ def test_nuts_tuning():
 
     assert not step.tune
     assert np.all(trace['step_size'][5:] == trace['step_size'][5])
+
+
+def test_leapfrog_out():
+    n = 3
+    np.random.seed(42)
+    start, model, _ = models.non_normal(n)
+    size = model.ndim
+    scaling = floatX(np.random.rand(size))
+    step = BaseHMC(vars=model.vars, model=model, scaling=scaling)
+    step.integrator._logp_dlogp_func.set_extra_values({})
+    p = floatX(step.potential.random())
+    q = floatX(np.random.randn(size))
+    start = step.integrator.compute_state(p, q)
+    expected = step.integrator.step(.1, start)
+    out = integration.State(*[np.empty_like(q) for _ in range(4)], energy=None)
+    state = step.integrator.step(.1, start, out=out)
+    assert state.q is out.q
+    assert state.q_grad is out.q_grad
+    for a, b in zip(state, expected):
+        npt.assert_allclose(a, b)
+
+
+def test_nuts_state_pool():
+    with pymc3.Model():
+        pymc3.Normal("x", mu=0, sd=1, shape=10)
+        step = pymc3.NUTS(max_treedepth=4, early_max_treedepth=4)
+        trace = pymc3.sample(50, step=step, tune=50, progressbar=False,
+                             chains=1)
+
+    # At most three states for the end points and the proposal of the
+    # tree and each subtree that is being built
+    assert 0 < len(step._state_pool) <= 3 * step.max_treedepth + 1
+    assert len(step._p_sum_pool) <= step.max_treedepth + 1
+    assert len(np.unique(trace['x'][:, 0])) > 1
+
+
+def test_compiled_trajectory():
+    n = 3
+    np.random.seed(42)
+    start, model, _ = models.non_normal(n)
+    size = model.ndim
+    scaling = floatX(np.random.rand(size))
+    step = BaseHMC(vars=model.vars, model=model, scaling=scaling)
+    step.integrator._logp_dlogp_func.set_extra_values({})
+    integrator = integration.CompiledTrajectoryIntegrator(
+        step.potential, step._logp_dlogp_func)
+    p = floatX(step.potential.random())
+    q = floatX(np.random.randn(size))
+    start = step.integrator.compute_state(q, p)
+    for n_steps in [1, 2, 5]:
+        expected = start
+        for _ in range(n_steps):
+            expected = step.integrator.step(.1, expected)
+        state = integrator.integrate(.1, start, n_steps)
+        for a, b in zip(state, expected):
+            npt.assert_allclose(a, b, rtol=1e-5)
+
+
+def test_hmc_compile_trajectory():
+    with pymc3.Model():
+        pymc3.Normal("x", mu=0, sd=1, shape=2)
+        step = pymc3.HamiltonianMC(compile_trajectory=True)
+        trace = pymc3.sample(20, step=step, tune=10, progressbar=False,
+                             chains=1)
+    assert trace['x'].shape == (20, 2)
+    assert trace['accepted'].any()
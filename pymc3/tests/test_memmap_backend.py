@@ -0,0 +1,137 @@
+import numpy as np
+import pymc3 as pm
+from pymc3.tests import backend_fixtures as bf
+from pymc3.backends import base, ndarray, memmap
+import pytest
+
+
+STATS1 = [{
+    'a': np.float64,
+    'b': np.bool
+}]
+
+STATS2 = [{
+    'a': np.float64
+}, {
+    'a': np.float64,
+    'b': np.int64,
+}]
+
+
+class TestMemmapSampling(object):
+    name = 'memmap-db'
+
+    def test_sample(self):
+        with pm.Model():
+            pm.Normal("mu", mu=0, sd=1, shape=2)
+            db = memmap.MemmapNDArray(self.name, chunk_size=7)
+            trace = pm.sample(20, tune=10, init=None, trace=db, cores=2)
+        assert trace['mu'].shape == (40, 2)
+        assert isinstance(trace.get_values('mu', chains=0), np.memmap)
+
+    def test_resume(self):
+        with pm.Model():
+            pm.Normal("mu", mu=0, sd=1, shape=2)
+            db = memmap.MemmapNDArray(self.name, chunk_size=3)
+            db.setup(4, 0)
+            for i in range(4):
+                db.record({'mu': np.array([i, i], dtype=float)})
+            db.close()
+
+            db = memmap.MemmapNDArray(self.name, chunk_size=3)
+            db.setup(4, 0)
+            assert len(db) == 4
+            for i in range(4, 8):
+                db.record({'mu': np.array([i, i], dtype=float)})
+            db.close()
+        np.testing.assert_equal(db.get_values('mu')[:, 0], np.arange(8))
+
+    def test_resume_different_shape(self):
+        with pm.Model():
+            pm.Normal("mu", mu=0, sd=1, shape=2)
+            db = memmap.MemmapNDArray(self.name)
+            db.setup(4, 0)
+            db.close()
+        with pm.Model():
+            pm.Normal("mu", mu=0, sd=1, shape=3)
+            db = memmap.MemmapNDArray(self.name)
+            with pytest.raises(base.BackendError):
+                db.setup(4, 0)
+
+    def teardown_method(self):
+        bf.remove_file_or_directory(self.name)
+
+
+class TestMemmap0dSampling(bf.SamplingTestCase):
+    backend = memmap.MemmapNDArray
+    name = 'memmap-db'
+    shape = ()
+
+
+class TestMemmap0dSamplingStats1(bf.SamplingTestCase):
+    backend = memmap.MemmapNDArray
+    name = 'memmap-db'
+    sampler_vars = STATS1
+    shape = ()
+
+
+class TestMemmap0dSamplingStats2(bf.SamplingTestCase):
+    backend = memmap.MemmapNDArray
+    name = 'memmap-db'
+    sampler_vars = STATS2
+    shape = ()
+
+
+class TestMemmap2dSampling(bf.SamplingTestCase):
+    backend = memmap.MemmapNDArray
+    name = 'memmap-db'
+    shape = (2, 3)
+
+
+class TestMemmap0dSelection(bf.SelectionTestCase):
+    backend = memmap.MemmapNDArray
+    name = 'memmap-db'
+    shape = ()
+    sampler_vars = STATS1
+
+
+class TestMemmap1dSelection(bf.SelectionTestCase):
+    backend = memmap.MemmapNDArray
+    name = 'memmap-db'
+    shape = 2
+
+
+class TestMemmap2dSelection(bf.SelectionTestCase):
+    backend = memmap.MemmapNDArray
+    name = 'memmap-db'
+    shape = (2, 3)
+    sampler_vars = STATS2
+
+
+class TestMemmapDumpLoad(bf.DumpLoadTestCase):
+    backend = memmap.MemmapNDArray
+    load_func = staticmethod(memmap.load)
+    name = 'memmap-db'
+    shape = (2, 3)
+
+
+class TestMemmapDumpFunction(bf.BackendEqualityTestCase):
+    backend0 = backend1 = ndarray.NDArray
+    name0 = None
+    name1 = 'memmap-db'
+    shape = (2, 3)
+
+    @classmethod
+    def setup_class(cls):
+        super(TestMemmapDumpFunction, cls).setup_class()
+        memmap.dump(cls.name1, cls.mtrace1)
+        with cls.model:
+            cls.mtrace1 = memmap.load(cls.name1)
+
+
+class TestNDArrayMemmapEquality(bf.BackendEqualityTestCase):
+    backend0 = ndarray.NDArray
+    name0 = None
+    backend1 = memmap.MemmapNDArray
+    name1 = 'memmap-db'
+    shape = (2, 3)
@@ -9,6 +9,7 @@ import pymc3 as pm
 from pymc3.distributions import HalfCauchy, Normal, transforms
 from pymc3 import Potential, Deterministic
 from pymc3.model import ValueGradFunction
+from pymc3.theanof import floatX
 
 
 class NewModel(pm.Model):
@@ -256,6 +257,27 @@ class TestValueGradFunction(unittest.TestCase):
         assert val == 21
         npt.assert_allclose(grad, [5, 5, 5, 1, 1, 1, 1, 1, 1])
 
+    def test_batch(self):
+        self.f_grad.set_extra_values({'extra1': 5})
+        arrays = np.arange(3 * self.f_grad.size, dtype=self.f_grad.dtype)
+        arrays = arrays.reshape(3, self.f_grad.size)
+        vals, grads = self.f_grad.batch(arrays)
+        assert vals.shape == (3,)
+        assert grads.shape == arrays.shape
+        for array, val, grad in zip(arrays, vals, grads):
+            val_, grad_ = self.f_grad(array)
+            npt.assert_allclose(val, val_)
+            npt.assert_allclose(grad, grad_)
+
+        grad_out = np.empty_like(arrays)
+        vals_ = self.f_grad.batch(arrays, grad_out=grad_out,
+                                  extra_vars={'extra1': 5})
+        npt.assert_allclose(vals_, vals)
+        npt.assert_allclose(grad_out, grads)
+
+        with pytest.raises(ValueError):
+            self.f_grad.batch(arrays[0])
+
     def test_bij(self):
         self.f_grad.set_extra_values({'extra1': 5})
         array = np.ones(self.f_grad.size, dtype=self.f_grad.dtype)
@@ -270,6 +292,20 @@ class TestValueGradFunction(unittest.TestCase):
         assert len(point_) == 3
         assert point_['extra1'] == 5
 
+    def test_batched_model_function(self):
+        with pm.Model() as m:
+            pm.Normal('x', mu=1, sd=2, shape=2)
+            pm.HalfNormal('y', sd=1)
+        func = m.logp_dlogp_function(batched=True)
+        assert func._theano_batch_function is not None
+        func.set_extra_values({})
+        arrays = floatX(np.random.randn(4, func.size))
+        vals, grads = func.batch(arrays)
+        for array, val, grad in zip(arrays, vals, grads):
+            val_, grad_ = func(array)
+            npt.assert_allclose(val, val_, rtol=1e-5)
+            npt.assert_allclose(grad, grad_, rtol=1e-5)
+
     def test_edge_case(self):
         # Edge case discovered in #2948
         ndim = 3
@@ -139,6 +139,80 @@ class TestMultiTrace_add_remove_values(bf.ModelBackendSampledTestCase):
         assert name not in mtrace.varnames
 
 
+class TestLazyMultiTrace(bf.ModelBackendSampledTestCase):
+    name = None
+    backend = ndarray.NDArray
+    shape = (2, 3)
+
+    def test_points(self):
+        lazy = self.mtrace.as_lazy()
+        points = list(lazy.points())
+        expected = list(self.mtrace.points())
+        assert len(points) == len(expected)
+        for point, expected_point in zip(points, expected):
+            assert isinstance(point, base.PointView)
+            assert set(point.keys()) == set(expected_point.keys())
+            for varname, value in expected_point.items():
+                npt.assert_equal(point[varname], value)
+
+    def test_point(self):
+        lazy = self.mtrace.as_lazy()
+        for varname, value in self.mtrace.point(-1, chain=0).items():
+            npt.assert_equal(lazy.point(-1, chain=0)[varname], value)
+        with pytest.raises(KeyError):
+            lazy.point(0)['not_a_variable']
+
+    def test_point_copy_and_assign(self):
+        lazy = self.mtrace.as_lazy()
+        varname = self.mtrace.varnames[0]
+        expected = self.mtrace.point(0, chain=0)[varname]
+
+        point = lazy.point(0, chain=0)
+        copied = point.copy()
+        assert isinstance(copied, dict)
+        copied[varname][...] = 0
+        point[varname] = 1
+        assert point[varname] == 1
+        del point[varname]
+        assert varname not in point
+        npt.assert_equal(lazy.point(0, chain=0)[varname], expected)
+        npt.assert_equal(self.mtrace.point(0, chain=0)[varname], expected)
+
+    def test_points_respect_cache_size(self):
+        lazy = self.mtrace.as_lazy(cache_size=1)
+        calls = []
+        get_values = lazy.get_values
+
+        def counted_get_values(varname, *args, **kwargs):
+            calls.append(varname)
+            return get_values(varname, *args, **kwargs)
+
+        lazy.get_values = counted_get_values
+        for point in lazy.points():
+            for varname in point:
+                point[varname]
+            assert len(lazy._cache) <= 1
+        # Each variable is loaded once per chain
+        assert len(calls) == len(lazy.varnames) * lazy.nchains
+
+    def test_cache(self):
+        lazy = self.mtrace.as_lazy(cache_size=2)
+        varname = self.mtrace.varnames[0]
+        values = lazy.get_values(varname)
+        assert lazy.get_values(varname) is values
+        assert not values.flags.writeable
+        npt.assert_equal(values, self.mtrace.get_values(varname))
+
+        lazy.get_values(varname, burn=1)
+        lazy.get_values(varname, burn=2)
+        assert len(lazy._cache) == 2
+        assert lazy.get_values(varname) is not values
+
+    def test_slice_stays_lazy(self):
+        lazy = self.mtrace.as_lazy()
+        assert lazy[1:]._lazy
+
+
 class TestSqueezeCat(object):
 
     def setup_method(self):
@@ -20,7 +20,6 @@ def test_abort():
     proc = ps.ProcessAdapter(10, 10, step, chain=3, seed=1,
                              start={'a': 1., 'b_log__': 2.})
     proc.start()
-    proc.write_next()
     proc.abort()
     proc.join()
 
@@ -40,15 +39,15 @@ def test_explicit_sample():
     proc = ps.ProcessAdapter(10, 10, step, chain=3, seed=1,
                              start={'a': 1., 'b_log__': 2.})
     proc.start()
+    draws = []
     while True:
-        proc.write_next()
-        out = ps.ProcessAdapter.recv_draw([proc])
-        view = proc.shared_point_view
-        for name in view:
-            view[name].copy()
+        out = ps.ProcessAdapter.recv_draws([proc])
+        draws.extend(proc.read_draws())
         if out[1]:
             break
+        proc.ack()
     proc.join()
+    assert [draw[0] for draw in draws] == list(range(20))
     print(time.time() - start)
 
 
@@ -70,3 +69,35 @@ def test_iterator():
     with sampler:
         for draw in sampler:
             pass
+
+
+@pytest.mark.skipif(sys.version_info < (3,3),
+                    reason="requires python3.3")
+@pytest.mark.parametrize('buffer_depth', [1, 3, 100])
+def test_buffer_depth(buffer_depth):
+    with pm.Model() as model:
+        a = pm.Normal('a', shape=2)
+        pm.HalfNormal('b')
+        step1 = pm.NUTS([a])
+        step2 = pm.Metropolis([model.b_log__])
+
+    step = pm.CompoundStep([step1, step2])
+
+    start = {'a': [1., 2.], 'b_log__': 2.}
+    sampler = ps.ParallelSampler(10, 15, 3, 2, [2, 3, 4], [start] * 3,
+                                 step, 0, False, buffer_depth=buffer_depth)
+    draws = {chain: [] for chain in range(3)}
+    with sampler:
+        for draw in sampler:
+            draws[draw.chain].append(draw)
+
+    for chain_draws in draws.values():
+        assert [draw.draw_idx for draw in chain_draws] == list(range(25))
+        assert [draw.tuning for draw in chain_draws] == [True] * 15 + [False] * 10
+        assert [draw.is_last for draw in chain_draws] == [False] * 24 + [True]
+        assert chain_draws[-1].warnings is not None
+        assert chain_draws[0].point['a'].shape == (2,)
+        assert len(chain_draws[0].stats) == 2
+        assert [bool(draw.stats[0]['tune']) for draw in chain_draws] == [True] * 16 + [False] * 9
+        # the points are copied out of the buffer
+        assert not all(chain_draws[0].point['a'] == chain_draws[-1].point['a'])
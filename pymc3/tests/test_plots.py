@@ -120,6 +120,21 @@ def test_plots_transformed():
     assert plot_posterior(trace).numCols == 1
     assert plot_posterior(trace, plot_transformed=True).shape == (2, )
 
+
+def test_autocorrplot_multidimensional():
+    with pm.Model():
+        pm.Normal('x', shape=(2, 3))
+        trace = pm.sample(100, tune=0, step=pm.Metropolis(), chains=2)
+
+    ax = autocorrplot(trace, max_lag=10)
+    assert ax.shape == (6, 2)
+    assert ax[4, 1].get_title() == 'x_1_1 (chain 1)'
+    values = trace.get_values('x', chains=1)[:, 1, 1]
+    acorr = pm.stats.autocorr_batch(values[None], 10)[0]
+    segments = ax[4, 1].collections[0].get_segments()
+    close_to(np.array([seg[1, 1] for seg in segments])[10:], acorr, 1e-10)
+
+
 def test_pairplot():
     with pm.Model() as model:
         a = pm.Normal('a', shape=2)
@@ -137,3 +137,75 @@ def test_user_potential():
         step = pymc3.NUTS(potential=pot)
         pymc3.sample(10, init=None, step=step, chains=1)
     assert called
+
+
+def _correlated_samples(n_samples):
+    np.random.seed(42)
+    cov = np.array([[1., 0.8, 0.],
+                    [0.8, 2., 0.5],
+                    [0., 0.5, 0.5]])
+    samples = np.random.multivariate_normal(np.zeros(3), cov, size=n_samples)
+    return cov, samples
+
+
+def test_full_adapt_covariance():
+    cov, samples = _correlated_samples(2001)
+    pot = quadpotential.QuadPotentialFullAdapt(
+        3, np.zeros(3), np.eye(3), 10, adaptation_window=1000, dtype='d')
+    for sample in samples:
+        pot.update(sample, None, True)
+    npt.assert_allclose(pot.velocity_scaling(), cov, atol=0.15)
+
+    x = np.random.randn(3)
+    npt.assert_allclose(pot.velocity(x), pot.velocity_scaling().dot(x))
+    vals = np.array([pot.random() for _ in range(4000)])
+    inv = np.linalg.inv(pot.velocity_scaling())
+    npt.assert_allclose(np.cov(vals.T), inv, atol=0.15)
+    pot.raise_ok()
+
+
+def test_lowrank_adapt():
+    cov, samples = _correlated_samples(2001)
+    pot = quadpotential.QuadPotentialLowRankAdapt(
+        3, np.zeros(3), rank=3, adaptation_window=1000, dtype='d')
+    for sample in samples:
+        pot.update(sample, None, True)
+    vel = np.array([pot.velocity(x) for x in np.eye(3)])
+    npt.assert_allclose(vel, vel.T, atol=1e-10)
+    npt.assert_allclose(vel, cov, atol=0.15)
+
+    x = np.random.randn(3)
+    npt.assert_allclose(pot.energy(x), 0.5 * x.dot(vel).dot(x))
+    vals = np.array([pot.random() for _ in range(4000)])
+    npt.assert_allclose(np.cov(vals.T), np.linalg.inv(vel), atol=0.15)
+
+
+@pytest.mark.parametrize('make_potential', [
+    lambda n: quadpotential.QuadPotentialFullAdapt(
+        n, floatX(np.zeros(n)), adaptation_window=50),
+    lambda n: quadpotential.QuadPotentialLowRankAdapt(
+        n, floatX(np.zeros(n)), rank=2, adaptation_window=50),
+])
+def test_sample_adapt(make_potential):
+    cov = np.array([[1., 0.9, 0.],
+                    [0.9, 1., 0.],
+                    [0., 0., 4.]])
+    with pymc3.Model():
+        pymc3.MvNormal('x', mu=np.zeros(3), cov=cov, shape=3)
+        step = pymc3.NUTS(potential=make_potential(3))
+        trace = pymc3.sample(500, tune=500, step=step, chains=1,
+                             random_seed=42, compute_convergence_checks=False)
+    x = trace['x']
+    npt.assert_allclose(x.mean(axis=0), 0, atol=0.4)
+    npt.assert_allclose(np.cov(x.T), cov, atol=0.6)
+    assert not trace['diverging'].any()
+
+
+def test_lowrank_adapt_rank():
+    _, samples = _correlated_samples(300)
+    pot = quadpotential.QuadPotentialLowRankAdapt(
+        3, np.zeros(3), rank=1, adaptation_window=100, dtype='d')
+    for sample in samples:
+        pot.update(sample, None, True)
+    assert pot._vecs.shape == (3, 1)
+    pot.raise_ok()
@@ -1,4 +1,6 @@
 from itertools import combinations
+import warnings
+
 import numpy as np
 
 try:
@@ -101,6 +103,28 @@ class TestSample(SeededTest):
         assert tr.get_values('x', chains=0)[0][0] > 0
         assert tr.get_values('x', chains=1)[0][0] < 0
 
+    @pytest.mark.parametrize('backend', ['text', 'sqlite', 'hdf5'])
+    def test_parallel_record_in_workers(self, backend, tmpdir_factory):
+        name = str(tmpdir_factory.mktemp('traces').join('mcmc'))
+        with self.model:
+            expected = pm.sample(20, tune=10, cores=2, chains=3,
+                                 random_seed=[1, 2, 3])
+            if backend == 'text':
+                strace = pm.backends.Text(name)
+            elif backend == 'sqlite':
+                strace = pm.backends.SQLite(name)
+            else:
+                strace = pm.backends.HDF5(name, chain_files=True)
+            trace = pm.sample(20, tune=10, cores=2, chains=3, trace=strace,
+                              record_in_workers=True, random_seed=[1, 2, 3])
+            assert trace.chains == [0, 1, 2]
+            assert len(trace) == 20
+            npt.assert_allclose(trace['x'], expected['x'])
+
+            with pytest.raises(ValueError) as excinfo:
+                pm.sample(20, tune=10, cores=2, record_in_workers=True)
+            assert 'NDArray' in str(excinfo.value)
+
     def test_sample_tune_len(self):
         with self.model:
             trace = pm.sample(draws=100, tune=50, cores=1)
@@ -111,6 +135,40 @@ class TestSample(SeededTest):
             trace = pm.sample(draws=100, tune=50, cores=4)
             assert len(trace) == 100
 
+    @pytest.mark.parametrize('cores', [1, 2])
+    def test_sample_early_stopping(self, cores):
+        with self.model:
+            diagnostics = pm.OnlineDiagnostics()
+            trace = pm.sample(draws=5000, tune=50, chains=2, cores=cores,
+                              target_ess=100, max_rhat=1.1,
+                              check_interval=50, diagnostics=diagnostics)
+        assert len(trace) < 5000
+        assert len(trace) % 50 == 0
+        assert trace.nchains == 2
+        assert len(trace.get_values('x', chains=0)) == len(trace)
+        assert len(trace.get_values('x', chains=1)) == len(trace)
+        assert diagnostics.converged(target_ess=100, max_rhat=1.1)
+
+    def test_sample_early_stopping_more_chains_than_cores(self):
+        with self.model:
+            with pytest.raises(ValueError):
+                pm.sample(draws=500, tune=50, chains=3, cores=2,
+                          target_ess=100, check_interval=50)
+            trace = pm.sample(draws=5000, tune=50, chains=3, cores=1,
+                              target_ess=100, check_interval=50)
+        assert len(trace) < 5000
+        assert trace.nchains == 3
+
+    def test_sample_interleaved_independent_adaptation(self):
+        with self.model:
+            step = pm.NUTS()
+            trace = pm.sample(draws=200, tune=100, chains=2, cores=1,
+                              step=step, max_rhat=0.5, check_interval=50)
+        step_size = trace.get_sampler_stats('step_size', combine=False)
+        assert step_size[0][-1] != step_size[1][-1]
+        # The original step method is not tuned by the chains
+        assert step.potential._n_samples == 0
+
     @pytest.mark.parametrize(
         'start, error', [
             ([1, 2], TypeError),
@@ -290,6 +348,57 @@ class TestSamplePPC(SeededTest):
             _, pval = stats.kstest(ppc['b'], stats.norm(scale=scale).cdf)
             assert pval > 0.001
 
+    def test_batch_size(self):
+        x = np.linspace(0, 1, 20)
+        with pm.Model() as model:
+            a = pm.Normal('a', 0., 1.)
+            b = pm.Normal('b', 0., 1.)
+            y = pm.Normal('y', mu=a + b * x, sd=1, observed=2 * x)
+            z = pm.Normal('z', mu=a, sd=1, observed=np.array([0., 1.]))
+            trace = pm.sample(draws=500, chains=2, cores=1)
+
+        with model:
+            ppc = pm.sample_ppc(trace, samples=1000)
+            with warnings.catch_warnings(record=True) as record:
+                warnings.simplefilter('always')
+                ppc_batched = pm.sample_ppc(trace, samples=1000,
+                                            batch_size=300)
+                # batches whose length matches a dimension of a variable
+                ppc_list = pm.sample_ppc([model.test_point] * 5,
+                                         batch_size=2)
+            assert not [w for w in record if 'point by point' in str(w.message)]
+            assert ppc_batched['y'].shape == (1000, 20)
+            assert ppc_batched['z'].shape == (1000, 2)
+            for name in ['y', 'z']:
+                _, pval = stats.ks_2samp(ppc[name][:, 0],
+                                         ppc_batched[name][:, 0])
+                assert pval > 0.001
+            assert ppc_list['y'].shape == (5, 20)
+            assert ppc_list['z'].shape == (5, 2)
+
+            with pytest.raises(ValueError):
+                pm.sample_ppc(trace, samples=10, size=2, batch_size=5)
+
+    @pytest.mark.parametrize('batch_size', [3, 4, 7])
+    def test_batch_size_reductions(self, batch_size):
+        with pm.Model() as model:
+            theta = pm.Normal('theta', 0., 1., shape=3)
+            pm.Normal('y', mu=theta.sum(), sd=1e-3, observed=np.zeros(4))
+            pm.Normal('z', mu=theta[0], sd=1e-3, observed=np.zeros(3))
+        points = [{'theta': np.random.randn(3)} for _ in range(20)]
+
+        with model:
+            ppc = pm.sample_ppc(points, samples=50, random_seed=1)
+            with warnings.catch_warnings(record=True) as record:
+                warnings.simplefilter('always')
+                ppc_batched = pm.sample_ppc(points, samples=50, random_seed=1,
+                                            batch_size=batch_size)
+        assert not [w for w in record if 'point by point' in str(w.message)]
+        assert ppc_batched['y'].shape == (50, 4)
+        assert ppc_batched['z'].shape == (50, 3)
+        for name in ['y', 'z']:
+            npt.assert_allclose(ppc_batched[name], ppc[name], atol=0.02)
+
 
 class TestSamplePPCW(SeededTest):
     def test_sample_ppc_w(self):
@@ -317,8 +426,8 @@ class TestSamplePPCW(SeededTest):
 
 
 @pytest.mark.parametrize('method', [
-    'jitter+adapt_diag', 'adapt_diag', 'advi', 'ADVI+adapt_diag',
-    'advi+adapt_diag_grad', 'map', 'advi_map', 'nuts'
+    'jitter+adapt_diag', 'adapt_diag', 'jitter+adapt_full', 'advi',
+    'ADVI+adapt_diag', 'advi+adapt_diag_grad', 'map', 'advi_map', 'nuts'
 ])
 def test_exec_nuts_init(method):
     with pm.Model() as model:
@@ -1,5 +1,8 @@
 import os
+import numpy as np
+import numpy.testing as npt
 from pymc3.tests import backend_fixtures as bf
+from pymc3.tests import models
 from pymc3.backends import ndarray, sqlite
 import tempfile
 import pytest
@@ -65,3 +68,64 @@ class TestNDArraySqliteEquality(bf.BackendEqualityTestCase):
     backend1 = sqlite.SQLite
     name1 = DBNAME
     shape = (2, 3)
+
+
+class TestSQLiteBlob0dSampling(bf.SamplingTestCase):
+    backend = sqlite.SQLiteBlob
+    name = DBNAME
+    shape = ()
+
+
+class TestSQLiteBlob2dSampling(bf.SamplingTestCase):
+    backend = sqlite.SQLiteBlob
+    name = DBNAME
+    shape = (2, 3)
+
+
+class TestSQLiteBlob0dSelection(bf.SelectionTestCase):
+    backend = sqlite.SQLiteBlob
+    name = DBNAME
+    shape = ()
+
+
+class TestSQLiteBlob2dSelection(bf.SelectionTestCase):
+    backend = sqlite.SQLiteBlob
+    name = DBNAME
+    shape = (2, 3)
+
+
+class TestSQLiteBlobDumpLoad(bf.DumpLoadTestCase):
+    backend = sqlite.SQLiteBlob
+    load_func = staticmethod(sqlite.load)
+    name = DBNAME
+    shape = (2, 3)
+
+
+class TestNDArraySqliteBlobEquality(bf.BackendEqualityTestCase):
+    backend0 = ndarray.NDArray
+    name0 = None
+    backend1 = sqlite.SQLiteBlob
+    name1 = DBNAME
+    shape = (2, 3)
+
+
+class TestSQLiteBlobChunks(object):
+    name = DBNAME
+
+    def test_values_across_chunks(self):
+        test_point, model, _ = models.beta_bernoulli((2, 3))
+        with model:
+            strace = sqlite.SQLiteBlob(self.name, chunk_size=4)
+        strace.setup(10, 0)
+        for idx in range(10):
+            strace.record({varname: np.tile(idx, value.shape)
+                           for varname, value in test_point.items()})
+        strace.close()
+
+        npt.assert_equal(strace.get_values('x')[:, 0, 0], np.arange(10))
+        npt.assert_equal(strace.get_values('x', burn=5, thin=2)[:, 0, 0],
+                         np.arange(5, 10, 2))
+        npt.assert_equal(strace.point(-1)['x'], np.tile(9, (2, 3)))
+
+    def teardown_method(self):
+        bf.remove_file_or_directory(self.name)
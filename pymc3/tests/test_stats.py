@@ -2,6 +2,7 @@ from .models import Model, Normal, Metropolis
 import numpy as np
 import numpy.testing as npt
 import pandas as pd
+import theano
 import pymc3 as pm
 from .helpers import SeededTest
 from ..tests import backend_fixtures as bf
@@ -13,6 +14,7 @@ import pymc3.stats as pmstats
 from numpy.random import random, normal
 from numpy.testing import assert_equal, assert_almost_equal, assert_array_almost_equal
 from scipy import stats as st
+from scipy.special import logsumexp
 import copy
 
 
@@ -49,6 +51,24 @@ def test_log_post_trace():
     npt.assert_allclose(logp, -0.5 * np.log(2 * np.pi), atol=1e-7)
 
 
+def test_log_post_trace_chunks():
+    with pm.Model() as model:
+        mu = pm.Normal('mu', shape=2)
+        sd = pm.HalfNormal('sd')
+        pm.Normal('y', mu=mu, sd=sd, observed=np.random.randn(5, 2))
+        trace = pm.sample(20, tune=10, chains=2)
+
+    expected = np.stack([
+        model.observed_RVs[0].logp_elemwise(pt).ravel()
+        for pt in trace.points()])
+    logp = pmstats._log_post_trace(trace, model, chunk_size=7)
+    npt.assert_allclose(logp, expected, rtol=1e-5)
+    logp = pmstats._log_post_trace(list(trace.points()), model, chunk_size=7)
+    npt.assert_allclose(logp, expected, rtol=1e-5)
+    logp = pmstats._log_post_trace(trace, model, chunk_size=7, cores=2)
+    npt.assert_allclose(logp, expected, rtol=1e-5)
+
+
 def test_compare():
     np.random.seed(42)
     x_obs = np.random.normal(0, 1, size=100)
@@ -103,6 +123,66 @@ def test_compare():
     assert_almost_equal(np.sum(w_st), 1.)
 
 
+def test_compare_cache(monkeypatch):
+    np.random.seed(42)
+    x_obs = np.random.normal(0, 1, size=50)
+    models, traces = [], []
+    for sd in [1, 0.8]:
+        with pm.Model() as model:
+            mu = pm.Normal('mu', 0, 1)
+            pm.Normal('x', mu=mu, sd=sd, observed=x_obs)
+            traces.append(pm.sample(200, chains=2, cores=1))
+        models.append(model)
+
+    calls = []
+    log_post_trace = pmstats._log_post_trace
+
+    def counted_log_post_trace(trace, model, *args, **kwargs):
+        calls.append(model)
+        return log_post_trace(trace, model, *args, **kwargs)
+
+    monkeypatch.setattr(pmstats, '_log_post_trace', counted_log_post_trace)
+    pm.compare({models[0]: traces[0]}, method='pseudo-BMA')
+    df_comp = pm.compare(dict(zip(models, traces)), method='pseudo-BMA')
+    df_loo = pm.compare(dict(zip(models, traces)), ic='LOO',
+                        method='pseudo-BMA')
+    assert calls == models * 2
+    assert_almost_equal(df_comp['WAIC'][0],
+                        round(pm.waic(traces[0], models[0]).WAIC, 2))
+    assert_almost_equal(df_loo['LOO'][1],
+                        round(pm.loo(traces[1], models[1]).LOO, 2))
+
+
+def test_compare_cache_shared_data():
+    np.random.seed(42)
+    x_obs = theano.shared(np.random.normal(0, 1, size=50))
+    with pm.Model() as model:
+        mu = pm.Normal('mu', 0, 1)
+        pm.Normal('x', mu=mu, sd=1, observed=x_obs)
+        trace = pm.sample(200, chains=2, cores=1)
+
+    waic = pm.compare({model: trace}, method='pseudo-BMA')['WAIC'][0]
+    x_obs.set_value(x_obs.get_value() + 5)
+    waic_new = pm.compare({model: trace}, method='pseudo-BMA')['WAIC'][0]
+    assert waic_new != waic
+    assert_almost_equal(waic_new, round(pm.waic(trace, model).WAIC, 2))
+
+
+def test_compare_cache_add_values():
+    np.random.seed(42)
+    x_obs = np.random.normal(0, 1, size=50)
+    with pm.Model() as model:
+        mu = pm.Normal('mu', 0, 1)
+        pm.Normal('x', mu=mu, sd=1, observed=x_obs)
+        trace = pm.sample(200, chains=2, cores=1)
+
+    waic = pm.compare({model: trace}, method='pseudo-BMA')['WAIC'][0]
+    trace.add_values({'mu': trace['mu'] + 5}, overwrite=True)
+    waic_new = pm.compare({model: trace}, method='pseudo-BMA')['WAIC'][0]
+    assert waic_new != waic
+    assert_almost_equal(waic_new, round(pm.waic(trace, model).WAIC, 2))
+
+
 class TestStats(SeededTest):
     @classmethod
     def setup_class(cls):
@@ -121,6 +201,20 @@ class TestStats(SeededTest):
         acov_pm = autocov(self.normal_sample)[lag]
         assert_almost_equal(acov_pm, acov_np, 7)
 
+    def test_autocorr_batch(self):
+        x = normal(0, 1, (3, 500, 2))
+        x[:, :, 1] = np.cumsum(x[:, :, 1], axis=1)
+        acov = pmstats.autocov_batch(x, max_lag=20)
+        acorr = pmstats.autocorr_batch(x)
+        assert acov.shape == (3, 21, 2)
+        assert acorr.shape == (3, 500, 2)
+        for chain in range(3):
+            for i in range(2):
+                assert_array_almost_equal(acov[chain, :, i],
+                                          autocov(x[chain, :, i])[:21])
+                assert_array_almost_equal(acorr[chain, :, i],
+                                          autocorr(x[chain, :, i]))
+
     def test_waic(self):
         """Test widely available information criterion calculation"""
         x_obs = np.arange(6)
@@ -150,6 +244,24 @@ class TestStats(SeededTest):
         interval = hpd(self.normal_sample)
         assert_array_almost_equal(interval, [-1.96, 1.96], 2)
 
+    def test_hpd_columns(self):
+        x = normal(0, 1, (1000, 2, 3))
+        x[:, 1] = np.exp(x[:, 1])
+        intervals = hpd(x, alpha=0.1)
+        assert intervals.shape == (2, 3, 2)
+        for i, j in make_indices((2, 3)):
+            expected = pmstats.calc_min_interval(np.sort(x[:, i, j]), 0.1)
+            assert_equal(intervals[i, j], expected)
+
+    def test_quantiles_columns(self):
+        x = normal(0, 1, (1001, 4, 2))
+        qlist = (50, 2.5, 97.5)
+        q = quantiles(x, qlist)
+        sx = np.sort(x, axis=0)
+        for key in qlist:
+            assert_equal(q[key], sx[int(1001 * key / 100.0)])
+        assert quantiles(x[:2], [99, 100]) is None
+
     def test_make_indices(self):
         """Test make_indices function"""
         ind = [(0, 0), (0, 1), (0, 2), (1, 0), (1, 1), (1, 2)]
@@ -339,7 +451,46 @@ class TestDfSummary(bf.ModelBackendSampledTestCase):
                                  ).reshape(rhat.shape)
             npt.assert_equal(rhat, rhat_df)
 
+    def test_value_default_stats(self):
+        mtrace = self.mtrace
+        for var in mtrace.varnames:
+            rows = summary(mtrace, varnames=[var], batches=3)
+            vals = mtrace[var].reshape(len(mtrace) * mtrace.nchains, -1)
+            npt.assert_allclose(rows['sd'], np.std(vals, 0))
+            npt.assert_allclose(rows['mc_error'], mc_error(vals, 3))
+            npt.assert_allclose(rows[['hpd_2.5', 'hpd_97.5']], hpd(vals))
+
+    def test_chunks_and_cores(self):
+        ds = summary(self.mtrace, batches=3)
+        ds_chunked = summary(self.mtrace, batches=3, chunk_size=2, cores=2)
+        pd.testing.assert_frame_equal(ds, ds_chunked)
+
     def test_psis(self):
         lw = np.random.randn(20000, 10)
         _, ks = pm.stats._psislw(lw, 1.)
         npt.assert_array_less(ks, .5)
+
+    def test_psis_columns(self):
+        lw = np.random.randn(1000, 20) * 3
+        # All weights are equal, the column is smoothed on its own
+        lw[:, 3] = 0
+        lw_smoothed, ks = pm.stats._psislw(lw, 0.7)
+        n = len(lw)
+        cutoff_ind = - int(np.ceil(min(n / 5., 3 * (n / 0.7) ** 0.5))) - 1
+        cutoffmin = np.log(np.finfo(float).tiny)
+        for i in range(lw.shape[1]):
+            x = lw[:, i] - lw[:, i].max()
+            k = pm.stats._psislw_column(x, cutoff_ind, cutoffmin, 1. / 3)
+            x -= logsumexp(x)
+            npt.assert_allclose(lw_smoothed[:, i], x)
+            npt.assert_allclose(ks[i], k)
+
+    def test_loo_log_likelihood(self, tmpdir):
+        log_py = np.random.normal(-1, 0.5, (500, 30))
+        path = str(tmpdir.join('log_py.npy'))
+        np.save(path, log_py)
+        res = pm.loo(log_likelihood=log_py, reff=1., pointwise=True)
+        res_disk = pm.loo(log_likelihood=path, reff=1., pointwise=True)
+        npt.assert_allclose(res.LOO_i, res_disk.LOO_i)
+        res_parallel = pm.loo(log_likelihood=path, reff=1., cores=2)
+        npt.assert_allclose(res.LOO, res_parallel.LOO)
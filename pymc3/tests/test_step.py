@@ -9,7 +9,8 @@ from pymc3.model import Model
 from pymc3.step_methods import (NUTS, BinaryGibbsMetropolis, CategoricalGibbsMetropolis,
                                 Metropolis, Slice, CompoundStep, NormalProposal,
                                 MultivariateNormalProposal, HamiltonianMC,
-                                EllipticalSlice, smc, DEMetropolis)
+                                EllipticalSlice, smc, DEMetropolis,
+                                VectorizedNUTS)
 from pymc3.theanof import floatX
 from pymc3.distributions import (
     Binomial, Normal, Bernoulli, Categorical, Beta, HalfNormal)
@@ -416,6 +417,57 @@ class TestPopulationSamplers(object):
         pass
 
 
+class TestVectorizedNUTS(object):
+    def test_sample(self):
+        with Model():
+            Normal('x', mu=1, sd=2, shape=2)
+            step = VectorizedNUTS()
+            trace = sample(300, tune=200, step=step, chains=6,
+                           random_seed=1, compute_convergence_checks=False)
+        assert trace.nchains == 6
+        assert trace.get_values('x', combine=False)[0].shape == (300, 2)
+        assert trace['tree_size'].shape == (1800,)
+        assert not trace['diverging'].any()
+        npt.assert_allclose(trace['x'].mean(axis=0), 1, atol=0.3)
+        npt.assert_allclose(trace['x'].std(axis=0), 2, rtol=0.15)
+        step_sizes = trace.get_sampler_stats('step_size', combine=False)
+        assert len(set(s[-1] for s in step_sizes)) == 6
+
+    def test_chains_are_independent(self):
+        with Model():
+            Normal('x', mu=0, sd=1)
+            trace = sample(10, tune=0, step=VectorizedNUTS(), chains=4,
+                           compute_convergence_checks=False)
+        samples = np.array(trace.get_values('x', combine=False))[:, 5]
+        assert len(set(samples)) == 4
+
+    def test_requires_all_vars(self):
+        with Model():
+            x = Normal('x', mu=0, sd=1)
+            Normal('y', mu=x, sd=1)
+            with pytest.raises(ValueError):
+                sample(10, step=VectorizedNUTS([x]), chains=2)
+
+    def test_backend_and_diagnostics(self):
+        from pymc3.backends import Text, text
+        from pymc3.diagnostics import OnlineDiagnostics
+        db = tempfile.mkdtemp()
+        try:
+            with Model() as model:
+                Normal('x', mu=0, sd=1)
+                diagnostics = OnlineDiagnostics()
+                trace = sample(20, tune=10, step=VectorizedNUTS(), chains=2,
+                               trace=Text(db), diagnostics=diagnostics,
+                               compute_convergence_checks=False)
+            assert len(trace) == 20
+            saved = text.load(db, model=model)
+            assert saved.nchains == 2
+            assert len(saved) == 30
+            assert diagnostics.draws == {0: 20, 1: 20}
+        finally:
+            shutil.rmtree(db)
+
+
 @pytest.mark.xfail(condition=(theano.config.floatX == "float32"), reason="Fails on float32")
 class TestNutsCheckTrace(object):
     def test_multiple_samplers(self, caplog):
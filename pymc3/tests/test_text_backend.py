@@ -1,3 +1,5 @@
+import functools
+import os
 import pymc3 as pm
 from pymc3.tests import backend_fixtures as bf
 from pymc3.backends import ndarray, text
@@ -83,3 +85,35 @@ class TestNDArrayTextEquality(bf.BackendEqualityTestCase):
     backend1 = text.Text
     name1 = 'text-db'
     shape = (2, 3)
+
+
+class TestTextSidecar2dSelection(bf.SelectionTestCase):
+    backend = functools.partial(text.Text, sidecar=True)
+    name = 'text-db'
+    shape = (2, 3)
+
+
+class TestTextSidecarDumpLoad(bf.DumpLoadTestCase):
+    backend = functools.partial(text.Text, sidecar=True)
+    load_func = staticmethod(text.load)
+    name = 'text-db'
+    shape = (2, 3)
+
+    def test_sidecar_files(self):
+        for chain in self.mtrace.chains:
+            assert os.path.exists(
+                os.path.join(self.name, 'chain-{}.npy'.format(chain)))
+
+
+class TestTextSidecarDumpFunction(bf.BackendEqualityTestCase):
+    backend0 = backend1 = ndarray.NDArray
+    name0 = None
+    name1 = 'text-db'
+    shape = (2, 3)
+
+    @classmethod
+    def setup_class(cls):
+        super(TestTextSidecarDumpFunction, cls).setup_class()
+        text.dump(cls.name1, cls.mtrace1, sidecar=True)
+        with cls.model:
+            cls.mtrace1 = text.load(cls.name1)
@@ -1,3 +1,4 @@
+import numpy as np
 import numpy.testing as npt
 
 from pymc3.tests import backend_fixtures as bf
@@ -32,6 +33,8 @@ class TestTraceToDf(bf.ModelBackendSampledTestCase):
         mtrace = self.mtrace
         df = ttab.trace_to_dataframe(mtrace, chains=0)
         assert len(mtrace) == df.shape[0]
+        df_np = ttab.trace_to_dataframe(mtrace, chains=np.int64(0))
+        npt.assert_equal(df_np.values, df.values)
 
         checked = False
         for varname in self.test_point.keys():
@@ -46,6 +49,40 @@ class TestTraceToDf(bf.ModelBackendSampledTestCase):
             checked = True
         assert checked
 
+    def test_iter_trace_to_dataframe(self):
+        mtrace = self.mtrace
+        df = ttab.trace_to_dataframe(mtrace)
+        chunk_size = len(mtrace) - 1
+        dfs = list(ttab.iter_trace_to_dataframe(mtrace, chunk_size=chunk_size))
+        assert all(len(chunk) <= chunk_size for chunk in dfs)
+        assert sum(len(chunk) for chunk in dfs) == len(df)
+        for chunk in dfs:
+            assert list(chunk.columns) == list(df.columns)
+            npt.assert_equal(chunk.values, df.loc[chunk.index].values)
+
+    def test_iter_trace_to_dataframe_reads_ranges(self, monkeypatch):
+        mtrace = self.mtrace
+        ranges = []
+        get_values_range = self.backend._get_values_range
+
+        def counted(strace, varname, start, stop):
+            ranges.append((start, stop))
+            return get_values_range(strace, varname, start, stop)
+
+        monkeypatch.setattr(self.backend, '_get_values_range', counted)
+        chunk_size = 3
+        list(ttab.iter_trace_to_dataframe(mtrace, chunk_size=chunk_size))
+        assert ranges
+        assert all(stop - start <= chunk_size for start, stop in ranges)
+
+    def test_trace_to_dataframe_dtypes(self):
+        mtrace = self.mtrace
+        df = ttab.trace_to_dataframe(mtrace, include_transformed=True)
+        for varname in self.test_point.keys():
+            dtype = mtrace.get_values(varname).dtype
+            names = ttab.create_flat_names(varname, self.test_point[varname].shape)
+            assert all(df[name].dtype == dtype for name in names)
+
 
 def test_create_flat_names_0d():
     shape = ()